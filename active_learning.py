@@ -0,0 +1,42 @@
+import numpy as np
+
+# Uncertainty scores for ordering the labeling queue. Input is the (64, 4)
+# per-cell probability matrix produced by model_bundle.predict_image.
+
+METHODS = ("entropy", "margin")
+TOP_CELLS = 8  # Score an image by its most uncertain cells
+
+
+def cell_entropy(proba):
+    p = np.clip(proba, 1e-12, 1.0)
+    return -(p * np.log(p)).sum(axis=-1)
+
+
+def cell_margin(proba):
+    # Gap between the two most likely classes (small = uncertain)
+    top2 = np.sort(proba, axis=-1)[..., -2:]
+    return top2[..., 1] - top2[..., 0]
+
+
+def image_uncertainty(proba, method="entropy", top_k=TOP_CELLS):
+    if method == "entropy":
+        u = cell_entropy(proba)
+    elif method == "margin":
+        u = 1.0 - cell_margin(proba)
+    else:
+        raise ValueError(f"Unknown uncertainty method: {method}")
+
+    # Average over the most uncertain cells so a few ambiguous cells are not
+    # drowned out by dozens of confident background cells
+    return float(np.sort(u)[-top_k:].mean())
+
+
+def order_by_uncertainty(paths, scores, labeled=()):
+    # Scored images first (most uncertain first), then unscored ones in their
+    # original order, then images that already have labels
+    labeled = set(labeled)
+    scored = [p for p in paths if p in scores and p not in labeled]
+    unscored = [p for p in paths if p not in scores and p not in labeled]
+    done = [p for p in paths if p in labeled]
+    scored.sort(key=lambda p: scores[p], reverse=True)
+    return scored + unscored + done
@@ -1,10 +1,11 @@
 from ultralytics import YOLOWorld
 import cv2
-import pandas as pd
 import os
-import glob
 import numpy as np
 from PIL import Image
+from image_manifest import build_manifest
+from label_matrix import LabelMatrix
+from grid_overlay import render_overlay
 
 # --- CONFIGURATION ---
 IMAGE_FOLDER = "raw_images"
@@ -28,13 +29,6 @@ CLASS_MAP = {
     2: 3   # Stump
 }
 
-# Colors for visualization (BGR)
-COLORS = {
-    1: (0, 0, 255),   # Red (Ball)
-    2: (255, 0, 0),   # Blue (Bat)
-    3: (0, 255, 0)    # Green (Stump)
-}
-
 def get_intersection_area(boxA, boxB):
     xA = max(boxA[0], boxB[0])
     yA = max(boxA[1], boxB[1])
@@ -59,13 +53,14 @@ def process_images():
     model.set_classes(["cricket ball", "cricket bat", "cricket stump"])
 
     # 2. Prepare Data List
-    csv_data = []
+    labeled_names = []
+    labeled_grids = []
     
-    all_files = glob.glob(os.path.join(IMAGE_FOLDER, "*"))
-    valid_extensions = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-    image_files = [f for f in all_files if os.path.splitext(f)[1].lower() in valid_extensions]
+    # Too-small images are known from the manifest without decoding them
+    entries = build_manifest(IMAGE_FOLDER) if os.path.isdir(IMAGE_FOLDER) else []
+    image_files = [os.path.join(IMAGE_FOLDER, e["name"]) for e in entries if not e["too_small"]]
     
-    print(f"Found {len(image_files)} valid images.")
+    print(f"Found {len(image_files)} valid images ({len(entries) - len(image_files)} below {IMG_W}x{IMG_H} skipped).")
 
     if len(image_files) == 0:
         print("ERROR: No images found! Check your 'raw_images' folder.")
@@ -125,66 +120,24 @@ def process_images():
                         grid_labels[i] = project_label
 
         # --- VISUALIZATION ---
-        overlay = img.copy()
-        alpha = 0.27 # Approx 70/255
-        
-        for i, label in enumerate(grid_labels):
-            if label != 0:
-                row = i // COLS
-                col = i % COLS
-                x1 = col * CELL_W
-                y1 = row * CELL_H
-                x2 = x1 + CELL_W
-                y2 = y1 + CELL_H
-                
-                color = COLORS.get(label, (255, 255, 255))
-                cv2.rectangle(overlay, (x1, y1), (x2, y2), color, -1) # -1 fills the rectangle
-                
-        # Blend overlay with original image
-        cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
-        
-        # Draw Grid Lines
-        for i in range(1, COLS):
-            x = i * CELL_W
-            cv2.line(img, (x, 0), (x, IMG_H), (0, 255, 255), 1)
-            
-        for i in range(1, ROWS):
-            y = i * CELL_H
-            cv2.line(img, (0, y), (IMG_W, y), (0, 255, 255), 1)
-
-        # Draw Cell Numbers
-        for i in range(64):
-            row = i // ROWS
-            col = i % COLS
-            x = int(col * CELL_W + 5)
-            y = int(row * CELL_H + 15)
-            cv2.putText(img, str(i+1), (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        # Shared RGB overlay (same look as the labeler's reference images)
+        overlay = render_overlay(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), grid_labels)
         
         # Save Reference Image (with overlay)
         ref_save_path = os.path.join(REFERENCE_DIR, filename)
-        cv2.imwrite(ref_save_path, img)
+        cv2.imwrite(ref_save_path, cv2.cvtColor(overlay, cv2.COLOR_RGB2BGR))
 
         # Save Row
-        row_dict = {
-            "ImageFileName": filename,
-            "TrainOrTest": "Train",
-        }
-        for i in range(64):
-            row_dict[f"c{i+1:02d}"] = grid_labels[i]
-            
-        csv_data.append(row_dict)
+        labeled_names.append(filename)
+        labeled_grids.append(grid_labels)
         print(f"Processed: {filename}")
 
     # 3. Save to CSV
-    if not csv_data:
+    if not labeled_names:
         print("ERROR: No data generated.")
         return
 
-    df = pd.DataFrame(csv_data)
-    cols = ["ImageFileName", "TrainOrTest"] + [f"c{i+1:02d}" for i in range(64)]
-    df = df[cols]
-    
-    df.to_csv(OUTPUT_CSV, index=False)
+    LabelMatrix(labeled_names, ["Train"] * len(labeled_names), labeled_grids).to_csv(OUTPUT_CSV)
     print(f"Done! Labels saved to {OUTPUT_CSV}")
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from PIL import Image, ImageDraw
+from image_manifest import list_images
+from label_matrix import LabelMatrix
+from visualizer_cache import load_resized
+
+# Headless batch export of the feature visualizer panels. For every cell of
+# every image in a folder (or only cells whose labels.csv class is selected)
+# the HOG, colour, convolution and shape panels are rendered with the Agg
+# backend and saved side by side as one PNG sheet per cell. Images are spread
+# over a process pool; each worker builds its panels once and reuses their
+# artists for every cell, exactly like the interactive tools.
+# Usage: python batch_export.py [--folder processed_images] [--classes 1 2 3]
+#                               [--panels hog_visualizer ...] [--workers N] [--output feature_sheets]
+
+# Configuration
+IMAGE_FOLDER = "processed_images"
+LABELS_CSV = "labels.csv"
+OUTPUT_DIR = "feature_sheets"
+PANEL_MODULES = ["hog_visualizer", "color_visualizer", "convolution_visualizer", "shape_visualizer"]
+GRID_ROWS = 8
+GRID_COLS = 8
+IMG_WIDTH = 800
+IMG_HEIGHT = 600
+CELL_W = IMG_WIDTH // GRID_COLS
+CELL_H = IMG_HEIGHT // GRID_ROWS
+SHEET_DPI = 60
+HEADER_HEIGHT = 24
+# zlib level for the sheets; level 6 (PIL default) triples the save time for ~15% smaller files
+PNG_COMPRESS_LEVEL = 1
+CLASS_NAMES = {0: "None", 1: "Ball", 2: "Bat", 3: "Stump"}
+
+# Per-process state, filled by init_worker
+worker = {}
+
+def init_worker(module_names, output_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    panels = []
+    for name in module_names:
+        plugin = importlib.import_module(name).PLUGIN
+        fig = Figure(figsize=plugin.figsize, dpi=SHEET_DPI)
+        canvas = FigureCanvasAgg(fig)
+        panel = plugin.panel_class(fig)
+        panel.attach(canvas)
+        panels.append((plugin, panel, canvas))
+
+    worker["panels"] = panels
+    worker["output_dir"] = output_dir
+
+def render_sheet(cell, row, col, title):
+    # Each panel renders into its own Agg buffer (blitting after the first
+    # full draw); the buffers are then pasted next to each other
+    tiles = []
+    for plugin, panel, canvas in worker["panels"]:
+        panel.render(plugin.compute_cell(cell), row, col)
+        panel.refresh()
+        tiles.append(np.asarray(canvas.buffer_rgba())[:, :, :3])
+
+    height = max(t.shape[0] for t in tiles)
+    width = sum(t.shape[1] for t in tiles)
+    sheet = np.full((HEADER_HEIGHT + height, width, 3), 255, dtype=np.uint8)
+    x = 0
+    for t in tiles:
+        sheet[HEADER_HEIGHT:HEADER_HEIGHT + t.shape[0], x:x + t.shape[1]] = t
+        x += t.shape[1]
+
+    sheet_img = Image.fromarray(sheet)
+    ImageDraw.Draw(sheet_img).text((8, 6), title, fill=(0, 0, 0))
+    return sheet_img
+
+def export_image(path, cells, labels):
+    # cells: 0-based cell indices (row-major, c01 = 0); labels: (64,) or None
+    image = np.array(load_resized(path))
+    name = os.path.basename(path)
+    stem = os.path.splitext(name)[0]
+
+    for idx in cells:
+        row, col = divmod(int(idx), GRID_COLS)
+        cell = np.ascontiguousarray(image[row * CELL_H:(row + 1) * CELL_H, col * CELL_W:(col + 1) * CELL_W])
+        title = f"{name}  c{idx + 1:02d}  (row {row + 1}, col {col + 1})"
+        if labels is not None:
+            title += f"  label: {CLASS_NAMES.get(int(labels[idx]), labels[idx])}"
+        sheet = render_sheet(cell, row, col, title)
+        sheet.save(os.path.join(worker["output_dir"], f"{stem}_c{idx + 1:02d}.png"), compress_level=PNG_COMPRESS_LEVEL)
+    return len(cells)
+
+def select_jobs(folder, classes=None):
+    # (path, cells, labels) per image; with classes, only labeled images and
+    # only the cells whose label is one of them
+    label_matrix = LabelMatrix.read_csv(LABELS_CSV)
+    jobs = []
+    for path in list_images(folder):
+        labels = label_matrix.get(os.path.basename(path))
+        if classes:
+            if labels is None:
+                continue
+            cells = np.flatnonzero(np.isin(labels, classes))
+            if len(cells) == 0:
+                continue
+        else:
+            cells = np.arange(GRID_ROWS * GRID_COLS)
+        jobs.append((path, cells, labels))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Render feature panels for many cells to PNG sheets (headless).")
+    parser.add_argument("--folder", default=IMAGE_FOLDER, help="Image folder")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Directory for the PNG sheets")
+    parser.add_argument("--classes", type=int, nargs="+", help=f"Only cells with these {LABELS_CSV} classes (1 Ball, 2 Bat, 3 Stump)")
+    parser.add_argument("--panels", nargs="+", default=PANEL_MODULES, help="Visualizer modules to render")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: folder {args.folder} not found.")
+        sys.exit(1)
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = select_jobs(args.folder, args.classes)
+    total_cells = sum(len(cells) for _, cells, _ in jobs)
+    if total_cells == 0:
+        print("No cells selected.")
+        return
+    print(f"Exporting {total_cells} cells from {len(jobs)} images with {args.workers} workers...")
+
+    start = time.time()
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.panels, args.output)) as executor:
+        futures = {executor.submit(export_image, *job): job[0] for job in jobs}
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                done += future.result()
+            except Exception as e:
+                print(f"Error exporting {futures[future]}: {e}")
+            print(f"[{i}/{len(jobs)}] {done}/{total_cells} cells", end="\r")
+
+    elapsed = time.time() - start
+    print(f"\nWrote {done} sheets to {args.output} in {elapsed:.1f}s ({done / elapsed:.1f} cells/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import csv
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import model_bundle
+from image_manifest import build_manifest
+from label_matrix import COLUMNS, N_CELLS
+
+# Grid predictions for a whole image folder with a saved model bundle,
+# written to predicted_labels.csv in the labels.csv schema. Images are listed
+# through the folder manifest and their cell features are extracted in a
+# process pool; the main process predicts a batch of images at a time
+# (one (batch * 64, F) predict call, reshaped to (batch, 64)) and appends the
+# rows as soon as the batch is done, so an interrupted run keeps its results.
+# A bundle with a cascade stage (train_cascade.py) featurizes only the cells
+# the stage passes.
+# Rerunning resumes after the images already in the output file.
+# Usage: python batch_predict.py [--folder processed_images] [--model models/cell_classifier.joblib]
+
+# Configuration
+IMAGE_DIR = "processed_images"
+OUTPUT_CSV = "predicted_labels.csv"
+WORKERS = os.cpu_count() or 1
+BATCH_IMAGES = 32  # Images per predict call
+IN_FLIGHT = 4  # Extraction jobs queued per worker
+SPLIT = "Predicted"
+REPORT_EVERY = 10  # Progress line every N batches
+
+# Per-process state, filled by init_worker
+worker = {}
+
+
+def init_worker(feature_config, cascade_stage=None):
+    import cell_features
+    import cascade
+    worker["cell_features"] = cell_features
+    worker["cascade"] = cascade
+    worker["config"] = feature_config
+    worker["stage"] = cascade_stage
+
+
+def extract(path):
+    # (name, (featurized cells, their features) or None, error message or None)
+    name = os.path.basename(path)
+    cell_features = worker["cell_features"]
+    try:
+        img = cell_features.load_image(path)
+        if img is None:
+            return name, None, f"Failed to read image: {path}"
+        return name, worker["cascade"].extract_cascade(img, worker["config"], worker["stage"]), None
+    except Exception as e:
+        return name, None, f"Error extracting {name}: {e}"
+
+
+def stream_features(executor, paths, in_flight):
+    # Results in input order with at most in_flight jobs queued, so a huge
+    # folder never sits in memory as finished-but-unconsumed feature matrices
+    pending = deque()
+    for path in paths:
+        pending.append(executor.submit(extract, path))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def completed_names(path):
+    # Images already in the output file. A row cut short by an interrupted
+    # write is dropped and the file rewritten without it.
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        os.remove(path)
+        return set()
+    if rows[0] != COLUMNS:
+        raise ValueError(f"{path} does not have the {COLUMNS[0]}, {COLUMNS[1]}, c01..c64 header")
+    good = [r for r in rows[1:] if len(r) == len(COLUMNS) and all(v.isdigit() for v in r[2:])]
+    if len(good) != len(rows) - 1:
+        print(f"Dropping {len(rows) - 1 - len(good)} incomplete rows from {path}")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(good)
+    return {r[0] for r in good}
+
+
+def predict_batch(bundle, batch, writer):
+    # batch: [(name, (cells, features))]; one predict call for all featurized
+    # cells, background for cells a cascade stage rejected
+    labels = np.zeros((len(batch), N_CELLS), dtype=np.uint8)
+    blocks = [features for _, (_, features) in batch if features is not None]
+    if blocks:
+        predicted = model_bundle.predict_labels(bundle, np.concatenate(blocks))
+        offset = 0
+        for i, (_, (cells, _)) in enumerate(batch):
+            labels[i, cells] = predicted[offset:offset + len(cells)]
+            offset += len(cells)
+    writer.writerows([name, SPLIT] + row for (name, _), row in zip(batch, labels.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict grid labels for every image in a folder.")
+    parser.add_argument("--folder", default=IMAGE_DIR)
+    parser.add_argument("--model", default=model_bundle.MODEL_FILE)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_IMAGES, help="Images per predict call")
+    parser.add_argument("--restart", action="store_true", help="Overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: folder {args.folder} not found.")
+        sys.exit(1)
+    bundle = model_bundle.load_bundle(args.model)
+    if bundle is None:
+        sys.exit(1)
+
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    try:
+        done = completed_names(args.output)
+    except ValueError as e:
+        print(f"Error: {e} (use --restart to overwrite it)")
+        sys.exit(1)
+
+    entries = build_manifest(args.folder)
+    paths = [os.path.join(args.folder, e["name"]) for e in entries if e["name"] not in done]
+    print(f"{len(entries)} images in {args.folder}: {len(done)} already predicted, {len(paths)} to go")
+    if not paths:
+        return
+
+    new_file = not os.path.exists(args.output)
+    predicted = failed = 0
+    start = time.time()
+    with open(args.output, "a", newline="") as f, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                initargs=(bundle.get("feature_config"), bundle.get("cascade"))) as executor:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(COLUMNS)
+
+        batch = []
+        batches = 0
+        for name, features, message in stream_features(executor, paths, args.workers * IN_FLIGHT):
+            if message:
+                print(message)
+                failed += 1
+                continue
+            batch.append((name, features))
+            if len(batch) < args.batch_size:
+                continue
+
+            predict_batch(bundle, batch, writer)
+            f.flush()
+            predicted += len(batch)
+            batch = []
+            batches += 1
+            if batches % REPORT_EVERY == 0:
+                elapsed = time.time() - start
+                print(f"  {predicted}/{len(paths)} images ({predicted / elapsed:.1f} images/s)")
+
+        if batch:
+            predict_batch(bundle, batch, writer)
+            predicted += len(batch)
+
+    elapsed = time.time() - start
+    print(f"Done! {predicted} images predicted in {elapsed:.1f}s ({predicted / elapsed:.1f} images/s, "
+          f"{args.workers} workers), {failed} failed -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# sklearn RandomForestClassifier.predict_proba against the array-backed
+# forest_arrays.ArrayForest at batch sizes of one image (64 cells) and
+# 64k cells, plus load time of the joblib bundle against the .npz export.
+# The forest is fitted on synthetic data with the cell feature width (or the
+# real cached features with --cached); "max diff" is the largest
+# probability difference between the two predictors.
+# Usage: python benchmarks/bench_forest.py [--trees 100] [--batches 64 65536] [--cached]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forest_arrays import ArrayForest, save_npz, load_npz
+
+BATCHES = [64, 65536]
+N_TRAIN = 4000
+N_FEATURES = 3276  # HOG + colour + shape + LBP cell vector
+N_TREES = 100
+LATENT_DIM = 50
+REPEATS = 5
+RANDOM_STATE = 42
+
+
+def best_time(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def training_data(args):
+    if args.cached:
+        from feature_cache import load_dataset, update_cache, load_matrix
+        data = load_dataset()
+        cells = np.zeros(data["labels"].shape, dtype=bool)
+        cells[update_cache(data)] = True
+        return load_matrix(data, cells), data["labels"][cells]
+    # Low-rank class structure spread over correlated columns, as in
+    # bench_kernel_approx.py; pure noise columns grow degenerate deep trees
+    from sklearn.datasets import make_classification
+    Z, y = make_classification(n_samples=N_TRAIN, n_features=LATENT_DIM, n_informative=20, n_redundant=10,
+                               n_classes=4, n_clusters_per_class=2, weights=[0.9, 0.02, 0.04, 0.04],
+                               class_sep=1.5, flip_y=0.01, random_state=RANDOM_STATE)
+    rng = np.random.default_rng(RANDOM_STATE)
+    X = Z @ rng.normal(size=(LATENT_DIM, args.features)) / np.sqrt(LATENT_DIM)
+    return X + rng.normal(scale=0.5, size=X.shape), y
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trees", type=int, default=N_TREES)
+    parser.add_argument("--batches", type=int, nargs="+", default=BATCHES)
+    parser.add_argument("--features", type=int, default=N_FEATURES)
+    parser.add_argument("--cached", action="store_true", help="Fit on the real feature cache")
+    args = parser.parse_args()
+
+    import tempfile
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = training_data(args)
+    model = RandomForestClassifier(n_estimators=args.trees, random_state=RANDOM_STATE).fit(X, y)
+    forest = ArrayForest.from_sklearn(model)
+    print(f"{args.trees} trees, {len(forest.feature)} nodes, depth {forest.depth}, {X.shape[1]} features")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = {"model": model, "scaler": None, "feature_config": None, "fingerprint": ""}
+        joblib.dump(bundle, os.path.join(tmp, "bundle.joblib"))
+        save_npz(bundle, os.path.join(tmp, "bundle.npz"))
+        t_joblib = best_time(lambda: joblib.load(os.path.join(tmp, "bundle.joblib")), REPEATS)
+        t_npz = best_time(lambda: load_npz(os.path.join(tmp, "bundle.npz")), REPEATS)
+    print(f"Load: joblib {t_joblib * 1000:.1f} ms, npz {t_npz * 1000:.1f} ms")
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    print(f"{'batch':>7}{'sklearn ms':>12}{'arrays ms':>11}{'speed-up':>10}{'max diff':>11}{'same labels':>13}")
+    for batch in args.batches:
+        rows = X[rng.integers(0, len(X), batch)]
+        repeats = REPEATS if batch <= 4096 else 1
+        t_sk = best_time(lambda: model.predict_proba(rows), repeats)
+        t_arr = best_time(lambda: forest.predict_proba(rows), repeats)
+        diff = np.abs(model.predict_proba(rows) - forest.predict_proba(rows)).max()
+        same = np.mean(model.predict(rows) == forest.predict(rows))
+        print(f"{batch:>7}{t_sk * 1000:>12.2f}{t_arr * 1000:>11.2f}{t_sk / t_arr:>9.1f}x{diff:>11.1e}{same:>13.4f}")
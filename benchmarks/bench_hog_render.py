@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+import numpy as np
+from skimage.feature import hog
+
+# HOG glyph image: skimage's hog(..., visualize=True) against hog_render.hog_map
+# for a HOG-visualizer cell (4x4 grid), a labeling-grid cell (8x8 grid) and a
+# full 800x600 image. Also reports the largest pixel difference.
+# Usage: python benchmarks/bench_hog_render.py [repeats]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hog_render import hog_map
+
+SIZES = [("cell 4x4 grid", (150, 200)), ("cell 8x8 grid", (75, 100)), ("full image", (600, 800))]
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rng = np.random.default_rng(0)
+
+    print(f"{'Input':<16}{'skimage ms':>12}{'hog_map ms':>12}{'speed-up':>10}{'max diff':>12}")
+    for name, (h, w) in SIZES:
+        img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        hog_map(img)  # warm the stencil cache
+
+        t_ref, (_, ref) = best_of(lambda: hog(img, orientations=9, pixels_per_cell=(8, 8), cells_per_block=(2, 2),
+                                              visualize=True, channel_axis=-1), repeats)
+        t_new, out = best_of(lambda: hog_map(img), repeats)
+        print(f"{name:<16}{t_ref:>12.2f}{t_new:>12.2f}{t_ref / t_new:>9.1f}x{np.abs(out - ref).max():>12.2e}")
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Fit/predict time and hold-out accuracy of the notebook's
+# SVC(kernel="rbf", C=10, probability=True) against kernel_approx's
+# Nystroem and random-Fourier-feature + minibatch SGD models, at increasing
+# numbers of cells. Data is synthetic (4 classes, ~90% background, like the
+# grid labels) with the cell feature width, or the real cached features with
+# --cached (sizes are capped at what the cache holds). The SVC is skipped
+# above --svc-max cells.
+# Usage: python benchmarks/bench_kernel_approx.py [--sizes 1000 2000 4000 8000] [--cached]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kernel_approx import KernelSGDClassifier
+
+SIZES = [1000, 2000, 4000, 8000, 16000]
+N_FEATURES = 3276  # HOG + colour + shape + LBP cell vector
+LATENT_DIM = 50
+SVC_MAX = 8000
+TEST_FRACTION = 0.25
+RANDOM_STATE = 42
+
+
+def synthetic(n, n_features):
+    # Class structure lives in a few latent dimensions spread over many
+    # correlated columns plus noise, as HOG/colour features are; with
+    # thousands of independent noise columns no RBF model learns anything
+    from sklearn.datasets import make_classification
+    Z, y = make_classification(n_samples=n, n_features=LATENT_DIM, n_informative=20, n_redundant=10,
+                               n_classes=4, n_clusters_per_class=2, weights=[0.9, 0.02, 0.04, 0.04],
+                               class_sep=1.5, flip_y=0.01, random_state=RANDOM_STATE)
+    rng = np.random.default_rng(RANDOM_STATE)
+    X = Z @ rng.normal(size=(LATENT_DIM, n_features)) / np.sqrt(LATENT_DIM)
+    X += rng.normal(scale=0.5, size=X.shape)
+    return X, y
+
+
+def cached():
+    from feature_cache import load_dataset, update_cache, load_matrix
+    data = load_dataset()
+    cells = np.zeros(data["labels"].shape, dtype=bool)
+    cells[update_cache(data)] = True
+    return load_matrix(data, cells), data["labels"][cells]
+
+
+def models():
+    from sklearn.svm import SVC
+    return [
+        ("SVC rbf (notebook)", lambda: SVC(probability=True, kernel="rbf", C=10, gamma="scale",
+                                            class_weight="balanced")),
+        ("Nystroem + SGD", lambda: KernelSGDClassifier("nystroem", n_components=1000,
+                                                       random_state=RANDOM_STATE)),
+        ("RFF + SGD", lambda: KernelSGDClassifier("rff", n_components=2000, random_state=RANDOM_STATE)),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Total cells (train + test)")
+    parser.add_argument("--features", type=int, default=N_FEATURES)
+    parser.add_argument("--svc-max", type=int, default=SVC_MAX)
+    parser.add_argument("--cached", action="store_true", help="Use the real feature cache instead of synthetic data")
+    args = parser.parse_args()
+
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X_all, y_all = cached() if args.cached else synthetic(max(args.sizes), args.features)
+    rng = np.random.default_rng(RANDOM_STATE)
+
+    print(f"{'Cells':>7}  {'Model':<20}{'fit s':>9}{'predict s':>11}{'accuracy':>10}{'macro F1':>10}")
+    for size in args.sizes:
+        if size > len(X_all):
+            print(f"{size:>7}  only {len(X_all)} cells available, skipped")
+            continue
+        rows = rng.choice(len(X_all), size, replace=False)
+        X_train, X_test, y_train, y_test = train_test_split(X_all[rows], y_all[rows], test_size=TEST_FRACTION,
+                                                            random_state=RANDOM_STATE, stratify=y_all[rows])
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+
+        for name, make in models():
+            if name.startswith("SVC") and size > args.svc_max:
+                print(f"{size:>7}  {name:<20}{'skipped (> --svc-max)':>40}")
+                continue
+            model = make()
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            t_fit = time.perf_counter() - start
+            start = time.perf_counter()
+            model.predict_proba(X_test)
+            pred = model.predict(X_test)
+            t_pred = time.perf_counter() - start
+            print(f"{size:>7}  {name:<20}{t_fit:>9.2f}{t_pred:>11.3f}{accuracy_score(y_test, pred):>10.3f}"
+                  f"{f1_score(y_test, pred, average='macro'):>10.3f}")
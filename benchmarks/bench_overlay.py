@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+from PIL import Image, ImageDraw
+
+# Grid-label overlay: the three per-image implementations that existed before
+# grid_overlay.py (labeler PIL paste, auto labeler cv2 rectangle/addWeighted,
+# prediction visualizer PIL paste) against grid_overlay.render_overlay, on an
+# 800x600 image with 0, 8 and all 64 cells labeled. "max diff" compares with
+# the labeler's output (the auto labeler drew in BGR with cv2 text, so its
+# output was never the same image).
+# Usage: python benchmarks/bench_overlay.py [repeats]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grid_overlay import (GRID_ROWS, GRID_COLS, IMG_WIDTH, IMG_HEIGHT, CELL_W, CELL_H, COLORS, ALPHA,
+                          build_grid_template, render_overlay)
+
+LABELED_CELLS = [0, 8, 64]
+BGR_COLORS = {label: color[::-1] for label, color in COLORS.items()}
+
+
+def draw_grid_pil(img):
+    draw = ImageDraw.Draw(img)
+    for i in range(1, GRID_COLS):
+        draw.line([(i * CELL_W, 0), (i * CELL_W, IMG_HEIGHT)], fill="yellow", width=1)
+    for i in range(1, GRID_ROWS):
+        draw.line([(0, i * CELL_H), (IMG_WIDTH, i * CELL_H)], fill="yellow", width=1)
+    for i in range(GRID_ROWS * GRID_COLS):
+        draw.text(((i % GRID_COLS) * CELL_W + 2, (i // GRID_COLS) * CELL_H + 2), str(i+1), fill="white")
+
+
+def labeler_paste(rgba_img, labels, overlays):
+    # CricketLabeler.save_and_next (image kept as RGBA)
+    save_img = rgba_img.copy()
+    for idx, val in enumerate(labels):
+        if val != 0 and val in overlays:
+            save_img.paste(overlays[val], ((idx % GRID_COLS) * CELL_W, (idx // GRID_COLS) * CELL_H), overlays[val])
+    draw_grid_pil(save_img)
+    return save_img.convert("RGB")
+
+
+def visualizer_paste(rgb_img, labels, overlays):
+    # visualize_predictions before the template renderer (RGB file -> RGBA)
+    base_img = rgb_img.convert("RGBA")
+    for i in range(64):
+        label = int(labels[i])
+        if label in overlays:
+            base_img.paste(overlays[label], ((i % GRID_COLS) * CELL_W, (i // GRID_COLS) * CELL_H), overlays[label])
+    draw_grid_pil(base_img)
+    return base_img.convert("RGB")
+
+
+def auto_labeler_cv2(bgr_img, labels):
+    img = bgr_img.copy()
+    overlay = img.copy()
+    alpha = 0.27
+    for i, label in enumerate(labels):
+        if label != 0:
+            x1, y1 = (i % GRID_COLS) * CELL_W, (i // GRID_COLS) * CELL_H
+            cv2.rectangle(overlay, (x1, y1), (x1 + CELL_W, y1 + CELL_H), BGR_COLORS.get(label, (255, 255, 255)), -1)
+    cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
+    for i in range(1, GRID_COLS):
+        cv2.line(img, (i * CELL_W, 0), (i * CELL_W, IMG_HEIGHT), (0, 255, 255), 1)
+    for i in range(1, GRID_ROWS):
+        cv2.line(img, (0, i * CELL_H), (IMG_WIDTH, i * CELL_H), (0, 255, 255), 1)
+    for i in range(64):
+        cv2.putText(img, str(i+1), ((i % GRID_COLS) * CELL_W + 5, (i // GRID_COLS) * CELL_H + 15),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    return img
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.uint8)
+    rgb_img = Image.fromarray(base)
+    rgba_img = rgb_img.convert("RGBA")
+    bgr = np.ascontiguousarray(base[:, :, ::-1])
+    overlays = {k: Image.new("RGBA", (CELL_W, CELL_H), v + (ALPHA,)) for k, v in COLORS.items()}
+    build_grid_template()  # warm the template cache
+
+    print(f"{'Labeled':<9}{'Path':<26}{'ms/image':>10}{'vs new':>9}{'max diff':>10}")
+    for n_labeled in LABELED_CELLS:
+        labels = np.zeros(64, dtype=np.uint8)
+        labels[rng.choice(64, n_labeled, replace=False)] = rng.integers(1, 4, n_labeled)
+        grid = labels.tolist()
+
+        t_new, out = best_of(lambda: render_overlay(base, labels), repeats)
+        t_lab, ref = best_of(lambda: labeler_paste(rgba_img, grid, overlays), repeats)
+        t_vis, vis = best_of(lambda: visualizer_paste(rgb_img, labels, overlays), repeats)
+        t_cv2, _ = best_of(lambda: auto_labeler_cv2(bgr, grid), repeats)
+        ref = np.asarray(ref).astype(int)
+
+        rows = [("labeler (PIL paste)", t_lab, np.abs(ref - np.asarray(ref)).max()),
+                ("visualizer (PIL paste)", t_vis, np.abs(np.asarray(vis).astype(int) - ref).max()),
+                ("auto labeler (cv2)", t_cv2, None),
+                ("grid_overlay", t_new, np.abs(out.astype(int) - ref).max())]
+        for name, t, diff in rows:
+            diff = "-" if diff is None else str(diff)
+            print(f"{n_labeled:<9}{name:<26}{t:>10.2f}{t / t_new:>8.1f}x{diff:>10}")
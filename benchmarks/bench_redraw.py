@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import glob
+import importlib
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Per-click redraw latency of each visualizer panel, headless (Agg backend).
+# Features are precomputed so only rendering is timed:
+#   full  - a complete figure draw on every click (layout change / no blit)
+#   blit  - restore cached background and redraw the changed artists only
+# Usage: python benchmarks/bench_redraw.py [image_folder] [clicks]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from visualizer_cache import load_resized
+
+VISUALIZERS = [
+    "hog_visualizer",
+    "color_visualizer",
+    "convolution_visualizer",
+    "shape_visualizer",
+    "feature_comparison_visualizer",
+]
+
+
+def sample_image(folder):
+    paths = sorted(glob.glob(os.path.join(folder, "*.jpg")) + glob.glob(os.path.join(folder, "*.png")))
+    if paths:
+        return np.array(load_resized(paths[0]))
+    print(f"No images in {folder}, using random noise")
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (600, 800, 3), dtype=np.uint8)
+
+
+def time_clicks(panel, canvas, cells, full):
+    timings = []
+    for features, row, col in cells:
+        start = time.perf_counter()
+        panel.render(features, row, col)
+        panel.refresh(full=full)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def bench(module_name, img, n_clicks):
+    module = importlib.import_module(module_name)
+    plugin = module.PLUGIN
+    cell_h = 600 // module.GRID_ROWS
+    cell_w = 800 // module.GRID_COLS
+
+    rng = np.random.default_rng(0)
+    cells = []
+    for _ in range(n_clicks):
+        row = int(rng.integers(module.GRID_ROWS))
+        col = int(rng.integers(module.GRID_COLS))
+        cell = img[row * cell_h:(row + 1) * cell_h, col * cell_w:(col + 1) * cell_w]
+        cells.append((plugin.compute_cell(np.ascontiguousarray(cell)), row, col))
+
+    fig = Figure(figsize=plugin.figsize)
+    canvas = FigureCanvasAgg(fig)
+    panel = plugin.panel_class(fig)
+    panel.attach(canvas)
+
+    # Warm up: first render sizes artists and caches the background
+    panel.render(*cells[0])
+    panel.refresh(full=True)
+
+    full = time_clicks(panel, canvas, cells, full=True)
+    blit = time_clicks(panel, canvas, cells, full=False)
+    return full, blit
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else "processed_images"
+    n_clicks = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    img = sample_image(folder)
+
+    print(f"{'Visualizer':<32}{'full p50':>10}{'full p95':>10}{'blit p50':>10}{'blit p95':>10}  (ms per click)")
+    for module_name in VISUALIZERS:
+        full, blit = bench(module_name, img, n_clicks)
+        print(f"{module_name:<32}{np.percentile(full, 50):>10.1f}{np.percentile(full, 95):>10.1f}"
+              f"{np.percentile(blit, 50):>10.1f}{np.percentile(blit, 95):>10.1f}")
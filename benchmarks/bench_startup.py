@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import subprocess
+
+# Startup cost of the GUI tools, each measured in a fresh interpreter:
+#   import  - cumulative import time of the tool module (python -X importtime)
+#   window  - process spawn until the Tk window has been mapped and drawn
+#             (needs a display; reported as n/a without one)
+# Heavy libraries should load in the background after the window is up
+# (deferred_import.py), so both numbers stay within the budgets below.
+# Usage: python benchmarks/bench_startup.py [runs]
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 200
+WINDOW_BUDGET_MS = 500
+HEAVIEST_SHOWN = 3
+
+# module -> statement creating the app from `mod` and `root`
+TOOLS = {
+    "labeler": "mod.CricketLabeler(root)",
+    "hog_visualizer": "mod.HOGVisualizer(root)",
+    "color_visualizer": "mod.ColorVisualizer(root)",
+    "convolution_visualizer": "mod.ConvolutionVisualizer(root)",
+    "shape_visualizer": "mod.ShapeVisualizer(root)",
+    "feature_comparison_visualizer": "mod.FeatureComparisonVisualizer(root)",
+    "workbench": "mod.FeatureWorkbench(root, mod.load_plugins(mod.PLUGIN_MODULES))",
+}
+
+WINDOW_SCRIPT = """
+import sys, time, importlib, tkinter as tk
+mod = importlib.import_module({module!r})
+root = tk.Tk()
+app = {factory}
+root.update()
+print(time.time())
+root.destroy()
+"""
+
+
+def import_time(module):
+    # Returns (cumulative ms, [(ms, name)] of the heaviest top-level imports)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=REPO_DIR, capture_output=True, text=True)
+    total = None
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        ms = int(cumulative) / 1000
+        if name.strip() == module:
+            total = ms
+        elif name.startswith("   ") and not name.startswith("     "):
+            # One indent level below the tool module = imported directly by it
+            top_level.append((ms, name.strip()))
+    top_level.sort(reverse=True)
+    return total, top_level[:HEAVIEST_SHOWN]
+
+
+def window_time(module, factory):
+    script = WINDOW_SCRIPT.format(module=module, factory=factory)
+    start = time.time()
+    proc = subprocess.run([sys.executable, "-c", script], cwd=REPO_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return (float(proc.stdout.strip().splitlines()[-1]) - start) * 1000
+
+
+def median(values):
+    values = sorted(v for v in values if v is not None)
+    return values[len(values) // 2] if values else None
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    over_budget = False
+
+    print(f"{'Tool':<32}{'import ms':>10}{'window ms':>11}  heaviest direct imports")
+    for module, factory in TOOLS.items():
+        imports = [import_time(module) for _ in range(runs)]
+        imp = median([total for total, _ in imports])
+        win = median([window_time(module, factory) for _ in range(runs)])
+        heaviest = ", ".join(f"{name} {ms:.0f}" for ms, name in imports[-1][1])
+
+        win_text = f"{win:.0f}" if win is not None else "n/a"
+        flag = ""
+        if (imp is not None and imp > IMPORT_BUDGET_MS) or (win is not None and win > WINDOW_BUDGET_MS):
+            flag = "  OVER BUDGET"
+            over_budget = True
+        print(f"{module:<32}{imp:>10.0f}{win_text:>11}  {heaviest}{flag}")
+
+    print(f"Budgets: import {IMPORT_BUDGET_MS} ms, first window {WINDOW_BUDGET_MS} ms")
+    sys.exit(1 if over_budget else 0)
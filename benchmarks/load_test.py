@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.parse
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Load generator for serve.py: --concurrency clients send --requests
+# predictions in total, cycling through the images of a folder (as uploaded
+# bytes, or as paths with --paths), and report latency percentiles,
+# throughput and the server's mean batch size.
+# Usage: python benchmarks/load_test.py [--url http://127.0.0.1:8765] [--concurrency 8] [--requests 200]
+
+URL = "http://127.0.0.1:8765"
+IMAGE_DIR = "processed_images"
+CONCURRENCY = 8
+REQUESTS = 200
+TIMEOUT = 120
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def request(url, path, send_paths):
+    # (latency seconds, error message or None)
+    if send_paths:
+        body = json.dumps({"path": path}).encode("utf-8")
+        req = urllib.request.Request(f"{url}/predict", data=body, headers={"Content-Type": "application/json"})
+    else:
+        with open(path, "rb") as f:
+            body = f.read()
+        req = urllib.request.Request(f"{url}/predict?name={urllib.parse.quote(os.path.basename(path))}", data=body,
+                                     headers={"Content-Type": "application/octet-stream"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=TIMEOUT) as response:
+            result = json.load(response)
+        error = None if len(result.get("labels", {})) == 64 else "incomplete response"
+    except urllib.error.HTTPError as e:
+        error = f"HTTP {e.code}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - start, error
+
+
+def health(url):
+    with urllib.request.urlopen(f"{url}/health", timeout=TIMEOUT) as response:
+        return json.load(response)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--folder", default=IMAGE_DIR)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--paths", action="store_true", help="Send image paths instead of image bytes")
+    args = parser.parse_args()
+
+    images = sorted(os.path.join(args.folder, f) for f in os.listdir(args.folder) if f.lower().endswith(EXTENSIONS))
+    if not images:
+        print(f"No images in {args.folder}")
+        sys.exit(1)
+    if args.paths:
+        images = [os.path.abspath(p) for p in images]
+    try:
+        before = health(args.url)
+    except Exception as e:
+        print(f"Server not reachable at {args.url}: {e}")
+        sys.exit(1)
+
+    jobs = [images[i % len(images)] for i in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda p: request(args.url, p, args.paths), jobs))
+    elapsed = time.perf_counter() - start
+    after = health(args.url)
+
+    latencies = np.array([t for t, error in results if error is None]) * 1000
+    errors = [error for _, error in results if error is not None]
+    batches = after["batches"] - before["batches"]
+    mean_batch = (after["images"] - before["images"]) / batches if batches else 0.0
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{'paths' if args.paths else 'image bytes'} from {args.folder}")
+    if len(latencies):
+        print(f"Latency ms: p50 {np.percentile(latencies, 50):.1f}  p90 {np.percentile(latencies, 90):.1f}  "
+              f"p99 {np.percentile(latencies, 99):.1f}  max {latencies.max():.1f}")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} images/s ({elapsed:.1f}s total), "
+          f"mean server batch {mean_batch:.2f} images")
+    if errors:
+        print(f"{len(errors)} errors, e.g. {errors[0]}")
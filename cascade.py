@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+from cell_features import GRID_ROWS, GRID_COLS, CELL_W, CELL_H, extract_image_features
+
+# Two-stage cascade for grid inference. Stage one computes a handful of cheap
+# statistics for all 64 cells at once from block sums over the whole image
+# (colour means and spreads, grey-level variance, Canny edge density, mean
+# gradient magnitude, cell position) and a tiny model scores how likely each
+# cell is to hold an object. Only cells scoring at or above a threshold,
+# calibrated for a target object recall (train_cascade.py), go through the
+# full HOG/colour/Hough/LBP extractor and the main classifier; the rest are
+# labelled background. A bundle carries the stage in bundle["cascade"]:
+# {"model", "threshold", "recall"}.
+
+CHEAP_FEATURES = ["mean_r", "mean_g", "mean_b", "std_r", "std_g", "std_b", "std_gray",
+                  "edge_density", "gradient", "row", "col"]
+CANNY_LOW, CANNY_HIGH = 50, 150  # As in the shape features
+BACKGROUND = 0
+
+
+def block_sums(plane):
+    # (GRID_ROWS, GRID_COLS) sum of a (IMG_HEIGHT, IMG_WIDTH) plane per cell;
+    # on a fixed grid the integral-image lookup reduces to one reshape-sum
+    return plane.reshape(GRID_ROWS, CELL_H, GRID_COLS, CELL_W).sum(axis=(1, 3))
+
+
+def cheap_features(img):
+    # (64, len(CHEAP_FEATURES)) statistics for an 800x600 RGB image
+    n = CELL_W * CELL_H
+    rgb = img.astype(np.float32)
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    gray_f = gray.astype(np.float32)
+    edges = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH) > 0
+    gradient = cv2.magnitude(cv2.Sobel(gray_f, cv2.CV_32F, 1, 0), cv2.Sobel(gray_f, cv2.CV_32F, 0, 1))
+
+    columns = []
+    means = [block_sums(rgb[:, :, ch]) / n for ch in range(3)]
+    columns += means
+    for ch in range(3):
+        columns.append(np.sqrt(np.maximum(block_sums(rgb[:, :, ch] ** 2) / n - means[ch] ** 2, 0)))
+    gray_mean = block_sums(gray_f) / n
+    columns.append(np.sqrt(np.maximum(block_sums(gray_f ** 2) / n - gray_mean ** 2, 0)))
+    columns.append(block_sums(edges.astype(np.float32)) / n)
+    columns.append(block_sums(gradient) / n)
+    rows, cols = np.mgrid[0:GRID_ROWS, 0:GRID_COLS]
+    columns += [rows / (GRID_ROWS - 1), cols / (GRID_COLS - 1)]
+    return np.stack([c.ravel() for c in columns], axis=1)
+
+
+def build_stage_model():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(StandardScaler(), LogisticRegression(class_weight="balanced", max_iter=1000))
+
+
+def stage_scores(model, cheap):
+    # Probability that each row holds an object (any class but background)
+    return model.predict_proba(cheap)[:, list(model.classes_).index(True)]
+
+
+def calibrate_threshold(scores, is_object, recall):
+    # Highest threshold that keeps at least `recall` of the object cells
+    positive = np.sort(scores[is_object])
+    if len(positive) == 0:
+        return 0.0
+    return float(positive[int(np.floor((1.0 - recall) * len(positive)))])
+
+
+def cascade_cells(img, cascade):
+    # Indices of the cells stage one passes to the full extractor
+    if cascade is None:
+        return np.arange(GRID_ROWS * GRID_COLS)
+    return np.flatnonzero(stage_scores(cascade["model"], cheap_features(img)) >= cascade["threshold"])
+
+
+def extract_cascade(img, config, cascade):
+    # (passed cells, their full features or None if no cell passed)
+    cells = cascade_cells(img, cascade)
+    if len(cells) == 0:
+        return cells, None
+    return cells, extract_image_features(img, config, cells=cells)
+
+
+def fill_proba(cells, proba, n_classes):
+    # (64, n_classes) with the passed cells' probabilities and certain
+    # background elsewhere
+    full = np.zeros((GRID_ROWS * GRID_COLS, n_classes))
+    full[:, BACKGROUND] = 1.0
+    if len(cells):
+        full[cells] = proba
+    return full
@@ -0,0 +1,153 @@
+import json
+import hashlib
+import cv2
+import numpy as np
+from skimage.feature import hog
+from skimage.feature import local_binary_pattern
+
+# Configuration (same as cricket_classification.ipynb)
+IMG_WIDTH = 800
+IMG_HEIGHT = 600
+GRID_ROWS = 8
+GRID_COLS = 8
+CELL_W = IMG_WIDTH // GRID_COLS
+CELL_H = IMG_HEIGHT // GRID_ROWS
+
+# Feature families computed for every cell, in vector order.
+# Trained models store the config they were fitted with so inference
+# always rebuilds the exact same vector. "hog" may also be a sorted list of
+# HOG block indices (see hog_blocks) to compute only those blocks.
+DEFAULT_FEATURE_CONFIG = {
+    "hog": True,
+    "color": True,
+    "shape": True,
+    "lbp": True,
+}
+
+FEATURE_FAMILIES = list(DEFAULT_FEATURE_CONFIG)
+
+LBP_BINS = 10  # P=8 uniform LBP gives 10 bins
+
+# HOG layout: 9 orientations, 8x8-pixel cells, 2x2-cell blocks, so a
+# 100x75 grid cell has 8 x 11 blocks of 36 values, row-major
+HOG_ORIENTATIONS = 9
+HOG_PIXELS = 8
+HOG_BLOCKS_ROW = CELL_H // HOG_PIXELS - 1
+HOG_BLOCKS_COL = CELL_W // HOG_PIXELS - 1
+HOG_BLOCK_SIZE = 4 * HOG_ORIENTATIONS
+HOG_EPS = 1e-5
+
+
+def config_fingerprint(config):
+    # Stable short hash of a feature config, used to match models to features
+    blob = json.dumps(config, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()[:12]
+
+
+def load_image(img_path):
+    return prepare_image(cv2.imread(img_path))
+
+
+def decode_image(data):
+    # Same as load_image for encoded image bytes (JPEG, PNG, ...)
+    return prepare_image(cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR))
+
+
+def prepare_image(img):
+    if img is None:
+        return None
+    # Resize image to ensure consistent dimensions
+    img = cv2.resize(img, (IMG_WIDTH, IMG_HEIGHT))
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def cell_bounds(i):
+    r = i // GRID_COLS
+    c = i % GRID_COLS
+    x1 = c * CELL_W
+    y1 = r * CELL_H
+    return x1, y1, x1 + CELL_W, y1 + CELL_H
+
+
+def hog_blocks(cell, blocks):
+    # The given blocks of hog(cell, ...) above, in that order: NumPy cell
+    # histograms (hog_render) and L2-Hys normalization of the chosen blocks
+    # only. Matches skimage to ~1e-7.
+    from hog_render import orientation_histogram
+    hist = orientation_histogram(cell, HOG_ORIENTATIONS, (HOG_PIXELS, HOG_PIXELS))
+    r, c = np.divmod(np.asarray(blocks, dtype=np.intp), HOG_BLOCKS_COL)
+    block = np.stack([hist[r, c], hist[r, c + 1], hist[r + 1, c], hist[r + 1, c + 1]], axis=1)
+    block = block.reshape(len(r), HOG_BLOCK_SIZE)
+    block = block / np.sqrt((block ** 2).sum(axis=1, keepdims=True) + HOG_EPS ** 2)
+    block = np.minimum(block, 0.2)
+    block = block / np.sqrt((block ** 2).sum(axis=1, keepdims=True) + HOG_EPS ** 2)
+    return block.ravel()
+
+
+def extract_cell_features(cell, config=None):
+    config = config or DEFAULT_FEATURE_CONFIG
+    parts = []
+
+    # --- Feature 1: HOG ---
+    if isinstance(config.get("hog"), list):
+        parts.append(hog_blocks(cell, config["hog"]))
+    elif config.get("hog"):
+        fd = hog(cell, orientations=9, pixels_per_cell=(8, 8),
+                 cells_per_block=(2, 2), visualize=False, channel_axis=-1)
+        parts.append(fd)
+
+    # --- Feature 2: Color Histogram ---
+    if config.get("color"):
+        for ch in range(3):
+            hist = cv2.calcHist([cell], [ch], None, [32], [0, 256])
+            parts.append(cv2.normalize(hist, hist).flatten())
+
+    gray = None
+    if config.get("shape") or config.get("lbp"):
+        gray = cv2.cvtColor(cell, cv2.COLOR_RGB2GRAY)
+
+    # --- Feature 3: Shape Counts ---
+    if config.get("shape"):
+        edges = cv2.Canny(gray, 50, 150)
+
+        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=30, minLineLength=20, maxLineGap=10)
+        num_lines = len(lines) if lines is not None else 0
+
+        circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, dp=1.2, minDist=20,
+                                   param1=50, param2=30, minRadius=5, maxRadius=50)
+        num_circles = len(circles[0, :]) if circles is not None else 0
+        parts.append([num_lines, num_circles])
+
+    # --- Feature 4: LBP (Texture) ---
+    if config.get("lbp"):
+        lbp = local_binary_pattern(gray, P=8, R=1, method='uniform')
+        lbp_hist, _ = np.histogram(lbp.ravel(), bins=LBP_BINS, range=(0, LBP_BINS), density=True)
+        parts.append(lbp_hist)
+
+    return np.concatenate(parts).astype(np.float64)
+
+
+def feature_layout(config=None):
+    # family -> (start, stop) columns of the cell vector, measured on a blank
+    # cell so it always matches extract_cell_features
+    config = config or DEFAULT_FEATURE_CONFIG
+    blank = np.zeros((CELL_H, CELL_W, 3), dtype=np.uint8)
+    layout = {}
+    start = 0
+    for family in FEATURE_FAMILIES:
+        if config.get(family):
+            width = len(extract_cell_features(blank, {family: config[family]}))
+            layout[family] = (start, start + width)
+            start += width
+    return layout
+
+
+def extract_image_features(img, config=None, cells=None):
+    # Returns a (len(cells), n_features) matrix, rows in cell order
+    if cells is None:
+        cells = range(GRID_ROWS * GRID_COLS)
+    rows = []
+    for i in cells:
+        x1, y1, x2, y2 = cell_bounds(i)
+        rows.append(extract_cell_features(img[y1:y2, x1:x2], config))
+    return np.vstack(rows)
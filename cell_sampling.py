@@ -0,0 +1,26 @@
+import numpy as np
+
+# Training-cell selection for the grid labels, where most of the 64 cells of
+# every image are background. Instead of SMOTE-inflating the full matrix,
+# training keeps every object cell plus a random fraction of background
+# cells, then adds hard negatives: each mining round scores a fresh random
+# pool of unseen background cells with the current model and keeps the ones
+# it gets wrong. Masks are (n_images, 64) bool, as taken by
+# feature_cache.update_cache / load_matrix, so cells outside every mask are
+# never featurized.
+
+BACKGROUND = 0
+
+
+def sample_cells(labels, background_fraction, rng):
+    # Every object cell plus each background cell with probability background_fraction
+    positive = labels != BACKGROUND
+    return positive | (~positive & (rng.random(labels.shape) < background_fraction))
+
+
+def draw_pool(labels, eligible, size, rng):
+    # Up to size random background cells among the eligible ones
+    candidates = np.flatnonzero((eligible & (labels == BACKGROUND)).ravel())
+    pool = np.zeros(labels.size, dtype=bool)
+    pool[rng.choice(candidates, min(size, len(candidates)), replace=False)] = True
+    return pool.reshape(labels.shape)
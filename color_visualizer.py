@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from panel_render import PanelFigure, PanelPlugin
+from image_manifest import list_images_async
+from deferred_import import PLOT_MODULES, import_async
+from visualizer_cache import CellFeatureCache, load_resized, neighbour_paths
 
 # Configuration
 IMG_WIDTH = 800
@@ -12,6 +14,46 @@ IMG_HEIGHT = 600
 GRID_ROWS = 8
 GRID_COLS = 8
 
+def compute_cell(cell_array):
+    # 256-bin histogram per RGB channel
+    hists = [np.histogram(cell_array[:, :, i], bins=256, range=(0, 256))[0] for i in range(3)]
+    return {"cell": cell_array, "hists": hists}
+
+class ColorPanel(PanelFigure):
+    def __init__(self, fig):
+        super().__init__(fig)
+        self.axs = fig.subplots(2, 1)
+        fig.tight_layout(pad=3.0)
+        cell_shape = (IMG_HEIGHT // GRID_ROWS, IMG_WIDTH // GRID_COLS)
+        
+        self.animate_title(self.axs[0], "Selected Cell")
+        self.axs[0].axis('off')
+        self.img_cell = self.image_artist(self.axs[0], cell_shape + (3,))
+        
+        self.axs[1].set_title("RGB Color Histograms")
+        self.axs[1].set_xlabel("Pixel Value")
+        self.axs[1].set_ylabel("Frequency")
+        self.axs[1].set_xlim(0, 255)
+        
+        # Plot Histograms
+        colors = ('red', 'green', 'blue')
+        self.lines = [
+            self.animate(self.axs[1].plot(np.arange(256), np.zeros(256), color=color, alpha=0.7, label=color.upper())[0])
+            for color in colors
+        ]
+
+    def render(self, features, row, col):
+        self.set_image(self.img_cell, features["cell"])
+        self.set_title(self.axs[0], f"Cell ({row+1}, {col+1})")
+        
+        for line, hist in zip(self.lines, features["hists"]):
+            line.set_ydata(hist)
+            line.set_visible(True)
+        self.fit_ylim(self.axs[1], max(h.max() for h in features["hists"]))
+
+# Entry for workbench.py
+PLUGIN = PanelPlugin("Color", compute_cell, ColorPanel, (5, 8))
+
 class ColorVisualizer:
     def __init__(self, root):
         self.root = root
@@ -22,6 +64,11 @@ class ColorVisualizer:
         self.current_image_name = ""
         self.image_list = []
         self.current_img_index = 0
+        self.current_path = None
+        self.selected = None  # (row, col)
+        
+        # Features for every cell are precomputed in the background on image load
+        self.cache = CellFeatureCache(compute_cell, GRID_ROWS, GRID_COLS)
         
         # Layout
         self.main_frame = tk.Frame(self.root)
@@ -55,19 +102,29 @@ class ColorVisualizer:
         self.right_panel = tk.Frame(self.main_frame)
         self.right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Matplotlib Figure
-        self.fig, self.axs = plt.subplots(2, 1, figsize=(5, 8))
-        self.fig.tight_layout(pad=3.0)
+        # Plots are built once matplotlib has been imported in the background,
+        # so the window appears without waiting for it
+        self.panel = None
+        self.lbl_loading = tk.Label(self.right_panel, text="Loading plots...")
+        self.lbl_loading.pack(expand=True)
+        import_async(self.root, PLOT_MODULES + PLUGIN.heavy_modules, self.build_plots)
+
+    def build_plots(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.lbl_loading.destroy()
         
-        self.axs[0].set_title("Selected Cell")
-        self.axs[0].axis('off')
-        
-        self.axs[1].set_title("RGB Color Histograms")
-        self.axs[1].set_xlabel("Pixel Value")
-        self.axs[1].set_ylabel("Frequency")
+        # Matplotlib Figure (artists are created once and updated per click)
+        self.fig = Figure(figsize=PLUGIN.figsize)
+        self.panel = PLUGIN.panel_class(self.fig)
         
         self.chart = FigureCanvasTkAgg(self.fig, self.right_panel)
         self.chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.panel.attach(self.chart)
+        
+        # A cell clicked while loading is shown now
+        if self.selected is not None:
+            self.visualize_cell(*self.selected)
 
     def load_folder(self):
         initial_dir = os.path.join(os.getcwd(), "raw_images")
@@ -78,15 +135,15 @@ class ColorVisualizer:
         if not folder_path:
             return
             
-        # Get all images
-        valid_exts = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        self.image_list = [
-            os.path.join(folder_path, f) 
-            for f in os.listdir(folder_path) 
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
         
         if not self.image_list:
+            self.lbl_status.config(text="Load a folder to start")
             messagebox.showerror("Error", "No images found in folder!")
             return
             
@@ -100,15 +157,13 @@ class ColorVisualizer:
         filepath = self.image_list[self.current_img_index]
         
         try:
-            pil_img = Image.open(filepath)
-            
-            # Check dimensions (optional, but good for consistency)
-            w, h = pil_img.size
-            if w < IMG_WIDTH or h < IMG_HEIGHT:
-                print(f"Warning: {os.path.basename(filepath)} is small ({w}x{h})")
-
-            pil_img = pil_img.resize((IMG_WIDTH, IMG_HEIGHT), Image.Resampling.LANCZOS)
-            self.current_pil_img = pil_img.convert("RGB")
+            # Decoded copy from the cache if the image was prefetched
+            pil_img = self.cache.get_image(filepath)
+            if pil_img is None:
+                pil_img = load_resized(filepath)
+            self.current_pil_img = pil_img
+            self.current_path = filepath
+            self.cache.prefetch(neighbour_paths(self.image_list, self.current_img_index), image=pil_img)
             self.current_image_name = os.path.basename(filepath)
             
             self.tk_img = ImageTk.PhotoImage(self.current_pil_img)
@@ -118,12 +173,10 @@ class ColorVisualizer:
             self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
             
             # Clear plots
-            for ax in self.axs:
-                ax.clear()
-            self.axs[0].set_title("Selected Cell")
-            self.axs[1].set_title("RGB Color Histograms")
-            self.axs[0].axis('off')
-            self.chart.draw()
+            self.selected = None
+            if self.panel is not None:
+                self.panel.clear()
+                self.panel.refresh()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {e}")
@@ -173,30 +226,14 @@ class ColorVisualizer:
         x2 = x1 + cell_w
         y2 = y1 + cell_h
         
-        # Extract cell image
-        cell_img = self.current_pil_img.crop((x1, y1, x2, y2))
-        cell_array = np.array(cell_img)
+        # Precomputed cell features (computed now if the worker has not reached this cell)
+        features = self.cache.get_cell(self.current_path, row, col)
         
         # Update Plots
-        self.axs[0].clear()
-        self.axs[0].imshow(cell_array)
-        self.axs[0].set_title(f"Cell ({row+1}, {col+1})")
-        self.axs[0].axis('off')
-        
-        self.axs[1].clear()
-        self.axs[1].set_title("RGB Color Histograms")
-        self.axs[1].set_xlabel("Pixel Value")
-        self.axs[1].set_ylabel("Frequency")
-        
-        # Plot Histograms
-        colors = ('red', 'green', 'blue')
-        for i, color in enumerate(colors):
-            hist, bins = np.histogram(cell_array[:, :, i], bins=256, range=(0, 256))
-            self.axs[1].plot(bins[:-1], hist, color=color, alpha=0.7, label=color.upper())
-            
-        self.axs[1].set_xlim(0, 255)
-        
-        self.chart.draw()
+        self.selected = (row, col)
+        if self.panel is not None:
+            self.panel.render(features, row, col)
+            self.panel.refresh()
         
         # Highlight cell on canvas
         self.canvas.delete("highlight")
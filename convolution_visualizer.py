@@ -3,9 +3,11 @@ from tkinter import filedialog, messagebox
 from PIL import Image, ImageTk
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import cv2
+from panel_render import PanelFigure, PanelPlugin
+from image_manifest import list_images_async
+from deferred_import import PLOT_MODULES, import_async
+from visualizer_cache import CellFeatureCache, load_resized, neighbour_paths
+from kernel_responses import PRESETS, ResponseCache, format_kernel, parse_kernel, preset_kernel
 
 # Configuration
 IMG_WIDTH = 800
@@ -13,6 +15,82 @@ IMG_HEIGHT = 600
 GRID_ROWS = 8
 GRID_COLS = 8
 
+# Define Kernels
+
+# Edge Detection (Laplacian-like)
+KERNEL_EDGE = np.array([[-1, -1, -1],
+                        [-1,  8, -1],
+                        [-1, -1, -1]])
+                        
+# Sharpen
+KERNEL_SHARPEN = np.array([[0, -1, 0],
+                           [-1, 5, -1],
+                           [0, -1, 0]])
+                           
+# Box Blur
+KERNEL_BLUR = np.ones((5, 5), np.float32) / 25
+
+# Live kernel editing (standalone tool): responses are computed over the whole
+# image once the kernel has stopped changing for DEBOUNCE_MS
+DEFAULT_PRESET = "Edge (Laplacian)"
+MAX_KERNEL_RADIUS = 15  # Slider range: 3x3 ... 31x31
+DEBOUNCE_MS = 60
+LIVE_FIGSIZE = (8, 11)
+
+def compute_cell(cell_array):
+    # Heavy imports are deferred until the first cell is computed
+    import cv2
+    # Apply Convolutions
+    return {
+        "cell": cell_array,
+        "edge": cv2.filter2D(cell_array, -1, KERNEL_EDGE),
+        "sharpen": cv2.filter2D(cell_array, -1, KERNEL_SHARPEN),
+        "blur": cv2.filter2D(cell_array, -1, KERNEL_BLUR),
+    }
+
+class ConvolutionPanel(PanelFigure):
+    # (feature key, title) for the 2x2 grid
+    VIEWS = [("cell", "Original Cell"), ("edge", "Edge Detection"),
+             ("sharpen", "Sharpen"), ("blur", "Box Blur")]
+
+    def __init__(self, fig, live_kernel=False):
+        super().__init__(fig)
+        # Optional third row: response and weights of the live-edited kernel
+        self.axs = fig.subplots(3 if live_kernel else 2, 2)
+        fig.tight_layout(pad=3.0)
+        cell_shape = (IMG_HEIGHT // GRID_ROWS, IMG_WIDTH // GRID_COLS)
+        
+        self.images = []
+        for ax, (_, title) in zip(self.axs.flat, self.VIEWS):
+            ax.set_title(title)
+            ax.axis('off')
+            self.images.append(self.image_artist(ax, cell_shape + (3,)))
+        
+        self.img_live = None
+        if live_kernel:
+            ax_live, ax_kernel = self.axs[2]
+            self.animate_title(ax_live, "Live Kernel")
+            ax_live.axis('off')
+            self.img_live = self.image_artist(ax_live, cell_shape + (3,))
+            self.animate_title(ax_kernel, "Kernel Weights")
+            ax_kernel.axis('off')
+            self.img_kernel = self.image_artist(ax_kernel, (3, 3), cmap="coolwarm")
+
+    def render(self, features, row, col):
+        for artist, (key, _) in zip(self.images, self.VIEWS):
+            self.set_image(artist, features[key])
+        
+        if self.img_live is not None and "live" in features:
+            self.set_image(self.img_live, features["live"])
+            self.set_title(self.axs[2][0], f"Live: {features['kernel_name']}")
+            self.set_image(self.img_kernel, features["kernel"])
+            # Zero weights in the middle of the diverging colormap
+            limit = float(np.abs(features["kernel"]).max()) or 1.0
+            self.img_kernel.set_clim(-limit, limit)
+
+# Entry for workbench.py
+PLUGIN = PanelPlugin("Convolution", compute_cell, ConvolutionPanel, (8, 8), heavy_modules=["cv2"])
+
 class ConvolutionVisualizer:
     def __init__(self, root):
         self.root = root
@@ -23,6 +101,18 @@ class ConvolutionVisualizer:
         self.current_image_name = ""
         self.image_list = []
         self.current_img_index = 0
+        self.current_path = None
+        self.selected = None  # (row, col)
+        
+        # Live kernel: whole-image responses cached per (image, kernel)
+        self.responses = ResponseCache()
+        self.kernel = preset_kernel(DEFAULT_PRESET, 3)
+        self.kernel_name = f"{DEFAULT_PRESET} 3x3"
+        self.update_job = None
+        self.show_response = tk.BooleanVar(value=False)
+        
+        # Features for every cell are precomputed in the background on image load
+        self.cache = CellFeatureCache(compute_cell, GRID_ROWS, GRID_COLS)
         
         # Layout
         self.main_frame = tk.Frame(self.root)
@@ -51,29 +141,56 @@ class ConvolutionVisualizer:
         
         self.lbl_status = tk.Label(self.left_panel, text="Load a folder to start")
         self.lbl_status.pack()
+        
+        # Live kernel editor: preset + size slider, or custom values
+        kernel_frame = tk.LabelFrame(self.left_panel, text="Live Kernel")
+        kernel_frame.pack(fill=tk.X, pady=5)
+        
+        preset_frame = tk.Frame(kernel_frame)
+        preset_frame.pack(side=tk.LEFT, padx=5)
+        self.preset = tk.StringVar(value=DEFAULT_PRESET)
+        tk.OptionMenu(preset_frame, self.preset, *PRESETS, command=lambda _: self.on_preset_changed()).pack(side=tk.TOP)
+        self.radius = tk.IntVar(value=1)
+        tk.Scale(preset_frame, from_=1, to=MAX_KERNEL_RADIUS, orient=tk.HORIZONTAL, label="Radius (size = 2r + 1)",
+                 variable=self.radius, command=lambda _: self.on_preset_changed()).pack(side=tk.TOP, fill=tk.X)
+        tk.Checkbutton(preset_frame, text="Show Full-Image Response", variable=self.show_response,
+                       command=self.show_image).pack(side=tk.TOP)
+        
+        self.kernel_text = tk.Text(kernel_frame, width=36, height=6, font=("Courier", 9))
+        self.kernel_text.pack(side=tk.LEFT, padx=5)
+        self.kernel_text.insert("1.0", format_kernel(self.kernel))
+        tk.Button(kernel_frame, text="Apply Custom", command=self.apply_custom_kernel).pack(side=tk.LEFT, padx=5)
+        
+        self.lbl_kernel = tk.Label(self.left_panel, text="")
+        self.lbl_kernel.pack()
 
         # Right Panel: Plots
         self.right_panel = tk.Frame(self.main_frame)
         self.right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Matplotlib Figure (2x2 grid)
-        self.fig, self.axs = plt.subplots(2, 2, figsize=(8, 8))
-        self.fig.tight_layout(pad=3.0)
-        
-        self.axs[0, 0].set_title("Original Cell")
-        self.axs[0, 0].axis('off')
-        
-        self.axs[0, 1].set_title("Edge Detection")
-        self.axs[0, 1].axis('off')
-        
-        self.axs[1, 0].set_title("Sharpen")
-        self.axs[1, 0].axis('off')
+        # Plots are built once matplotlib has been imported in the background,
+        # so the window appears without waiting for it
+        self.panel = None
+        self.lbl_loading = tk.Label(self.right_panel, text="Loading plots...")
+        self.lbl_loading.pack(expand=True)
+        import_async(self.root, PLOT_MODULES + PLUGIN.heavy_modules, self.build_plots)
+
+    def build_plots(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.lbl_loading.destroy()
         
-        self.axs[1, 1].set_title("Box Blur")
-        self.axs[1, 1].axis('off')
+        # Matplotlib Figure (artists are created once and updated per click)
+        self.fig = Figure(figsize=LIVE_FIGSIZE)
+        self.panel = ConvolutionPanel(self.fig, live_kernel=True)
         
         self.chart = FigureCanvasTkAgg(self.fig, self.right_panel)
         self.chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.panel.attach(self.chart)
+        
+        # A cell clicked while loading is shown now
+        if self.selected is not None:
+            self.visualize_cell(*self.selected)
 
     def load_folder(self):
         initial_dir = os.path.join(os.getcwd(), "raw_images")
@@ -84,15 +201,15 @@ class ConvolutionVisualizer:
         if not folder_path:
             return
             
-        # Get all images
-        valid_exts = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        self.image_list = [
-            os.path.join(folder_path, f) 
-            for f in os.listdir(folder_path) 
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
         
         if not self.image_list:
+            self.lbl_status.config(text="Load a folder to start")
             messagebox.showerror("Error", "No images found in folder!")
             return
             
@@ -106,37 +223,80 @@ class ConvolutionVisualizer:
         filepath = self.image_list[self.current_img_index]
         
         try:
-            pil_img = Image.open(filepath)
-            
-            # Check dimensions
-            w, h = pil_img.size
-            if w < IMG_WIDTH or h < IMG_HEIGHT:
-                print(f"Warning: {os.path.basename(filepath)} is small ({w}x{h})")
-
-            pil_img = pil_img.resize((IMG_WIDTH, IMG_HEIGHT), Image.Resampling.LANCZOS)
-            self.current_pil_img = pil_img.convert("RGB")
+            # Decoded copy from the cache if the image was prefetched
+            pil_img = self.cache.get_image(filepath)
+            if pil_img is None:
+                pil_img = load_resized(filepath)
+            self.current_pil_img = pil_img
+            self.current_path = filepath
+            self.cache.prefetch(neighbour_paths(self.image_list, self.current_img_index), image=pil_img)
             self.current_image_name = os.path.basename(filepath)
             
-            self.tk_img = ImageTk.PhotoImage(self.current_pil_img)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
-            
+            self.show_image()
             self.draw_grid()
             self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
             
             # Clear plots
-            for ax in self.axs.flat:
-                ax.clear()
-            self.axs[0, 0].set_title("Original Cell")
-            self.axs[0, 1].set_title("Edge Detection")
-            self.axs[1, 0].set_title("Sharpen")
-            self.axs[1, 1].set_title("Box Blur")
-            for ax in self.axs.flat:
-                ax.axis('off')
-            self.chart.draw()
+            self.selected = None
+            if self.panel is not None:
+                self.panel.clear()
+                self.panel.refresh()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {e}")
 
+    def current_response(self):
+        # Whole-image response of the live kernel (cached per image and kernel)
+        response = self.responses.get(self.current_path, self.current_pil_img, self.kernel)
+        self.lbl_kernel.config(text=f"{self.kernel_name}: {self.responses.last_path}"
+                                    f"{f' {self.responses.last_ms:.1f} ms' if self.responses.last_ms else ''}")
+        return response
+
+    def show_image(self):
+        if not self.current_pil_img:
+            return
+        
+        display = self.current_pil_img
+        if self.show_response.get():
+            display = Image.fromarray(self.current_response())
+        
+        self.tk_img = ImageTk.PhotoImage(display)
+        self.canvas.delete("photo")
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img, tags="photo")
+        self.canvas.tag_lower("photo")
+
+    def on_preset_changed(self):
+        size = 2 * self.radius.get() + 1
+        self.kernel = preset_kernel(self.preset.get(), size)
+        self.kernel_name = f"{self.preset.get()} {size}x{size}"
+        self.kernel_text.delete("1.0", tk.END)
+        self.kernel_text.insert("1.0", format_kernel(self.kernel))
+        self.schedule_kernel_update()
+
+    def apply_custom_kernel(self):
+        try:
+            self.kernel = parse_kernel(self.kernel_text.get("1.0", tk.END))
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid kernel: {e}")
+            return
+        self.kernel_name = f"Custom {self.kernel.shape[0]}x{self.kernel.shape[1]}"
+        self.schedule_kernel_update()
+
+    def schedule_kernel_update(self):
+        # Debounce: while a slider is being dragged only the last value is computed
+        if self.update_job is not None:
+            self.root.after_cancel(self.update_job)
+        self.update_job = self.root.after(DEBOUNCE_MS, self.update_kernel_views)
+
+    def update_kernel_views(self):
+        self.update_job = None
+        if not self.current_pil_img:
+            return
+        if self.show_response.get():
+            self.show_image()
+        if self.selected is not None:
+            self.visualize_cell(*self.selected)
+
     def next_image(self):
         if self.current_img_index < len(self.image_list) - 1:
             self.current_img_index += 1
@@ -182,55 +342,18 @@ class ConvolutionVisualizer:
         x2 = x1 + cell_w
         y2 = y1 + cell_h
         
-        # Extract cell image
-        cell_img = self.current_pil_img.crop((x1, y1, x2, y2))
-        cell_array = np.array(cell_img)
-        
-        # Convert to RGB for display and BGR for OpenCV if needed (though filter2D works on any)
-        # We'll keep it as RGB numpy array
-        
-        # Define Kernels
-        
-        # Edge Detection (Laplacian-like)
-        kernel_edge = np.array([[-1, -1, -1],
-                                [-1,  8, -1],
-                                [-1, -1, -1]])
-                                
-        # Sharpen
-        kernel_sharpen = np.array([[0, -1, 0],
-                                   [-1, 5, -1],
-                                   [0, -1, 0]])
-                                   
-        # Box Blur
-        kernel_blur = np.ones((5, 5), np.float32) / 25
-        
-        # Apply Convolutions
-        img_edge = cv2.filter2D(cell_array, -1, kernel_edge)
-        img_sharpen = cv2.filter2D(cell_array, -1, kernel_sharpen)
-        img_blur = cv2.filter2D(cell_array, -1, kernel_blur)
+        # Precomputed cell features (computed now if the worker has not reached this cell)
+        features = self.cache.get_cell(self.current_path, row, col)
         
-        # Update Plots
-        self.axs[0, 0].clear()
-        self.axs[0, 0].imshow(cell_array)
-        self.axs[0, 0].set_title("Original Cell")
-        self.axs[0, 0].axis('off')
+        # Live kernel view is a crop of the cached whole-image response
+        features = dict(features, live=self.current_response()[y1:y2, x1:x2],
+                        kernel=self.kernel, kernel_name=self.kernel_name)
         
-        self.axs[0, 1].clear()
-        self.axs[0, 1].imshow(img_edge)
-        self.axs[0, 1].set_title("Edge Detection")
-        self.axs[0, 1].axis('off')
-        
-        self.axs[1, 0].clear()
-        self.axs[1, 0].imshow(img_sharpen)
-        self.axs[1, 0].set_title("Sharpen")
-        self.axs[1, 0].axis('off')
-        
-        self.axs[1, 1].clear()
-        self.axs[1, 1].imshow(img_blur)
-        self.axs[1, 1].set_title("Box Blur")
-        self.axs[1, 1].axis('off')
-        
-        self.chart.draw()
+        # Update Plots
+        self.selected = (row, col)
+        if self.panel is not None:
+            self.panel.render(features, row, col)
+            self.panel.refresh()
         
         # Highlight cell on canvas
         self.canvas.delete("highlight")
@@ -238,6 +361,6 @@ class ConvolutionVisualizer:
 
 if __name__ == "__main__":
     root = tk.Tk()
-    root.geometry("1400x800")
+    root.geometry("1400x950")
     app = ConvolutionVisualizer(root)
     root.mainloop()
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import cv2
 import os
@@ -6,6 +5,7 @@ import csv  # Added for efficient writing
 from PIL import Image
 from skimage.feature import hog
 import warnings
+from label_matrix import LabelMatrix
 
 warnings.filterwarnings("ignore")
 
@@ -23,7 +23,7 @@ def extract_features():
         print(f"Error: {LABELS_CSV} not found.")
         return
 
-    df_labels = pd.read_csv(LABELS_CSV)
+    label_matrix = LabelMatrix.read_csv(LABELS_CSV)
     
     # Define Kernels
     kernel_edge = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
@@ -43,11 +43,10 @@ def extract_features():
         writer = csv.writer(f)
         writer.writerow(header)
 
-        total_images = len(df_labels)
+        total_images = len(label_matrix)
         print(f"Found {total_images} images. Writing to {OUTPUT_CSV} incrementally...")
 
-        for idx, row in df_labels.iterrows():
-            filename = row['ImageFileName']
+        for idx, (filename, cell_labels) in enumerate(zip(label_matrix.names, label_matrix.labels)):
             filepath = os.path.join(RAW_IMAGES_DIR, filename)
             
             if not os.path.exists(filepath):
@@ -68,7 +67,7 @@ def extract_features():
                 
                 for i in range(64):
                     # Data Row Container
-                    data_row = [filename, i, row[f"c{i+1:02d}"]]
+                    data_row = [filename, i, cell_labels[i]]
 
                     # Coords
                     r, c = divmod(i, GRID_COLS)
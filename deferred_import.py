@@ -0,0 +1,32 @@
+import importlib
+import threading
+
+# Heavy libraries (matplotlib, pandas, OpenCV, scikit-image) account for most
+# of a GUI tool's startup time. The tools create their Tk window first and
+# import these on a worker thread; the callback runs on the Tk thread once
+# they are loaded, so the window is on screen while the imports happen.
+
+# Needed by any tool that embeds matplotlib panels
+PLOT_MODULES = ["matplotlib.figure", "matplotlib.backends.backend_tkagg"]
+
+
+def import_modules(module_names):
+    for name in module_names:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Error importing {name}: {e}")
+
+
+def import_async(root, module_names, callback=None, poll_ms=50):
+    # Imports are cached in sys.modules, so the callback (or any later code)
+    # can import the same names again for free
+    def poll():
+        if thread.is_alive():
+            root.after(poll_ms, poll)
+        elif callback is not None:
+            callback()
+
+    thread = threading.Thread(target=import_modules, args=(list(module_names),), daemon=True)
+    thread.start()
+    root.after(poll_ms, poll)
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from label_matrix import LabelMatrix, N_CELLS, N_CLASSES, CLASS_NAMES, class_metrics
+from grid_overlay import GRID_ROWS, GRID_COLS
+from visualize_predictions import render_images
+
+# Evaluation of predicted_labels.csv against labels.csv. Both files are read
+# as (N, 64) uint8 label matrices and joined on ImageFileName; every metric
+# is then a whole-array operation over the joined matrices:
+#   - per-cell error mask (N, 64) and per-image error counts
+#   - 4x4 confusion matrix (rows: truth, columns: prediction)
+#   - spatial heatmaps (8x8): overall error rate, per-class miss rate and
+#     false-alarm rate per cell
+#   - images ranked worst-first
+# Overlays mark correct object cells green, missed/mislabeled object cells
+# red and false alarms on background orange.
+# Usage: python evaluate_predictions.py [--split Test] [--overlays 100]
+
+# Configuration
+PREDICTIONS_FILE = "predicted_labels.csv"
+LABELS_FILE = "labels.csv"
+OUTPUT_DIR = "evaluation"
+WORST_OVERLAYS = 100  # Overlays rendered for the worst images (-1 = all)
+TOP_SHOWN = 10
+
+# Overlay status per cell
+CORRECT_BACKGROUND = 0
+CORRECT_OBJECT = 1
+MISSED_OBJECT = 2   # Truth is an object, prediction is anything else
+FALSE_ALARM = 3     # Truth is background, prediction is an object
+STATUS_COLORS = {
+    CORRECT_OBJECT: (0, 255, 0),
+    MISSED_OBJECT: (255, 0, 0),
+    FALSE_ALARM: (255, 165, 0),
+}
+
+def join_labels(predictions, truth, split=None):
+    # (names, P, T) for images present in both matrices (optionally only
+    # truth rows of one TrainOrTest split)
+    rows = truth.rows(predictions.names)
+    keep = rows >= 0
+    if split is not None:
+        splits = np.asarray(truth.splits, dtype=object)
+        keep &= np.where(keep, splits[np.maximum(rows, 0)] == split, False)
+    names = [n for n, k in zip(predictions.names, keep) if k]
+    return names, predictions.labels[keep], truth.labels[rows[keep]]
+
+def evaluate(P, T):
+    P = P.astype(np.intp)
+    T = T.astype(np.intp)
+    errors = P != T
+    missed = errors & (T > 0)
+    false_alarm = (T == 0) & (P > 0)
+    n = max(len(P), 1)
+
+    confusion = np.bincount((T * N_CLASSES + P).ravel(), minlength=N_CLASSES * N_CLASSES)
+    confusion = confusion.reshape(N_CLASSES, N_CLASSES)
+
+    # Per class and cell: how often a true class-c cell was not predicted c
+    class_cell = T * N_CELLS + np.arange(N_CELLS)
+    class_support = np.bincount(class_cell.ravel(), minlength=N_CLASSES * N_CELLS).reshape(N_CLASSES, N_CELLS)
+    class_missed = np.bincount(class_cell[errors], minlength=N_CLASSES * N_CELLS).reshape(N_CLASSES, N_CELLS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        class_miss_rate = np.where(class_support > 0, class_missed / class_support, np.nan)
+
+    status = np.full(P.shape, CORRECT_BACKGROUND, dtype=np.uint8)
+    status[(~errors) & (T > 0)] = CORRECT_OBJECT
+    status[missed] = MISSED_OBJECT
+    status[false_alarm] = FALSE_ALARM
+
+    return {
+        "errors": errors,
+        "status": status,
+        "image_errors": errors.sum(axis=1),
+        "image_missed": missed.sum(axis=1),
+        "image_false_alarms": false_alarm.sum(axis=1),
+        "confusion": confusion,
+        "cell_error_rate": errors.sum(axis=0) / n,
+        "cell_false_alarm_rate": false_alarm.sum(axis=0) / n,
+        "class_miss_rate": class_miss_rate,
+    }
+
+def rank_images(names, result):
+    # Worst first: most wrong cells, then most missed objects
+    order = np.lexsort((-result["image_missed"], -result["image_errors"]))
+    return pd.DataFrame({
+        "ImageFileName": np.asarray(names, dtype=object)[order],
+        "Errors": result["image_errors"][order],
+        "MissedObjects": result["image_missed"][order],
+        "FalseAlarms": result["image_false_alarms"][order],
+        "ErrorRate": result["image_errors"][order] / N_CELLS,
+    })
+
+def save_heatmaps(result, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    maps = [("Cell error rate", result["cell_error_rate"]),
+            ("False alarm rate", result["cell_false_alarm_rate"])]
+    maps += [(f"{CLASS_NAMES[c]} miss rate", result["class_miss_rate"][c]) for c in range(1, N_CLASSES)]
+
+    fig, axs = plt.subplots(2, 3, figsize=(15, 9))
+    ax = axs[0, 0]
+    ax.imshow(result["confusion"], cmap="Blues")
+    for (i, j), v in np.ndenumerate(result["confusion"]):
+        ax.text(j, i, str(v), ha="center", va="center", fontsize=8)
+    ax.set_xticks(range(N_CLASSES), CLASS_NAMES)
+    ax.set_yticks(range(N_CLASSES), CLASS_NAMES)
+    ax.set_xlabel("Predicted")
+    ax.set_ylabel("True")
+    ax.set_title("Confusion matrix")
+
+    for ax, (title, values) in zip(axs.flat[1:], maps):
+        im = ax.imshow(values.reshape(GRID_ROWS, GRID_COLS), cmap="magma", vmin=0)
+        ax.set_title(title)
+        ax.set_xticks([])
+        ax.set_yticks([])
+        fig.colorbar(im, ax=ax, fraction=0.046)
+
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate grid predictions against ground-truth labels.")
+    parser.add_argument("--predictions", default=PREDICTIONS_FILE)
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--split", help="Only evaluate images of this TrainOrTest split (e.g. Test)")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--overlays", type=int, default=WORST_OVERLAYS,
+                        help="Render correct/incorrect overlays for the N worst images (-1 = all, 0 = none)")
+    args = parser.parse_args()
+
+    for path in (args.predictions, args.labels):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found.")
+            sys.exit(1)
+
+    start = time.time()
+    names, P, T = join_labels(LabelMatrix.read_csv(args.predictions), LabelMatrix.read_csv(args.labels), args.split)
+    if not names:
+        print("No images with both predictions and ground truth.")
+        return
+    loaded = time.time()
+
+    result = evaluate(P, T)
+    ranking = rank_images(names, result)
+    evaluated = time.time()
+
+    confusion = result["confusion"]
+    precision, recall, f1 = class_metrics(confusion)
+    accuracy = np.trace(confusion) / confusion.sum()
+    perfect = int((result["image_errors"] == 0).sum())
+
+    print(f"Evaluated {len(names)} images ({len(names) * N_CELLS} cells): load {loaded - start:.2f}s, "
+          f"metrics {evaluated - loaded:.3f}s")
+    print(f"Cell accuracy: {accuracy:.4f}   Images without errors: {perfect}/{len(names)}")
+    print(f"{'Class':<8}{'Precision':>10}{'Recall':>10}{'F1':>10}{'Support':>10}")
+    for c in range(N_CLASSES):
+        print(f"{CLASS_NAMES[c]:<8}{precision[c]:>10.3f}{recall[c]:>10.3f}{f1[c]:>10.3f}{confusion[c].sum():>10}")
+    print("Confusion matrix (rows: true, cols: predicted):")
+    print(confusion)
+    print(f"Worst {min(TOP_SHOWN, len(ranking))} images:")
+    print(ranking.head(TOP_SHOWN).to_string(index=False))
+
+    os.makedirs(args.output, exist_ok=True)
+    ranking.to_csv(os.path.join(args.output, "worst_images.csv"), index=False)
+    with open(os.path.join(args.output, "metrics.json"), "w") as f:
+        json.dump({
+            "images": len(names),
+            "cell_accuracy": float(accuracy),
+            "images_without_errors": perfect,
+            "confusion": confusion.tolist(),
+            "precision": dict(zip(CLASS_NAMES, np.nan_to_num(precision).round(4).tolist())),
+            "recall": dict(zip(CLASS_NAMES, np.nan_to_num(recall).round(4).tolist())),
+            "f1": dict(zip(CLASS_NAMES, np.nan_to_num(f1).round(4).tolist())),
+            "cell_error_rate": result["cell_error_rate"].round(4).reshape(GRID_ROWS, GRID_COLS).tolist(),
+        }, f, indent=2)
+    save_heatmaps(result, os.path.join(args.output, "error_heatmaps.png"))
+
+    if args.overlays != 0:
+        worst = ranking["ImageFileName"].tolist()
+        if args.overlays > 0:
+            worst = worst[:args.overlays]
+        index = {name: i for i, name in enumerate(names)}
+        status = result["status"][[index[name] for name in worst]]
+        render_images(worst, status, STATUS_COLORS, os.path.join(args.output, "overlays"))
+        print(f"Rendered {len(worst)} overlays")
+
+    print(f"Results saved to {args.output}/")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from image_manifest import build_manifest
+from label_matrix import LabelMatrix, N_CELLS
+
+# On-disk cache of cell feature matrices. Every image gets one (64, F) .npy
+# file named after its content hash, in a folder per feature-config
+# fingerprint, so features are extracted once per image and config no matter
+# how often labels change or training is rerun. Content hashes come from the
+# image folder's manifest (recomputed only when size/mtime change).
+# Cells are cached individually: callers ask for a (n_images, 64) cell mask,
+# only the missing cells of each image are extracted (in a process pool) and
+# rows never asked for stay NaN, so subsampled background cells are never
+# featurized. cells.json in the cache folder records which cells each file
+# holds.
+# Usage: python feature_cache.py [--labels labels.csv] [--images processed_images] [--workers N]
+
+# Configuration
+CACHE_DIR = "feature_cache"
+IMAGE_DIR = "processed_images"
+LABELS_FILE = "labels.csv"
+INDEX_FILE = "cells.json"
+WORKERS = os.cpu_count() or 1
+FEATURE_DTYPE = np.float32  # Half the memory of the extractor's float64
+SAVE_INDEX_EVERY = 100  # Extracted images between index writes
+
+# Per-process state, filled by init_worker
+worker = {}
+
+
+def cache_folder(config, cache_dir=CACHE_DIR):
+    import cell_features
+    return os.path.join(cache_dir, cell_features.config_fingerprint(config or cell_features.DEFAULT_FEATURE_CONFIG))
+
+
+def mask_to_int(cells):
+    return int(np.dot(np.asarray(cells, dtype=np.uint64), np.uint64(1) << np.arange(N_CELLS, dtype=np.uint64)))
+
+
+def int_to_mask(value):
+    return (np.uint64(value) >> np.arange(N_CELLS, dtype=np.uint64)) & np.uint64(1) == 1
+
+
+def load_index(folder):
+    path = os.path.join(folder, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable cache index {path}: {e}")
+        return {}
+
+
+def save_index(folder, index):
+    path = os.path.join(folder, INDEX_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def cached_cells(index, path):
+    # (64,) bool of cells stored in a cache file. Files missing from the
+    # index (interrupted run, older cache) are checked directly: rows that
+    # were never extracted are NaN.
+    key = os.path.basename(path)
+    if key in index:
+        return int_to_mask(index[key])
+    if not os.path.exists(path):
+        return np.zeros(N_CELLS, dtype=bool)
+    try:
+        mask = ~np.isnan(np.load(path, mmap_mode="r")[:, 0])
+    except Exception:
+        return np.zeros(N_CELLS, dtype=bool)
+    index[key] = mask_to_int(mask)
+    return mask
+
+
+def init_worker(config):
+    import cell_features
+    worker["cell_features"] = cell_features
+    worker["config"] = config
+
+
+def extract_to_cache(job):
+    # Returns (file, stored cell mask as int, error message or None)
+    image_path, target, cells = job
+    cell_features = worker["cell_features"]
+    try:
+        img = cell_features.load_image(image_path)
+        if img is None:
+            return target, None, f"Failed to read image: {image_path}"
+        X = cell_features.extract_image_features(img, worker["config"], cells=cells).astype(FEATURE_DTYPE)
+        stored = np.load(target) if os.path.exists(target) else None
+        if stored is None or stored.shape[1] != X.shape[1]:
+            stored = np.full((N_CELLS, X.shape[1]), np.nan, dtype=FEATURE_DTYPE)
+        stored[cells] = X
+        tmp_path = target + ".tmp.npy"
+        np.save(tmp_path, stored)
+        os.replace(tmp_path, target)
+        return target, mask_to_int(~np.isnan(stored[:, 0])), None
+    except Exception as e:
+        return target, None, f"Error extracting {os.path.basename(image_path)}: {e}"
+
+
+def image_hashes(image_dir, names):
+    # name -> content hash for the names present in image_dir
+    entries = build_manifest(image_dir, compute_hash=True) if os.path.isdir(image_dir) else []
+    by_name = {e["name"]: e["hash"] for e in entries}
+    return {name: by_name[name] for name in names if name in by_name}
+
+
+def load_dataset(labels_file=LABELS_FILE, image_dir=IMAGE_DIR, config=None, cache_dir=CACHE_DIR):
+    # Labeled images found in image_dir: names, image paths, cache files,
+    # labels (n_images, 64) and a digest of (feature config, image contents,
+    # labels) that changes whenever the training data would. Nothing is
+    # extracted here; see update_cache() and load_matrix().
+    import cell_features
+    config = config or cell_features.DEFAULT_FEATURE_CONFIG
+    labels = LabelMatrix.read_csv(labels_file)
+    hashes = image_hashes(image_dir, labels.names)
+    for name in labels.names:
+        if name not in hashes:
+            print(f"Image not found: {os.path.join(image_dir, name)}")
+
+    names = [n for n in labels.names if n in hashes]
+    folder = cache_folder(config, cache_dir)
+    digest = hashlib.sha1(cell_features.config_fingerprint(config).encode("utf-8"))
+    for name in names:
+        digest.update(hashes[name].encode("utf-8"))
+    cell_labels = labels.labels[labels.rows(names)]
+    digest.update(cell_labels.tobytes())
+    return {
+        "names": names,
+        "paths": [os.path.join(image_dir, n) for n in names],
+        "files": [os.path.join(folder, hashes[n] + ".npy") for n in names],
+        "labels": cell_labels,
+        "folder": folder,
+        "feature_config": config,
+        "digest": digest.hexdigest(),
+    }
+
+
+def update_cache(data, cells=None, workers=WORKERS):
+    # Extracts the cells in the (n_images, 64) mask (all cells if None) that
+    # are not cached yet. Returns an (n_images,) bool: all wanted cells cached.
+    n = len(data["names"])
+    cells = np.ones((n, N_CELLS), dtype=bool) if cells is None else np.asarray(cells, dtype=bool)
+    folder = data["folder"]
+    os.makedirs(folder, exist_ok=True)
+    index = load_index(folder)
+
+    # One job per cache file (duplicate images share one), with the union of
+    # the cells wanted from it
+    wanted = {}
+    for i in np.flatnonzero(cells.any(axis=1)):
+        path, target = data["paths"][i], data["files"][i]
+        missing = cells[i] & ~cached_cells(index, target)
+        if missing.any():
+            prev = wanted.get(target, (path, np.zeros(N_CELLS, dtype=bool)))[1]
+            wanted[target] = (path, prev | missing)
+    jobs = [(path, target, np.flatnonzero(missing).tolist()) for target, (path, missing) in wanted.items()]
+
+    if jobs:
+        n_cells = sum(len(c) for _, _, c in jobs)
+        print(f"Extracting {n_cells} cells from {len(jobs)} images ({workers} workers)...")
+        start = time.time()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(data["feature_config"],)) as executor:
+            for done, (target, stored, message) in enumerate(executor.map(extract_to_cache, jobs), 1):
+                if message:
+                    print(message)
+                else:
+                    index[os.path.basename(target)] = stored
+                if done % SAVE_INDEX_EVERY == 0:
+                    save_index(folder, index)
+                    print(f"  {done}/{len(jobs)}")
+        elapsed = time.time() - start
+        print(f"Extracted {n_cells} cells in {elapsed:.1f}s ({n_cells / elapsed:.1f} cells/s)")
+    save_index(folder, index)
+
+    return np.array([not (cells[i] & ~cached_cells(index, data["files"][i])).any() for i in range(n)], dtype=bool)
+
+
+def load_matrix(data, cells=None):
+    # (cells.sum(), F) rows for the (n_images, 64) mask, image by image in
+    # cell order (matching data["labels"][cells]); filled in place, without a
+    # list of blocks plus a concatenated copy
+    n = len(data["names"])
+    cells = np.ones((n, N_CELLS), dtype=bool) if cells is None else np.asarray(cells, dtype=bool)
+    X = np.empty((0, 0), dtype=FEATURE_DTYPE)
+    row = 0
+    for i in np.flatnonzero(cells.any(axis=1)):
+        stored = np.load(data["files"][i], mmap_mode="r")
+        if row == 0:
+            X = np.empty((int(cells.sum()), stored.shape[1]), dtype=FEATURE_DTYPE)
+        k = int(cells[i].sum())
+        X[row:row + k] = stored[cells[i]]
+        row += k
+    return X
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and cache cell features for labeled images.")
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.labels):
+        print(f"Error: {args.labels} not found.")
+        sys.exit(1)
+
+    data = load_dataset(args.labels, args.images, cache_dir=args.cache)
+    ok = update_cache(data, workers=args.workers)
+    print(f"{int(ok.sum())}/{len(ok)} labeled images cached in {data['folder']} (digest {data['digest'][:12]})")
+
+
+if __name__ == "__main__":
+    main()
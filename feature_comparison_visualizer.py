@@ -1,13 +1,13 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import cv2
-from skimage.feature import hog
-from skimage import exposure
+from panel_render import PanelFigure, PanelPlugin
+from image_manifest import list_images_async
+from deferred_import import PLOT_MODULES, import_async
+from visualizer_cache import CellFeatureCache, load_resized, neighbour_paths
+from hog_render import hog_map
 
 # Configuration
 IMG_WIDTH = 800
@@ -15,6 +15,93 @@ IMG_HEIGHT = 600
 GRID_ROWS = 8
 GRID_COLS = 8
 
+# Define Kernels
+KERNEL_EDGE = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
+KERNEL_SHARPEN = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+KERNEL_BLUR = np.ones((5, 5), np.float32) / 25
+
+def compute_cell(cell_array):
+    # Heavy imports are deferred until the first cell is computed
+    import cv2
+    from skimage import exposure
+    # Apply Convolutions
+    img_edge = cv2.filter2D(cell_array, -1, KERNEL_EDGE)
+    img_sharpen = cv2.filter2D(cell_array, -1, KERNEL_SHARPEN)
+    img_blur = cv2.filter2D(cell_array, -1, KERNEL_BLUR)
+    
+    # One entry per row: Original, Edge, Sharpen, Blur
+    versions = []
+    for img in [cell_array, img_edge, img_sharpen, img_blur]:
+        # Glyph image from the orientation histogram (no skimage line drawing)
+        hog_image = hog_map(img, orientations=9, pixels_per_cell=(8, 8))
+        hists = [np.histogram(img[:, :, c_idx], bins=256, range=(0, 256))[0] for c_idx in range(3)]
+        versions.append({
+            "image": img,
+            "hog_image": exposure.rescale_intensity(hog_image, in_range=(0, 10)),
+            "hists": hists,
+        })
+    return {"cell": cell_array, "versions": versions}
+
+class ComparisonPanel(PanelFigure):
+    # Rows: Original, Edge, Sharpen, Blur
+    # Cols: Image, HOG, Color Hist
+    ROW_LABELS = ["Original", "Edge Detection", "Sharpen", "Box Blur"]
+    COL_LABELS = ["Cell Image", "HOG Features", "Color Histogram"]
+
+    def __init__(self, fig):
+        super().__init__(fig)
+        self.axs = fig.subplots(4, 3)
+        fig.tight_layout(pad=2.0)
+        cell_shape = (IMG_HEIGHT // GRID_ROWS, IMG_WIDTH // GRID_COLS)
+        
+        self.images = []
+        self.hog_images = []
+        self.hist_lines = []
+        colors = ('red', 'green', 'blue')
+        
+        # Set initial titles
+        for i in range(4):
+            for j in range(3):
+                ax = self.axs[i, j]
+                ax.axis('off')
+                if i == 0:
+                    ax.set_title(self.COL_LABELS[j])
+                if j == 0:
+                    ax.set_ylabel(self.ROW_LABELS[i])
+                # We need to turn axis on to see ylabel / histogram frame, but remove ticks
+                if j in (0, 2):
+                    ax.axis('on')
+                    ax.set_xticks([])
+                    ax.set_yticks([])
+                if j == 0:
+                    for side in ('top', 'right', 'bottom', 'left'):
+                        ax.spines[side].set_visible(False)
+            
+            self.images.append(self.image_artist(self.axs[i, 0], cell_shape + (3,)))
+            self.hog_images.append(self.image_artist(self.axs[i, 1], cell_shape, cmap="gray"))
+            self.axs[i, 2].set_xlim(0, 255)
+            self.hist_lines.append([
+                self.animate(self.axs[i, 2].plot(np.arange(256), np.zeros(256), color=color, alpha=0.7)[0])
+                for color in colors
+            ])
+
+    def render(self, features, row, col):
+        for i, version in enumerate(features["versions"]):
+            # 1. Image
+            self.set_image(self.images[i], version["image"])
+            
+            # 2. HOG
+            self.set_image(self.hog_images[i], version["hog_image"])
+            
+            # 3. Color Histogram
+            for line, hist in zip(self.hist_lines[i], version["hists"]):
+                line.set_ydata(hist)
+                line.set_visible(True)
+            self.fit_ylim(self.axs[i, 2], max(h.max() for h in version["hists"]))
+
+# Entry for workbench.py
+PLUGIN = PanelPlugin("Comparison", compute_cell, ComparisonPanel, (12, 10), heavy_modules=["cv2", "skimage.draw", "skimage.exposure"])
+
 class FeatureComparisonVisualizer:
     def __init__(self, root):
         self.root = root
@@ -25,6 +112,11 @@ class FeatureComparisonVisualizer:
         self.current_image_name = ""
         self.image_list = []
         self.current_img_index = 0
+        self.current_path = None
+        self.selected = None  # (row, col)
+        
+        # Features for every cell are precomputed in the background on image load
+        self.cache = CellFeatureCache(compute_cell, GRID_ROWS, GRID_COLS)
         
         # Layout
         self.main_frame = tk.Frame(self.root)
@@ -58,34 +150,29 @@ class FeatureComparisonVisualizer:
         self.right_panel = tk.Frame(self.main_frame)
         self.right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Matplotlib Figure (4x3 grid)
-        # Rows: Original, Edge, Sharpen, Blur
-        # Cols: Image, HOG, Color Hist
-        self.fig, self.axs = plt.subplots(4, 3, figsize=(12, 10))
-        self.fig.tight_layout(pad=2.0)
+        # Plots are built once matplotlib has been imported in the background,
+        # so the window appears without waiting for it
+        self.panel = None
+        self.lbl_loading = tk.Label(self.right_panel, text="Loading plots...")
+        self.lbl_loading.pack(expand=True)
+        import_async(self.root, PLOT_MODULES + PLUGIN.heavy_modules, self.build_plots)
+
+    def build_plots(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.lbl_loading.destroy()
         
-        self.row_labels = ["Original", "Edge Detection", "Sharpen", "Box Blur"]
-        self.col_labels = ["Cell Image", "HOG Features", "Color Histogram"]
+        # Matplotlib Figure (artists are created once and updated per click)
+        self.fig = Figure(figsize=PLUGIN.figsize)
+        self.panel = PLUGIN.panel_class(self.fig)
         
-        # Set initial titles
-        for i in range(4):
-            for j in range(3):
-                self.axs[i, j].axis('off')
-                if i == 0:
-                    self.axs[i, j].set_title(self.col_labels[j])
-                if j == 0:
-                    self.axs[i, j].set_ylabel(self.row_labels[i])
-                    # We need to turn axis on to see ylabel, but remove ticks
-                    self.axs[i, j].axis('on')
-                    self.axs[i, j].set_xticks([])
-                    self.axs[i, j].set_yticks([])
-                    self.axs[i, j].spines['top'].set_visible(False)
-                    self.axs[i, j].spines['right'].set_visible(False)
-                    self.axs[i, j].spines['bottom'].set_visible(False)
-                    self.axs[i, j].spines['left'].set_visible(False)
-
         self.chart = FigureCanvasTkAgg(self.fig, self.right_panel)
         self.chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.panel.attach(self.chart)
+        
+        # A cell clicked while loading is shown now
+        if self.selected is not None:
+            self.visualize_cell(*self.selected)
 
     def load_folder(self):
         initial_dir = os.path.join(os.getcwd(), "raw_images")
@@ -96,15 +183,15 @@ class FeatureComparisonVisualizer:
         if not folder_path:
             return
             
-        # Get all images
-        valid_exts = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        self.image_list = [
-            os.path.join(folder_path, f) 
-            for f in os.listdir(folder_path) 
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
         
         if not self.image_list:
+            self.lbl_status.config(text="Load a folder to start")
             messagebox.showerror("Error", "No images found in folder!")
             return
             
@@ -118,15 +205,13 @@ class FeatureComparisonVisualizer:
         filepath = self.image_list[self.current_img_index]
         
         try:
-            pil_img = Image.open(filepath)
-            
-            # Check dimensions
-            w, h = pil_img.size
-            if w < IMG_WIDTH or h < IMG_HEIGHT:
-                print(f"Warning: {os.path.basename(filepath)} is small ({w}x{h})")
-
-            pil_img = pil_img.resize((IMG_WIDTH, IMG_HEIGHT), Image.Resampling.LANCZOS)
-            self.current_pil_img = pil_img.convert("RGB")
+            # Decoded copy from the cache if the image was prefetched
+            pil_img = self.cache.get_image(filepath)
+            if pil_img is None:
+                pil_img = load_resized(filepath)
+            self.current_pil_img = pil_img
+            self.current_path = filepath
+            self.cache.prefetch(neighbour_paths(self.image_list, self.current_img_index), image=pil_img)
             self.current_image_name = os.path.basename(filepath)
             
             self.tk_img = ImageTk.PhotoImage(self.current_pil_img)
@@ -135,23 +220,11 @@ class FeatureComparisonVisualizer:
             self.draw_grid()
             self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
             
-            # Clear plots but keep structure
-            for i in range(4):
-                for j in range(3):
-                    self.axs[i, j].clear()
-                    self.axs[i, j].axis('off')
-                    if i == 0:
-                        self.axs[i, j].set_title(self.col_labels[j])
-                    if j == 0:
-                        self.axs[i, j].set_ylabel(self.row_labels[i])
-                        self.axs[i, j].axis('on')
-                        self.axs[i, j].set_xticks([])
-                        self.axs[i, j].set_yticks([])
-                        self.axs[i, j].spines['top'].set_visible(False)
-                        self.axs[i, j].spines['right'].set_visible(False)
-                        self.axs[i, j].spines['bottom'].set_visible(False)
-                        self.axs[i, j].spines['left'].set_visible(False)
-            self.chart.draw()
+            # Clear plots
+            self.selected = None
+            if self.panel is not None:
+                self.panel.clear()
+                self.panel.refresh()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {e}")
@@ -201,60 +274,14 @@ class FeatureComparisonVisualizer:
         x2 = x1 + cell_w
         y2 = y1 + cell_h
         
-        # Extract cell image
-        cell_img = self.current_pil_img.crop((x1, y1, x2, y2))
-        cell_array = np.array(cell_img)
-        
-        # Define Kernels
-        kernel_edge = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
-        kernel_sharpen = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-        kernel_blur = np.ones((5, 5), np.float32) / 25
-        
-        # Apply Convolutions
-        img_edge = cv2.filter2D(cell_array, -1, kernel_edge)
-        img_sharpen = cv2.filter2D(cell_array, -1, kernel_sharpen)
-        img_blur = cv2.filter2D(cell_array, -1, kernel_blur)
-        
-        images = [cell_array, img_edge, img_sharpen, img_blur]
+        # Precomputed cell features (computed now if the worker has not reached this cell)
+        features = self.cache.get_cell(self.current_path, row, col)
         
         # Update Plots
-        for i, img in enumerate(images):
-            # 1. Image
-            self.axs[i, 0].clear()
-            self.axs[i, 0].imshow(img)
-            self.axs[i, 0].set_ylabel(self.row_labels[i])
-            self.axs[i, 0].axis('on')
-            self.axs[i, 0].set_xticks([])
-            self.axs[i, 0].set_yticks([])
-            self.axs[i, 0].spines['top'].set_visible(False)
-            self.axs[i, 0].spines['right'].set_visible(False)
-            self.axs[i, 0].spines['bottom'].set_visible(False)
-            self.axs[i, 0].spines['left'].set_visible(False)
-            if i == 0: self.axs[i, 0].set_title(self.col_labels[0])
-
-            # 2. HOG
-            fd, hog_image = hog(img, orientations=9, pixels_per_cell=(8, 8),
-                                cells_per_block=(2, 2), visualize=True, channel_axis=-1)
-            hog_image_rescaled = exposure.rescale_intensity(hog_image, in_range=(0, 10))
-            
-            self.axs[i, 1].clear()
-            self.axs[i, 1].imshow(hog_image_rescaled, cmap=plt.cm.gray)
-            self.axs[i, 1].axis('off')
-            if i == 0: self.axs[i, 1].set_title(self.col_labels[1])
-            
-            # 3. Color Histogram
-            self.axs[i, 2].clear()
-            colors = ('red', 'green', 'blue')
-            for c_idx, color in enumerate(colors):
-                hist, bins = np.histogram(img[:, :, c_idx], bins=256, range=(0, 256))
-                self.axs[i, 2].plot(bins[:-1], hist, color=color, alpha=0.7)
-            self.axs[i, 2].set_xlim(0, 255)
-            # Remove ticks for cleaner look
-            self.axs[i, 2].set_xticks([])
-            self.axs[i, 2].set_yticks([])
-            if i == 0: self.axs[i, 2].set_title(self.col_labels[2])
-
-        self.chart.draw()
+        self.selected = (row, col)
+        if self.panel is not None:
+            self.panel.render(features, row, col)
+            self.panel.refresh()
         
         # Highlight cell on canvas
         self.canvas.delete("highlight")
@@ -5,6 +5,7 @@ import os
 from PIL import Image
 from skimage.feature import hog
 import warnings
+from label_matrix import LabelMatrix
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -24,7 +25,7 @@ def extract_features():
         return
 
     print("Loading labels...")
-    df_labels = pd.read_csv(LABELS_CSV)
+    label_matrix = LabelMatrix.read_csv(LABELS_CSV)
     
     all_features = []
     
@@ -33,11 +34,10 @@ def extract_features():
     kernel_sharpen = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
     kernel_blur = np.ones((5, 5), np.float32) / 25
 
-    total_images = len(df_labels)
+    total_images = len(label_matrix)
     print(f"Found {total_images} labeled images. Starting extraction...")
 
-    for idx, row in df_labels.iterrows():
-        filename = row['ImageFileName']
+    for idx, (filename, cell_labels) in enumerate(zip(label_matrix.names, label_matrix.labels)):
         filepath = os.path.join(RAW_IMAGES_DIR, filename)
         
         if not os.path.exists(filepath):
@@ -58,7 +58,7 @@ def extract_features():
             
             for i in range(64):
                 # Get Label
-                label = row[f"c{i+1:02d}"]
+                label = cell_labels[i]
                 
                 # Calculate coordinates
                 r = i // GRID_COLS
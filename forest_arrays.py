@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# Random Forest inference without sklearn's per-tree loop. A fitted forest is
+# flattened into contiguous arrays shared by all trees (split feature,
+# threshold, left/right child, per-node class probabilities, root of each
+# tree), and ArrayForest walks every (row, tree) pair down one level per
+# step with vectorized gathers over the whole batch, instead of one
+# sklearn tree call per estimator. Pairs drop out of the working set when
+# they reach a leaf. Rows are cast to float32 as sklearn does, and each
+# threshold is rounded down to the nearest float32, so the float32
+# comparison takes the same branch as sklearn's float64 one and the
+# probabilities equal predict_proba exactly.
+# A model bundle exports to one .npz (forest, scaler mean/scale and feature
+# config), which model_bundle.load_bundle() reads with np.load alone, no
+# unpickling.
+# Usage: python forest_arrays.py [--model models/cell_classifier.joblib] [--output models/cell_classifier.npz]
+
+CHUNK_ROWS = 4096  # Rows walked at once; bounds the (rows, trees) work arrays
+
+
+class ArrayForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.depth = int(depth)
+        # Walk tables: children interleaved (left, right) so a step is one
+        # gather, and thresholds rounded down to float32, which keeps
+        # float32 x <= threshold exact
+        self.is_leaf = left == np.arange(len(left))
+        self.children = np.stack([left, right], axis=1).ravel()
+        threshold32 = threshold.astype(np.float32)
+        above = threshold32 > threshold
+        threshold32[above] = np.nextafter(threshold32[above], np.float32(-np.inf))
+        self.threshold32 = threshold32
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        trees = [est.tree_ for est in getattr(forest, "estimators_", [])]
+        if not trees or forest.n_outputs_ != 1:
+            raise ValueError(f"Expected a fitted single-output forest classifier, got {type(forest).__name__}")
+        sizes = np.array([t.node_count for t in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        feature, threshold, left, right, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            is_leaf = tree.children_left < 0
+            nodes = np.arange(tree.node_count)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            v = tree.value[:, 0, :]
+            value.append(v / np.maximum(v.sum(axis=1, keepdims=True), np.finfo(float).tiny))
+        return cls(np.concatenate(feature).astype(np.int32), np.concatenate(threshold),
+                   np.concatenate(left).astype(np.int32), np.concatenate(right).astype(np.int32),
+                   np.concatenate(value), offsets.astype(np.int32), np.asarray(forest.classes_),
+                   max(t.max_depth for t in trees))
+
+    def arrays(self):
+        return {"feature": self.feature, "threshold": self.threshold, "left": self.left, "right": self.right,
+                "value": self.value, "roots": self.roots, "classes": self.classes_,
+                "depth": np.array(self.depth)}
+
+    def _leaves(self, X):
+        # (rows, trees) leaf index for every row in every tree. Pairs are
+        # advanced one level per step; only pairs not at a leaf yet are kept
+        # in the working set, so deep but rare paths do not cost a full
+        # rows x trees step per level.
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        flat = X.ravel()
+        node = np.tile(self.roots, n_rows)
+        offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            current = node[active]
+            go_right = flat[offset[active] + self.feature[current]] > self.threshold32[current]
+            current = self.children[2 * current + go_right]
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            proba[start:start + CHUNK_ROWS] = self.value[self._leaves(X[start:start + CHUNK_ROWS])].mean(axis=1)
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class ArrayScaler:
+    # StandardScaler.transform from saved mean_/scale_, same operations
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        X = np.asarray(X)
+        X = np.array(X, dtype=X.dtype if np.issubdtype(X.dtype, np.floating) else np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def save_npz(bundle, path):
+    forest = ArrayForest.from_sklearn(bundle["model"])
+    scaler = bundle.get("scaler")
+    arrays = forest.arrays()
+    if scaler is not None:
+        arrays["scaler_mean"] = scaler.mean_
+        arrays["scaler_scale"] = scaler.scale_
+    arrays["feature_config"] = np.array(json.dumps(bundle.get("feature_config")))
+    arrays["fingerprint"] = np.array(bundle.get("fingerprint") or "")
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    np.savez(path, **arrays)
+    return forest
+
+
+def load_npz(path):
+    # A model bundle dict (model, scaler, feature_config, fingerprint)
+    with np.load(path, allow_pickle=False) as f:
+        model = ArrayForest(f["feature"], f["threshold"], f["left"], f["right"], f["value"], f["roots"],
+                            f["classes"], f["depth"])
+        scaler = ArrayScaler(f["scaler_mean"], f["scaler_scale"]) if "scaler_mean" in f else None
+        return {
+            "model": model,
+            "scaler": scaler,
+            "feature_config": json.loads(str(f["feature_config"])),
+            "fingerprint": str(f["fingerprint"]),
+        }
+
+
+def main():
+    import model_bundle
+    parser = argparse.ArgumentParser(description="Export a Random Forest model bundle to one .npz file.")
+    parser.add_argument("--model", default=model_bundle.MODEL_FILE)
+    parser.add_argument("--output", default=None, help="Default: the bundle path with .npz")
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.model)[0] + ".npz"
+
+    bundle = model_bundle.load_bundle(args.model)
+    if bundle is None:
+        sys.exit(1)
+    try:
+        forest = save_npz(bundle, output)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Exported {len(forest.roots)} trees ({len(forest.feature)} nodes, depth {forest.depth}) to {output} "
+          f"({os.path.getsize(output) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
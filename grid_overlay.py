@@ -0,0 +1,108 @@
+import functools
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Grid-label overlay shared by the labeler, the auto labeler and the
+# prediction visualizer. The 64 cell labels become an (8, 8) colour/alpha map
+# (one table lookup), upsampled with np.repeat and alpha-blended with integer
+# arithmetic (x * (255 - a) + c * a, rounded / 255 with shifts). Grid lines
+# and cell numbers are the same on every image, so they are drawn once into a
+# cached RGBA template and only its drawn pixels are blended per image. The result is identical to
+# pasting a translucent cell image per label with PIL and drawing the grid
+# with ImageDraw.
+
+GRID_ROWS = 8
+GRID_COLS = 8
+IMG_WIDTH = 800
+IMG_HEIGHT = 600
+CELL_W = IMG_WIDTH // GRID_COLS
+CELL_H = IMG_HEIGHT // GRID_ROWS
+
+# Label colours (RGB), same as the labeler's canvas
+COLORS = {
+    1: (255, 0, 0),   # Red (Ball)
+    2: (0, 0, 255),   # Blue (Bat)
+    3: (0, 255, 0)    # Green (Stump)
+}
+ALPHA = 70  # Overlay opacity (0-255)
+
+
+@functools.lru_cache(maxsize=None)
+def build_grid_template():
+    # Drawn pixels of the grid layer: (rows, cols, rgb, alpha)
+    template = Image.new("RGBA", (IMG_WIDTH, IMG_HEIGHT), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(template)
+
+    # Draw Grid Lines (Yellow)
+    for i in range(1, GRID_COLS):
+        x = i * CELL_W
+        draw.line([(x, 0), (x, IMG_HEIGHT)], fill="yellow", width=1)
+    for i in range(1, GRID_ROWS):
+        y = i * CELL_H
+        draw.line([(0, y), (IMG_WIDTH, y)], fill="yellow", width=1)
+
+    # Draw Cell Numbers (White)
+    for i in range(GRID_ROWS * GRID_COLS):
+        r = i // GRID_COLS
+        c = i % GRID_COLS
+        draw.text((c * CELL_W + 2, r * CELL_H + 2), str(i+1), fill="white")
+
+    layer = np.array(template)
+    rows, cols = np.nonzero(layer[:, :, 3])
+    parts = rows, cols, layer[rows, cols, :3].astype(np.uint16), layer[rows, cols, 3:].astype(np.uint16)
+    for part in parts:
+        part.setflags(write=False)
+    return parts
+
+
+def build_color_table(colors=COLORS, alpha=ALPHA):
+    # RGBA per label; background (0) stays fully transparent
+    table = np.zeros((max(colors) + 1, 4), dtype=np.uint8)
+    for label, color in colors.items():
+        table[label] = tuple(color) + (alpha,)
+    return table
+
+
+DEFAULT_TABLE = build_color_table()
+DEFAULT_TABLE.setflags(write=False)
+
+
+def div255(x):
+    # round(x / 255) for 0 <= x <= 255 * 255, without an integer division
+    x = x + 128
+    return (x + (x >> 8)) >> 8
+
+
+def render_overlay(base, cell_labels, table=DEFAULT_TABLE, template=None):
+    # base: (H, W, 3) uint8 RGB (a PIL image works too); returns a new array
+    out = np.array(base, dtype=np.uint8)
+    cells = table[np.asarray(cell_labels, dtype=np.intp)].reshape(GRID_ROWS, GRID_COLS, 4).astype(np.uint16)
+
+    # (8, 8) map upsampled along x to (8, IMG_WIDTH): what each pixel of a
+    # cell row keeps of the image and what it adds (colour * alpha + rounding)
+    keep = np.repeat(255 - cells[:, :, 3:], CELL_W, axis=1)
+    add = np.repeat(cells[:, :, :3] * cells[:, :, 3:] + 128, CELL_W, axis=1)
+
+    # One blend per labeled cell row, over the span from its first to its last
+    # labeled cell; a contiguous band keeps the uint16 temporaries small
+    # (faster than blending the whole frame at once)
+    bands = out.reshape(GRID_ROWS, CELL_H, IMG_WIDTH, 3)
+    labeled = cells[:, :, 3] > 0
+    for r in np.flatnonzero(labeled.any(axis=1)):
+        c = np.flatnonzero(labeled[r])
+        span = slice(c[0] * CELL_W, (c[-1] + 1) * CELL_W)
+        x = bands[r, :, span].astype(np.uint16)
+        x *= keep[r, span]
+        x += add[r, span]
+        x += x >> 8
+        x >>= 8
+        bands[r, :, span] = x
+
+    rows, cols, rgb, t_alpha = template if template is not None else build_grid_template()
+    out[rows, cols] = div255(out[rows, cols] * (255 - t_alpha) + rgb * t_alpha)
+    return out
+
+
+def overlay_image(base, cell_labels, table=DEFAULT_TABLE):
+    # PIL in, PIL RGB out
+    return Image.fromarray(render_overlay(np.asarray(base.convert("RGB")), cell_labels, table))
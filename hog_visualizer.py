@@ -3,16 +3,80 @@ from tkinter import filedialog, messagebox
 from PIL import Image, ImageTk
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from skimage.feature import hog
-from skimage import exposure
+from panel_render import PanelFigure, PanelPlugin
+from image_manifest import list_images_async
+from deferred_import import PLOT_MODULES, import_async
+from visualizer_cache import CellFeatureCache, load_resized, neighbour_paths
+from hog_render import hog_map
 
 # Configuration
 IMG_WIDTH = 800
 IMG_HEIGHT = 600
 GRID_ROWS = 4
 GRID_COLS = 4
+# Glyph intensity mapped to white in the full-image HOG map (same as the cell view)
+HOG_MAP_RANGE = 10
+
+def compute_cell(cell_array):
+    # Heavy imports are deferred until the first cell is computed
+    from skimage.feature import hog
+    from skimage import exposure
+    # Compute HOG
+    # Using standard parameters, can be tweaked
+    # pixels_per_cell=(8, 8) means we get fine-grained features
+    # cells_per_block=(2, 2) for normalization
+    fd = hog(cell_array, orientations=9, pixels_per_cell=(8, 8),
+             cells_per_block=(2, 2), channel_axis=-1)
+    # Glyph image from the orientation histogram (no skimage line drawing)
+    hog_image = hog_map(cell_array, orientations=9, pixels_per_cell=(8, 8))
+    
+    # Rescale histogram for better display
+    hog_image_rescaled = exposure.rescale_intensity(hog_image, in_range=(0, 10))
+    return {"cell": cell_array, "fd": fd, "hog_image": hog_image_rescaled}
+
+class HOGPanel(PanelFigure):
+    def __init__(self, fig):
+        super().__init__(fig)
+        self.axs = fig.subplots(3, 1)
+        fig.tight_layout(pad=3.0)
+        cell_shape = (IMG_HEIGHT // GRID_ROWS, IMG_WIDTH // GRID_COLS)
+        
+        self.animate_title(self.axs[0], "Selected Cell")
+        self.axs[0].axis('off')
+        self.img_cell = self.image_artist(self.axs[0], cell_shape + (3,))
+        
+        self.animate_title(self.axs[1], "HOG Visualization")
+        self.axs[1].axis('off')
+        self.img_hog = self.image_artist(self.axs[1], cell_shape, cmap="gray")
+        
+        self.animate_title(self.axs[2], "HOG Feature Histogram")
+        self.axs[2].set_xlabel("Bin Index")
+        self.axs[2].set_ylabel("Value")
+        self.bars = None
+
+    def render(self, features, row, col):
+        fd = features["fd"]
+        
+        self.set_image(self.img_cell, features["cell"])
+        self.set_title(self.axs[0], f"Cell ({row+1}, {col+1})")
+        self.set_image(self.img_hog, features["hog_image"])
+        
+        # One filled step artist instead of thousands of bar rectangles
+        if self.bars is None or len(self.bars.get_data().values) != len(fd):
+            if self.bars is not None:
+                self.artists.remove(self.bars)
+                self.bars.remove()
+            self.bars = self.animate(self.axs[2].stairs(fd, np.arange(len(fd) + 1), fill=True))
+            self.axs[2].set_xlim(0, len(fd))
+            self.needs_full_draw = True
+        else:
+            self.bars.set_data(fd)
+        self.bars.set_visible(True)
+        self.fit_ylim(self.axs[2], fd.max())
+        self.set_title(self.axs[2], f"HOG Feature Vector (Size: {len(fd)})")
+
+# Entry for workbench.py
+PLUGIN = PanelPlugin("HOG", compute_cell, HOGPanel, (5, 8), heavy_modules=["skimage.feature", "skimage.draw", "skimage.exposure"])
 
 class HOGVisualizer:
     def __init__(self, root):
@@ -24,6 +88,14 @@ class HOGVisualizer:
         self.current_image_name = ""
         self.image_list = []
         self.current_img_index = 0
+        self.current_path = None
+        self.selected = None  # (row, col)
+        self.show_hog_map = tk.BooleanVar(value=False)
+        self.hog_map_img = None
+        self.hog_map_path = None
+        
+        # Features for every cell are precomputed in the background on image load
+        self.cache = CellFeatureCache(compute_cell, GRID_ROWS, GRID_COLS)
         
         # Layout
         self.main_frame = tk.Frame(self.root)
@@ -50,6 +122,9 @@ class HOGVisualizer:
         tk.Button(nav_frame, text="<< Prev", command=self.prev_image).pack(side=tk.LEFT, padx=5)
         tk.Button(nav_frame, text="Next >>", command=self.next_image).pack(side=tk.LEFT, padx=5)
         
+        tk.Checkbutton(ctrl_frame, text="Show HOG Map", variable=self.show_hog_map,
+                       command=self.show_image).pack(side=tk.TOP, pady=5)
+        
         self.lbl_status = tk.Label(self.left_panel, text="Load a folder to start")
         self.lbl_status.pack()
 
@@ -57,22 +132,29 @@ class HOGVisualizer:
         self.right_panel = tk.Frame(self.main_frame)
         self.right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Matplotlib Figure
-        self.fig, self.axs = plt.subplots(3, 1, figsize=(5, 8))
-        self.fig.tight_layout(pad=3.0)
-        
-        self.axs[0].set_title("Selected Cell")
-        self.axs[0].axis('off')
-        
-        self.axs[1].set_title("HOG Visualization")
-        self.axs[1].axis('off')
+        # Plots are built once matplotlib has been imported in the background,
+        # so the window appears without waiting for it
+        self.panel = None
+        self.lbl_loading = tk.Label(self.right_panel, text="Loading plots...")
+        self.lbl_loading.pack(expand=True)
+        import_async(self.root, PLOT_MODULES + PLUGIN.heavy_modules, self.build_plots)
+
+    def build_plots(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.lbl_loading.destroy()
         
-        self.axs[2].set_title("HOG Feature Histogram")
-        self.axs[2].set_xlabel("Bin Index")
-        self.axs[2].set_ylabel("Value")
+        # Matplotlib Figure (artists are created once and updated per click)
+        self.fig = Figure(figsize=PLUGIN.figsize)
+        self.panel = PLUGIN.panel_class(self.fig)
         
         self.chart = FigureCanvasTkAgg(self.fig, self.right_panel)
         self.chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.panel.attach(self.chart)
+        
+        # A cell clicked while loading is shown now
+        if self.selected is not None:
+            self.visualize_cell(*self.selected)
 
     def load_folder(self):
         initial_dir = os.path.join(os.getcwd(), "raw_images")
@@ -83,15 +165,15 @@ class HOGVisualizer:
         if not folder_path:
             return
             
-        # Get all images
-        valid_exts = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        self.image_list = [
-            os.path.join(folder_path, f) 
-            for f in os.listdir(folder_path) 
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
         
         if not self.image_list:
+            self.lbl_status.config(text="Load a folder to start")
             messagebox.showerror("Error", "No images found in folder!")
             return
             
@@ -105,37 +187,47 @@ class HOGVisualizer:
         filepath = self.image_list[self.current_img_index]
         
         try:
-            pil_img = Image.open(filepath)
-            
-            # Check dimensions (optional, but good for consistency)
-            w, h = pil_img.size
-            if w < IMG_WIDTH or h < IMG_HEIGHT:
-                # Just warn once or log? For now let's just resize silently or maybe print
-                print(f"Warning: {os.path.basename(filepath)} is small ({w}x{h})")
-
-            pil_img = pil_img.resize((IMG_WIDTH, IMG_HEIGHT), Image.Resampling.LANCZOS)
-            self.current_pil_img = pil_img.convert("RGB")
+            # Decoded copy from the cache if the image was prefetched
+            pil_img = self.cache.get_image(filepath)
+            if pil_img is None:
+                pil_img = load_resized(filepath)
+            self.current_pil_img = pil_img
+            self.current_path = filepath
+            self.cache.prefetch(neighbour_paths(self.image_list, self.current_img_index), image=pil_img)
             self.current_image_name = os.path.basename(filepath)
             
-            self.tk_img = ImageTk.PhotoImage(self.current_pil_img)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
-            
+            self.show_image()
             self.draw_grid()
             self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
             
             # Clear plots
-            for ax in self.axs:
-                ax.clear()
-            self.axs[0].set_title("Selected Cell")
-            self.axs[1].set_title("HOG Visualization")
-            self.axs[2].set_title("HOG Feature Histogram")
-            self.axs[0].axis('off')
-            self.axs[1].axis('off')
-            self.chart.draw()
+            self.selected = None
+            if self.panel is not None:
+                self.panel.clear()
+                self.panel.refresh()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {e}")
 
+    def show_image(self):
+        if not self.current_pil_img:
+            return
+        
+        display = self.current_pil_img
+        if self.show_hog_map.get():
+            # HOG glyphs for the whole 800x600 image, rendered once per image
+            if self.hog_map_path != self.current_path:
+                glyphs = hog_map(np.asarray(self.current_pil_img))
+                glyphs = np.clip(glyphs / HOG_MAP_RANGE, 0, 1) * 255
+                self.hog_map_img = Image.fromarray(glyphs.astype(np.uint8))
+                self.hog_map_path = self.current_path
+            display = self.hog_map_img
+        
+        self.tk_img = ImageTk.PhotoImage(display)
+        self.canvas.delete("photo")
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img, tags="photo")
+        self.canvas.tag_lower("photo")
+
     def next_image(self):
         if self.current_img_index < len(self.image_list) - 1:
             self.current_img_index += 1
@@ -181,37 +273,14 @@ class HOGVisualizer:
         x2 = x1 + cell_w
         y2 = y1 + cell_h
         
-        # Extract cell image
-        cell_img = self.current_pil_img.crop((x1, y1, x2, y2))
-        cell_array = np.array(cell_img)
-        
-        # Compute HOG
-        # Using standard parameters, can be tweaked
-        # pixels_per_cell=(8, 8) means we get fine-grained features
-        # cells_per_block=(2, 2) for normalization
-        fd, hog_image = hog(cell_array, orientations=9, pixels_per_cell=(8, 8),
-                            cells_per_block=(2, 2), visualize=True, channel_axis=-1)
+        # Precomputed cell features (computed now if the worker has not reached this cell)
+        features = self.cache.get_cell(self.current_path, row, col)
         
-        # Rescale histogram for better display
-        hog_image_rescaled = exposure.rescale_intensity(hog_image, in_range=(0, 10))
-
         # Update Plots
-        self.axs[0].clear()
-        self.axs[0].imshow(cell_array)
-        self.axs[0].set_title(f"Cell ({row+1}, {col+1})")
-        self.axs[0].axis('off')
-        
-        self.axs[1].clear()
-        self.axs[1].imshow(hog_image_rescaled, cmap=plt.cm.gray)
-        self.axs[1].set_title("HOG Visualization")
-        self.axs[1].axis('off')
-        
-        self.axs[2].clear()
-        self.axs[2].bar(range(len(fd)), fd)
-        self.axs[2].set_title(f"HOG Feature Vector (Size: {len(fd)})")
-        self.axs[2].set_xlim(0, len(fd))
-        
-        self.chart.draw()
+        self.selected = (row, col)
+        if self.panel is not None:
+            self.panel.render(features, row, col)
+            self.panel.refresh()
         
         # Highlight cell on canvas
         self.canvas.delete("highlight")
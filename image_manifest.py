@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from PIL import Image
+
+# Cached index of an image folder: name, byte size, mtime, content hash,
+# pixel dimensions and whether the image is below the 800x600 minimum.
+# Dimensions come from the file header only (PIL opens lazily), and entries
+# are reused as long as size and mtime are unchanged, so re-opening a large
+# folder costs one os.scandir plus one JSON load.
+# Every hash read from or written to a manifest is also kept in memory by
+# (path, size, mtime), and content_hash() answers from there, so a file is
+# hashed at most once per process whichever caller asks first.
+
+VALID_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".jfif", ".pjpeg", ".pjp"}
+MANIFEST_FILE = ".image_manifest.json"
+MIN_WIDTH = 800
+MIN_HEIGHT = 600
+
+# (absolute path, size, mtime) -> content hash
+_known_hashes = {}
+_known_lock = threading.Lock()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _hash_key(path, st):
+    return os.path.abspath(path), st.st_size, st.st_mtime
+
+
+def content_hash(path, st=None):
+    # file_hash, reusing a hash already known for this size and mtime. Hashing
+    # holds the lock, so two threads asking for the same file read it once.
+    key = _hash_key(path, st or os.stat(path))
+    with _known_lock:
+        if key not in _known_hashes:
+            _known_hashes[key] = file_hash(path)
+        return _known_hashes[key]
+
+
+def read_header_size(path):
+    # Image.open only parses the header; pixel data is never decoded here
+    with Image.open(path) as img:
+        return img.size
+
+
+def load_manifest(folder):
+    path = os.path.join(folder, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return {e["name"]: e for e in json.load(f)["images"]}
+    except Exception as e:
+        print(f"Ignoring unreadable manifest {path}: {e}")
+        return {}
+
+
+def save_manifest(folder, entries):
+    path = os.path.join(folder, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "images": entries}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Read-only folders still work, just without the cache
+        print(f"Could not write manifest {path}: {e}")
+
+
+def build_manifest(folder, compute_hash=False):
+    cached = load_manifest(folder)
+    entries = []
+    changed = False
+
+    with os.scandir(folder) as it:
+        for dir_entry in it:
+            if not dir_entry.is_file() or os.path.splitext(dir_entry.name)[1].lower() not in VALID_EXTS:
+                continue
+
+            st = dir_entry.stat()
+            entry = cached.get(dir_entry.name)
+            if entry is None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+                try:
+                    width, height = read_header_size(dir_entry.path)
+                except Exception as e:
+                    print(f"WARNING: Unreadable image {dir_entry.name}: {e}")
+                    width, height = 0, 0
+                entry = {
+                    "name": dir_entry.name,
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                    "hash": None,
+                    "width": width,
+                    "height": height,
+                    "too_small": width < MIN_WIDTH or height < MIN_HEIGHT,
+                }
+                changed = True
+
+            if entry["hash"] is not None:
+                with _known_lock:
+                    _known_hashes[_hash_key(dir_entry.path, st)] = entry["hash"]
+            elif compute_hash:
+                entry["hash"] = content_hash(dir_entry.path, st)
+                changed = True
+
+            entries.append(entry)
+
+    entries.sort(key=lambda e: e["name"])
+    if changed or len(entries) != len(cached):
+        save_manifest(folder, entries)
+    return entries
+
+
+def list_images(folder, skip_small=False, compute_hash=False):
+    entries = build_manifest(folder, compute_hash=compute_hash)
+    return [
+        os.path.join(folder, e["name"])
+        for e in entries
+        if not (skip_small and e["too_small"])
+    ]
+
+
+def list_images_async(root, folder, callback, skip_small=False, compute_hash=False, poll_ms=50):
+    # Build the manifest on a worker thread and hand the path list back on the
+    # Tk thread, so the window stays responsive while a new folder is indexed.
+    # With compute_hash the same thread goes on to fill in missing hashes
+    # after the paths are delivered (see content_hash).
+    result = {}
+
+    def work():
+        try:
+            result["paths"] = list_images(folder, skip_small=skip_small)
+        except Exception as e:
+            print(f"Error scanning {folder}: {e}")
+            result["paths"] = []
+            return
+        if compute_hash:
+            try:
+                build_manifest(folder, compute_hash=True)
+            except Exception as e:
+                print(f"Error hashing {folder}: {e}")
+
+    def poll():
+        if "paths" not in result:
+            root.after(poll_ms, poll)
+        else:
+            callback(result["paths"])
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    root.after(poll_ms, poll)
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else "raw_images"
+    if not os.path.isdir(folder):
+        print(f"Error: folder {folder} not found.")
+        sys.exit(1)
+
+    start = time.time()
+    entries = build_manifest(folder, compute_hash=True)
+    too_small = sum(e["too_small"] for e in entries)
+    print(f"Indexed {len(entries)} images in {time.time() - start:.2f}s "
+          f"({too_small} below {MIN_WIDTH}x{MIN_HEIGHT}) -> {os.path.join(folder, MANIFEST_FILE)}")
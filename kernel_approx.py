@@ -0,0 +1,92 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.utils.metaestimators import available_if
+
+# Scalable stand-in for the notebook's SVC(kernel="rbf", probability=True).
+# The RBF kernel is approximated by an explicit feature map (Nystroem on a
+# sample of the training rows, or random Fourier features) and a linear
+# SGDClassifier is trained on the mapped rows in minibatches, so fit time is
+# linear in the number of cells and the mapped matrix (n_cells x
+# n_components) is never held in memory at once. loss="log_loss" gives
+# predict_proba directly, without SVC's internal 5-fold Platt scaling.
+
+GAMMA_SAMPLE = 10000  # Rows used to estimate gamma="scale"
+
+
+class KernelSGDClassifier(ClassifierMixin, BaseEstimator):
+    def __init__(self, approximation="nystroem", n_components=1000, gamma="scale", loss="log_loss",
+                 alpha=1e-4, average=False, class_weight="balanced", batch_size=2048, epochs=5, random_state=None):
+        self.approximation = approximation
+        self.n_components = n_components
+        self.gamma = gamma
+        self.loss = loss
+        self.alpha = alpha
+        self.average = average
+        self.class_weight = class_weight
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.random_state = random_state
+
+    def _gamma(self, X, rng):
+        # "scale" as in SVC: 1 / (n_features * X.var()), with the variance
+        # estimated on a row sample instead of a full-matrix temporary
+        if self.gamma == "scale":
+            var = X[rng.choice(len(X), min(len(X), GAMMA_SAMPLE), replace=False)].var()
+            return 1.0 / (X.shape[1] * var) if var > 0 else 1.0
+        return float(self.gamma)
+
+    def _feature_map(self, X, rng):
+        from sklearn.kernel_approximation import Nystroem, RBFSampler
+        gamma = self._gamma(X, rng)
+        if self.approximation == "nystroem":
+            # Landmarks come from a random sample, so the map costs
+            # O(n_components^2) to fit whatever the number of cells
+            n = min(self.n_components, len(X))
+            sample = X[rng.choice(len(X), n, replace=False)]
+            return Nystroem(gamma=gamma, n_components=n, random_state=self.random_state).fit(sample)
+        if self.approximation == "rff":
+            return RBFSampler(gamma=gamma, n_components=self.n_components, random_state=self.random_state).fit(X[:1])
+        raise ValueError(f"Unknown approximation: {self.approximation}")
+
+    def fit(self, X, y):
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.utils.class_weight import compute_class_weight
+        X = np.asarray(X)
+        y = np.asarray(y)
+        rng = np.random.default_rng(self.random_state)
+        self.classes_ = np.unique(y)
+
+        # partial_fit has no class_weight="balanced", so it becomes per-row weights
+        if self.class_weight == "balanced":
+            weights = compute_class_weight("balanced", classes=self.classes_, y=y)
+        elif isinstance(self.class_weight, dict):
+            weights = np.array([self.class_weight.get(c, 1.0) for c in self.classes_])
+        else:
+            weights = np.ones(len(self.classes_))
+        sample_weight = weights[np.searchsorted(self.classes_, y)]
+
+        self.feature_map_ = self._feature_map(X, rng)
+        self.linear_ = SGDClassifier(loss=self.loss, alpha=self.alpha, average=self.average,
+                                     random_state=self.random_state)
+        for _ in range(self.epochs):
+            order = rng.permutation(len(X))
+            for start in range(0, len(X), self.batch_size):
+                rows = order[start:start + self.batch_size]
+                self.linear_.partial_fit(self.feature_map_.transform(X[rows]), y[rows],
+                                         classes=self.classes_, sample_weight=sample_weight[rows])
+        return self
+
+    def _batches(self, X, fn):
+        X = np.asarray(X)
+        return np.concatenate([fn(self.feature_map_.transform(X[start:start + self.batch_size]))
+                               for start in range(0, len(X), self.batch_size)])
+
+    def decision_function(self, X):
+        return self._batches(X, self.linear_.decision_function)
+
+    def predict(self, X):
+        return self._batches(X, self.linear_.predict)
+
+    @available_if(lambda self: self.loss in ("log_loss", "modified_huber"))
+    def predict_proba(self, X):
+        return self._batches(X, self.linear_.predict_proba)
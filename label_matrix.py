@@ -0,0 +1,133 @@
+import os
+import numpy as np
+
+# Grid labels for many images as one uint8 (N, 64) array with a name -> row
+# index. Reads and writes the labels.csv / auto_labels.csv /
+# predicted_labels.csv schema: ImageFileName, TrainOrTest, c01..c64.
+# pandas is imported on first CSV/DataFrame use so the GUI tools can hold a
+# LabelMatrix without paying for it at startup.
+# Rows live in a buffer that doubles when full, so appending one image per
+# save costs amortized O(1) instead of copying the whole array.
+
+N_CELLS = 64
+N_CLASSES = 4  # 0: None, 1: Ball, 2: Bat, 3: Stump
+CLASS_NAMES = ["None", "Ball", "Bat", "Stump"]
+CELL_COLUMNS = [f"c{i+1:02d}" for i in range(N_CELLS)]
+COLUMNS = ["ImageFileName", "TrainOrTest"] + CELL_COLUMNS
+
+
+class LabelMatrix:
+    def __init__(self, names=(), splits=None, labels=None):
+        self.names = list(names)
+        self.splits = list(splits) if splits is not None else ["Train"] * len(self.names)
+        if labels is None:
+            labels = np.zeros((len(self.names), N_CELLS), dtype=np.uint8)
+        self.labels = np.asarray(labels, dtype=np.uint8).reshape(-1, N_CELLS)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    @property
+    def labels(self):
+        # (N, 64) view of the filled rows
+        return self._buffer[:self._n]
+
+    @labels.setter
+    def labels(self, value):
+        self._buffer = value
+        self._n = len(value)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        # Missing cell columns are treated as background
+        cells = df.reindex(columns=CELL_COLUMNS, fill_value=0).to_numpy(dtype=np.uint8)
+        splits = df["TrainOrTest"].tolist() if "TrainOrTest" in df else None
+        return cls(df["ImageFileName"].tolist(), splits, cells)
+
+    @classmethod
+    def read_csv(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        import pandas as pd
+        dtypes = {c: np.uint8 for c in CELL_COLUMNS}
+        dtypes.update({"ImageFileName": str, "TrainOrTest": str})
+        return cls.from_dataframe(pd.read_csv(path, dtype=dtypes))
+
+    @classmethod
+    def from_cells(cls, image_names, cell_indices, values, split="Predicted"):
+        # Build from a long list of (image, cell, label) triples, e.g. per-cell
+        # predictions with their meta. Images keep first-appearance order.
+        import pandas as pd
+        codes, names = pd.factorize(pd.Series(image_names))
+        labels = np.zeros((len(names), N_CELLS), dtype=np.uint8)
+        labels[codes, np.asarray(cell_indices)] = np.asarray(values)
+        return cls(list(names), [split] * len(names), labels)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def get(self, name):
+        i = self.index.get(name)
+        return self.labels[i] if i is not None else None
+
+    def set(self, name, labels, split="Train"):
+        row = np.asarray(labels, dtype=np.uint8).reshape(N_CELLS)
+        i = self.index.get(name)
+        if i is None:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.splits.append(split)
+            if self._n == len(self._buffer):
+                grown = np.zeros((max(2 * self._n, 16), N_CELLS), dtype=np.uint8)
+                grown[:self._n] = self._buffer[:self._n]
+                self._buffer = grown
+            self._buffer[self._n] = row
+            self._n += 1
+        else:
+            self.splits[i] = split
+            self.labels[i] = row
+
+    def rows(self, names):
+        # Row indices for names, -1 where a name is missing
+        return np.array([self.index.get(n, -1) for n in names], dtype=np.int64)
+
+    def to_dataframe(self):
+        import pandas as pd
+        df = pd.DataFrame(self.labels, columns=CELL_COLUMNS)
+        df.insert(0, "TrainOrTest", self.splits)
+        df.insert(0, "ImageFileName", self.names)
+        return df
+
+    def to_csv(self, path):
+        self.to_dataframe().to_csv(path, index=False)
+
+    # --- Vectorized queries ---
+
+    def class_counts(self):
+        return np.bincount(self.labels.ravel(), minlength=N_CLASSES)
+
+    def cell_frequencies(self):
+        # (N_CLASSES, 64): how often each class appears in each cell
+        onehot = self.labels[:, :, None] == np.arange(N_CLASSES)
+        return onehot.sum(axis=0).T
+
+    def long_format(self):
+        # One row per cell: ImageFileName, CellIndex, Label
+        import pandas as pd
+        n = len(self.names)
+        return pd.DataFrame({
+            "ImageFileName": np.repeat(np.asarray(self.names, dtype=object), N_CELLS),
+            "CellIndex": np.tile(np.arange(N_CELLS), n),
+            "Label": self.labels.ravel(),
+        })
+
+
+def class_metrics(confusion):
+    # Per-class precision, recall and F1 from a (truth, prediction) confusion matrix
+    tp = np.diag(confusion).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = tp / confusion.sum(axis=0)
+        recall = tp / confusion.sum(axis=1)
+        f1 = 2 * precision * recall / (precision + recall)
+    return precision, recall, f1
@@ -1,8 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw
-import pandas as pd
+from PIL import Image, ImageTk
 import os
+import csv
+import sys
+import time
+from prelabeler import PreLabeler, PREFETCH_AHEAD, RESCORED
+from active_learning import order_by_uncertainty
+from image_manifest import list_images_async
+from deferred_import import import_async
+from label_matrix import LabelMatrix
+from grid_overlay import COLORS as OVERLAY_COLORS, ALPHA as OVERLAY_ALPHA, overlay_image
 
 # --- CONFIGURATION (Based on Project Specs) ---
 GRID_ROWS = 8
@@ -12,6 +20,16 @@ IMG_HEIGHT = 600
 OUTPUT_CSV = "labels.csv"
 CLEAN_DIR = "processed_images"
 REFERENCE_DIR = "labeled_images"
+SESSION_LOG_CSV = "labeling_sessions.csv"
+# Optional trained model used to pre-fill the grid of unlabeled images
+PRELABEL_MODEL = os.path.join("models", "cell_classifier.joblib")
+# Active learning: "entropy" or "margin" per-cell uncertainty
+ACTIVE_LEARNING_METHOD = "entropy"
+REORDER_INTERVAL_MS = 1000
+# Refit PRELABEL_MODEL with train.py in the background every N saved labels (0: never)
+RETRAIN_EVERY = 10
+# Leave images below IMG_WIDTH x IMG_HEIGHT out of the queue (known from the manifest, no decode)
+SKIP_SMALL_IMAGES = True
 
 # Color mapping for visual feedback
 # 0: None, 1: Ball, 2: Bat, 3: Stump
@@ -34,6 +52,31 @@ class CricketLabeler:
         self.current_img_index = 0
         self.grid_data = [0] * 64 # Flat list for c01 to c64
         self.current_image_name = ""
+        self.labels = LabelMatrix()
+        
+        # Paint mode: number keys pick the active class, click-drag paints cells
+        self.paint_mode = tk.BooleanVar(value=False)
+        self.active_class = 1
+        self.last_paint_pos = None
+        
+        # Session throughput stats (cells changed per minute)
+        self.session_start = time.time()
+        self.session_cells = 0
+        self.session_images = 0
+        self.initial_grid = [0] * 64
+        
+        # Model-assisted pre-labeling (only if a trained model bundle exists)
+        self.use_prelabels = tk.BooleanVar(value=os.path.exists(PRELABEL_MODEL))
+        retrain = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "train.py"),
+                   "--labels", OUTPUT_CSV, "--images", CLEAN_DIR, "--output", PRELABEL_MODEL]
+        self.prelabeler = PreLabeler(PRELABEL_MODEL, ACTIVE_LEARNING_METHOD, retrain if RETRAIN_EVERY else None,
+                                     RETRAIN_EVERY) if os.path.exists(PRELABEL_MODEL) else None
+        
+        # Active learning: order the queue by model uncertainty
+        self.active_learning = tk.BooleanVar(value=False)
+        self.labeled_paths = set()
+        self.uncertainty = {}
+        self.reorder_running = False
         
         # Ensure processed directory exists
         # Ensure processed directories exist
@@ -44,26 +87,21 @@ class CricketLabeler:
 
         # UI Setup
         self.setup_ui()
+        self.bind_shortcuts()
         self.create_overlay_images()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # pandas (for labels.csv) loads in the background once the window is up
+        import_async(self.root, ["pandas"])
         
     def create_overlay_images(self):
         self.overlay_images = {}
         cell_w = int(IMG_WIDTH / GRID_COLS)
         cell_h = int(IMG_HEIGHT / GRID_ROWS)
-        alpha = 70 # Reduced opacity (0-255)
-        
-        # Map IDs to RGB
-        rgb_map = {
-            1: (255, 0, 0),   # Red
-            2: (0, 0, 255),   # Blue
-            3: (0, 255, 0)    # Green
-        }
         
-        for key, rgb in rgb_map.items():
-            # Create PIL Image for saving later
-            pil_overlay = Image.new("RGBA", (cell_w, cell_h), rgb + (alpha,))
-            self.overlay_images_pil = self.overlay_images_pil if hasattr(self, 'overlay_images_pil') else {}
-            self.overlay_images_pil[key] = pil_overlay
+        # Same colours as the saved reference images (grid_overlay.py)
+        for key, rgb in OVERLAY_COLORS.items():
+            pil_overlay = Image.new("RGBA", (cell_w, cell_h), rgb + (OVERLAY_ALPHA,))
             
             # Create PhotoImage for UI
             self.overlay_images[key] = ImageTk.PhotoImage(pil_overlay)
@@ -106,10 +144,25 @@ class CricketLabeler:
         self.lbl_status = tk.Label(control_frame, text="No images loaded")
         self.lbl_status.pack(side=tk.LEFT, padx=10)
         
+        chk_paint = tk.Checkbutton(control_frame, text="Paint Mode", variable=self.paint_mode, command=self.update_mode_label)
+        chk_paint.pack(side=tk.RIGHT)
+        
+        if self.prelabeler is not None:
+            chk_prelabel = tk.Checkbutton(control_frame, text="Model Pre-labels", variable=self.use_prelabels)
+            chk_prelabel.pack(side=tk.RIGHT)
+            chk_active = tk.Checkbutton(control_frame, text="Active Learning Order", variable=self.active_learning, command=self.start_active_learning)
+            chk_active.pack(side=tk.RIGHT)
+        
+        self.lbl_mode = tk.Label(control_frame, text="")
+        self.lbl_mode.pack(side=tk.RIGHT, padx=10)
+        self.update_mode_label()
+        
         # Main Canvas for Image
         self.canvas = tk.Canvas(self.scrollable_frame, width=IMG_WIDTH, height=IMG_HEIGHT, bg="grey")
         self.canvas.pack(padx=10, pady=10)
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<B1-Motion>", self.on_canvas_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
         
         # Bottom Control Panel
         bottom_frame = tk.Frame(self.scrollable_frame)
@@ -124,8 +177,13 @@ class CricketLabeler:
         btn_skip = tk.Button(bottom_frame, text="Skip >>", command=self.skip_image)
         btn_skip.pack(side=tk.RIGHT, padx=5)
 
+        btn_clear = tk.Button(bottom_frame, text="Clear All", command=self.clear_grid)
+        btn_clear.pack(side=tk.RIGHT, padx=5)
+
         # Instructions
-        lbl_instr = tk.Label(bottom_frame, text="Click grid cells to toggle: Ball(1) -> Bat(2) -> Stump(3)")
+        lbl_instr = tk.Label(bottom_frame, text="Click grid cells to toggle: Ball(1) -> Bat(2) -> Stump(3)\n"
+                             "Keys 0-3: paint class (0 erases), click-drag to paint | "
+                             "Enter: Save & Next, Right: Skip, Left: Previous, C: Clear All, Esc: Toggle mode")
         lbl_instr.pack(side=tk.TOP)
         
         # Bind mousewheel
@@ -134,6 +192,33 @@ class CricketLabeler:
     def _on_mousewheel(self, event):
         self.main_scroll_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
+    def bind_shortcuts(self):
+        # Number keys select the paint class and switch to paint mode
+        for key in NAMES:
+            self.root.bind(str(key), lambda e, k=key: self.select_paint_class(k))
+        self.root.bind("<Return>", lambda e: self.save_and_next())
+        self.root.bind("<Right>", lambda e: self.skip_image())
+        self.root.bind("<Left>", lambda e: self.prev_image())
+        self.root.bind("<Escape>", lambda e: self.toggle_paint_mode())
+        self.root.bind("c", lambda e: self.clear_grid())
+        self.root.bind("C", lambda e: self.clear_grid())
+
+    def select_paint_class(self, key):
+        self.active_class = key
+        self.paint_mode.set(True)
+        self.update_mode_label()
+
+    def toggle_paint_mode(self):
+        self.paint_mode.set(not self.paint_mode.get())
+        self.update_mode_label()
+
+    def update_mode_label(self):
+        if self.paint_mode.get():
+            text = f"Mode: Paint [{self.active_class}: {NAMES[self.active_class]}]"
+        else:
+            text = "Mode: Click to Cycle"
+        self.lbl_mode.config(text=text)
+
     def load_folder(self):
         initial_dir = os.path.join(os.getcwd(), "raw_images")
         if not os.path.exists(initial_dir):
@@ -143,21 +228,71 @@ class CricketLabeler:
         if not folder_path:
             return
             
-        # Get all images
-        valid_exts = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".jfif", ".pjpeg", ".pjp"}
-        self.image_list = [
-            os.path.join(folder_path, f) 
-            for f in os.listdir(folder_path) 
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed, skip_small=SKIP_SMALL_IMAGES,
+                          compute_hash=self.prelabeler is not None)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
         
         if not self.image_list:
+            self.lbl_status.config(text="No images loaded")
             messagebox.showerror("Error", "No images found in folder!")
             return
             
         self.current_img_index = 0
+        self.uncertainty = {}
+        self.load_labels()
+        self.start_active_learning()
         self.load_current_image()
 
+    def load_labels(self):
+        # Labels are read once per folder and kept in memory; saves rewrite the CSV
+        try:
+            self.labels = LabelMatrix.read_csv(OUTPUT_CSV)
+        except Exception as e:
+            print(f"Error loading existing labels: {e}")
+            self.labels = LabelMatrix()
+
+    def start_active_learning(self):
+        if not self.active_learning.get() or self.prelabeler is None or not self.image_list:
+            return
+            
+        # Already labeled images go to the back of the queue
+        self.labeled_paths = {p for p in self.image_list if os.path.basename(p) in self.labels}
+        unlabeled = [p for p in self.image_list if p not in self.labeled_paths]
+        self.prelabeler.enqueue(unlabeled)
+        print(f"Active learning: scoring {len(unlabeled)} unlabeled images ({ACTIVE_LEARNING_METHOD})")
+        if not self.reorder_running:
+            self.reorder_running = True
+            self.root.after(REORDER_INTERVAL_MS, self.reorder_queue)
+
+    def reorder_queue(self):
+        if not self.active_learning.get() or self.prelabeler is None:
+            self.reorder_running = False
+            return
+            
+        # Pick up scores finished since the last tick; a new model makes
+        # every earlier score stale
+        updates = self.prelabeler.drain_scores()
+        for item in updates:
+            if item is RESCORED:
+                self.uncertainty = {}
+            else:
+                self.uncertainty[item[0]] = item[1]
+                
+        # Only the part of the queue after the current image is reordered
+        if updates:
+            head = self.image_list[:self.current_img_index + 1]
+            tail = self.image_list[self.current_img_index + 1:]
+            new_tail = order_by_uncertainty(tail, self.uncertainty, self.labeled_paths)
+            if new_tail != tail:
+                self.image_list = head + new_tail
+                self.schedule_prelabels()
+            
+        self.root.after(REORDER_INTERVAL_MS, self.reorder_queue)
+
     def load_current_image(self):
         if not self.image_list:
             return
@@ -188,23 +323,61 @@ class CricketLabeler:
             # Reset grid data for new image
             self.grid_data = [0] * 64 
             
+            has_labels = False
+            
             # Load existing labels if available
-            if os.path.exists(OUTPUT_CSV):
-                try:
-                    df = pd.read_csv(OUTPUT_CSV)
-                    if self.current_image_name in df["ImageFileName"].values:
-                        row = df[df["ImageFileName"] == self.current_image_name].iloc[0]
-                        # Columns are c01, c02... c64
-                        self.grid_data = [row[f"c{i+1:02d}"] for i in range(64)]
-                        print(f"Loaded existing labels for {self.current_image_name}")
-                except Exception as e:
-                    print(f"Error loading existing labels: {e}") 
+            existing = self.labels.get(self.current_image_name)
+            if existing is not None:
+                self.grid_data = [int(v) for v in existing]
+                has_labels = True
+                print(f"Loaded existing labels for {self.current_image_name}")
+            
+            # Pre-fill from the model if a prediction is already cached, otherwise keep zeros
+            if not has_labels and self.prelabels_enabled():
+                prediction = self.prelabeler.get(filepath)
+                if prediction is not None:
+                    self.grid_data = list(prediction[0])
+                else:
+                    self.root.after(250, self.apply_late_prelabels, filepath)
+            
+            # Remember the starting labels so throughput counts only edited cells
+            self.initial_grid = list(self.grid_data)
             
             self.draw_grid()
             self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
+            self.schedule_prelabels()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {e}")
 
+    def prelabels_enabled(self):
+        return self.prelabeler is not None and not self.prelabeler.failed and self.use_prelabels.get()
+
+    def schedule_prelabels(self):
+        # Predict the current image first, then the next few in the queue
+        if not self.prelabels_enabled():
+            return
+        start = self.current_img_index
+        self.prelabeler.schedule(self.image_list[start:start + PREFETCH_AHEAD + 1])
+
+    def apply_late_prelabels(self, filepath, attempts=40):
+        # Prediction arrived after the image was shown: apply it only while
+        # the annotator is still on that image and has not touched the grid
+        if not self.prelabels_enabled() or getattr(self, 'current_pil_img', None) is None:
+            return
+        if not self.image_list or self.image_list[self.current_img_index] != filepath:
+            return
+        if self.grid_data != self.initial_grid or any(self.grid_data):
+            return
+            
+        prediction = self.prelabeler.get(filepath)
+        if prediction is None:
+            if attempts > 1:
+                self.root.after(250, self.apply_late_prelabels, filepath, attempts - 1)
+            return
+        self.grid_data = list(prediction[0])
+        self.initial_grid = list(self.grid_data)
+        self.draw_grid()
+
     def draw_grid(self):
         # Clear existing rectangles/lines (keep image which is item 1)
         self.canvas.delete("grid_line")
@@ -239,25 +412,68 @@ class CricketLabeler:
             y = i * cell_h
             self.canvas.create_line(0, y, IMG_WIDTH, y, fill="yellow", tags="grid_line")
 
-    def on_canvas_click(self, event):
-        if not self.image_list:
-            return
-            
+    def cell_index_at(self, x, y):
         # Determine cell
         cell_w = IMG_WIDTH / GRID_COLS
         cell_h = IMG_HEIGHT / GRID_ROWS
         
-        col = int(event.x // cell_w)
-        row = int(event.y // cell_h)
+        col = int(x // cell_w)
+        row = int(y // cell_h)
         
+        if not (0 <= col < GRID_COLS and 0 <= row < GRID_ROWS):
+            return None
         # Calculate flat index (0-63)
-        index = row * GRID_COLS + col
+        return row * GRID_COLS + col
+
+    def on_canvas_click(self, event):
+        if not self.image_list:
+            return
+            
+        if self.paint_mode.get():
+            self.last_paint_pos = (event.x, event.y)
+            self.paint_segment(event.x, event.y, event.x, event.y)
+            return
+            
+        index = self.cell_index_at(event.x, event.y)
         
-        if 0 <= index < 64:
+        if index is not None:
             # Toggle class: 0 -> 1 -> 2 -> 3 -> 0
             self.grid_data[index] = (self.grid_data[index] + 1) % 4
             self.draw_grid()
 
+    def on_canvas_drag(self, event):
+        if not self.image_list or not self.paint_mode.get() or self.last_paint_pos is None:
+            return
+        x0, y0 = self.last_paint_pos
+        self.last_paint_pos = (event.x, event.y)
+        self.paint_segment(x0, y0, event.x, event.y)
+
+    def on_canvas_release(self, event):
+        self.last_paint_pos = None
+
+    def paint_segment(self, x0, y0, x1, y1):
+        # Motion events can skip cells on fast drags, so walk the segment
+        # between consecutive pointer positions in sub-cell steps
+        step = min(IMG_WIDTH / GRID_COLS, IMG_HEIGHT / GRID_ROWS) / 4
+        n_steps = max(1, int(max(abs(x1 - x0), abs(y1 - y0)) / step))
+        
+        changed = False
+        for s in range(n_steps + 1):
+            t = s / n_steps
+            index = self.cell_index_at(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+            if index is not None and self.grid_data[index] != self.active_class:
+                self.grid_data[index] = self.active_class
+                changed = True
+                
+        if changed:
+            self.draw_grid()
+
+    def clear_grid(self):
+        if not self.image_list:
+            return
+        self.grid_data = [0] * 64
+        self.draw_grid()
+
     def save_and_next(self):
         if not self.image_list:
             return
@@ -273,55 +489,10 @@ class CricketLabeler:
                 messagebox.showinfo("Done", "All images processed!")
             return
 
-        # Prepare Data Row
-        row_dict = {
-            "ImageFileName": self.current_image_name,
-            "TrainOrTest": "Train" 
-        }
-        
-        for i in range(64):
-            # Formats column name as c01, c02... c64
-            col_name = f"c{i+1:02d}"
-            row_dict[col_name] = self.grid_data[i]
-            
-        df_new = pd.DataFrame([row_dict])
-        
         # --- SAVE VISUALIZED IMAGE ---
         try:
-            # Create a copy of the base image to draw on
-            save_img = self.current_pil_img.copy()
-            
-            cell_w = int(IMG_WIDTH / GRID_COLS)
-            cell_h = int(IMG_HEIGHT / GRID_ROWS)
-            
-            for idx, val in enumerate(self.grid_data):
-                if val != 0 and val in self.overlay_images_pil:
-                    row = idx // GRID_COLS
-                    col = idx % GRID_COLS
-                    x = col * cell_w
-                    y = row * cell_h
-                    
-                    # Paste the overlay
-                    save_img.paste(self.overlay_images_pil[val], (x, y), self.overlay_images_pil[val])
-            
-            # Draw Grid Lines
-            draw = ImageDraw.Draw(save_img)
-            # Vertical
-            for i in range(1, GRID_COLS):
-                x = i * cell_w
-                draw.line([(x, 0), (x, IMG_HEIGHT)], fill="yellow", width=1)
-            # Horizontal
-            for i in range(1, GRID_ROWS):
-                y = i * cell_h
-                draw.line([(0, y), (IMG_WIDTH, y)], fill="yellow", width=1)
-
-            # Draw Cell Numbers
-            for i in range(64):
-                row = i // GRID_COLS
-                col = i % GRID_COLS
-                x = col * cell_w + 2
-                y = row * cell_h + 2
-                draw.text((x, y), str(i+1), fill="white")
+            # Label colours, grid lines and cell numbers in one vectorized blend
+            save_img = overlay_image(self.current_pil_img, self.grid_data)
 
             # Save to processed_images (convert back to RGB to remove alpha channel if saving as jpg)
             # Save CLEAN image (resized, no overlay) to Processed_image
@@ -330,43 +501,26 @@ class CricketLabeler:
 
             # Save REFERENCE image (with overlay) to Reference_Images
             ref_save_path = os.path.join(REFERENCE_DIR, self.current_image_name)
-            save_img.convert("RGB").save(ref_save_path)
+            save_img.save(ref_save_path)
             
         except Exception as e:
             print(f"Error saving visualized image: {e}")
 
-        # Append to CSV
-        
         # Update or Append to CSV
-        if os.path.exists(OUTPUT_CSV):
-            try:
-                df = pd.read_csv(OUTPUT_CSV)
-                
-                # Check if image already exists
-                if self.current_image_name in df["ImageFileName"].values:
-                    print(f"Updating existing entry for {self.current_image_name}")
-                    # Update existing row
-                    # We need to ensure we update all columns
-                    for col, val in row_dict.items():
-                        df.loc[df["ImageFileName"] == self.current_image_name, col] = val
-                else:
-                    # Append new row
-                    df_new = pd.DataFrame([row_dict])
-                    df = pd.concat([df, df_new], ignore_index=True)
-                
-                df.to_csv(OUTPUT_CSV, index=False)
-                
-            except Exception as e:
-                print(f"Error reading/writing CSV: {e}")
-                # Fallback to append if read fails (e.g. empty file)
-                df_new = pd.DataFrame([row_dict])
-                df_new.to_csv(OUTPUT_CSV, mode='a', header=False, index=False)
-        else:
-            # Create new file
-            df_new = pd.DataFrame([row_dict])
-            df_new.to_csv(OUTPUT_CSV, index=False)
+        if self.current_image_name in self.labels:
+            print(f"Updating existing entry for {self.current_image_name}")
+        self.labels.set(self.current_image_name, self.grid_data, "Train")
+        try:
+            self.labels.to_csv(OUTPUT_CSV)
+        except Exception as e:
+            print(f"Error writing CSV: {e}")
             
         print(f"Saved {self.current_image_name}")
+        self.record_throughput()
+        
+        if self.prelabeler is not None:
+            self.labeled_paths.add(self.image_list[self.current_img_index])
+            self.prelabeler.notify_labels_saved(self.image_list[self.current_img_index])
         
         # Move to next
         if self.current_img_index < len(self.image_list) - 1:
@@ -375,6 +529,47 @@ class CricketLabeler:
         else:
             messagebox.showinfo("Done", "All images processed!")
 
+    def record_throughput(self):
+        edited = sum(1 for a, b in zip(self.grid_data, self.initial_grid) if a != b)
+        self.session_cells += edited
+        self.session_images += 1
+        self.initial_grid = list(self.grid_data)
+        
+        minutes = (time.time() - self.session_start) / 60
+        rate = self.session_cells / minutes if minutes > 0 else 0.0
+        print(f"Session: {self.session_cells} cells over {self.session_images} images "
+              f"in {minutes:.1f} min ({rate:.1f} cells/min)")
+
+    def log_session(self):
+        if self.session_images == 0:
+            return
+            
+        end = time.time()
+        minutes = (end - self.session_start) / 60
+        row = {
+            "SessionStart": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.session_start)),
+            "SessionEnd": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end)),
+            "Images": self.session_images,
+            "Cells": self.session_cells,
+            "Minutes": round(minutes, 2),
+            "CellsPerMinute": round(self.session_cells / minutes, 2) if minutes > 0 else 0.0
+        }
+        
+        try:
+            write_header = not os.path.exists(SESSION_LOG_CSV)
+            with open(SESSION_LOG_CSV, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                if write_header:
+                    writer.writeheader()
+                writer.writerow(row)
+            print(f"Session logged to {SESSION_LOG_CSV}: {row['CellsPerMinute']} cells/min")
+        except Exception as e:
+            print(f"Error logging session: {e}")
+
+    def on_close(self):
+        self.log_session()
+        self.root.destroy()
+
     def prev_image(self):
         if self.current_img_index > 0:
             self.current_img_index -= 1
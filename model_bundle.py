@@ -0,0 +1,78 @@
+import os
+import joblib
+import numpy as np
+import cell_features
+
+# A bundle is a single joblib file holding everything needed to label a grid:
+# the fitted scaler, the classifier and the feature config it was trained on.
+MODEL_DIR = "models"
+MODEL_FILE = os.path.join(MODEL_DIR, "cell_classifier.joblib")
+CLASSES = [0, 1, 2, 3]  # 0: None, 1: Ball, 2: Bat, 3: Stump
+
+
+def save_bundle(model, scaler, feature_config=None, path=MODEL_FILE, **extra):
+    feature_config = feature_config or cell_features.DEFAULT_FEATURE_CONFIG
+    bundle = {
+        "model": model,
+        "scaler": scaler,
+        "feature_config": feature_config,
+        "fingerprint": cell_features.config_fingerprint(feature_config),
+    }
+    bundle.update(extra)
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    joblib.dump(bundle, path)
+    print(f"Saved model bundle to {path}")
+    return bundle
+
+
+def load_bundle(path=MODEL_FILE):
+    if not os.path.exists(path):
+        print(f"Model bundle not found: {path}")
+        return None
+    if path.endswith(".npz"):
+        # Array export of a Random Forest bundle (forest_arrays.py)
+        import forest_arrays
+        return forest_arrays.load_npz(path)
+    return joblib.load(path)
+
+
+def predict_proba(bundle, X):
+    # Returns (n_rows, len(CLASSES)) probabilities, whatever subset of
+    # classes the model was trained on
+    X_scaled = bundle["scaler"].transform(X) if bundle.get("scaler") is not None else X
+    model = bundle["model"]
+    proba = np.zeros((len(X_scaled), len(CLASSES)))
+
+    if hasattr(model, "predict_proba"):
+        model_proba = model.predict_proba(X_scaled)
+        for j, cls in enumerate(model.classes_):
+            proba[:, CLASSES.index(int(cls))] = model_proba[:, j]
+    else:
+        pred = model.predict(X_scaled)
+        proba[np.arange(len(pred)), [CLASSES.index(int(p)) for p in pred]] = 1.0
+    return proba
+
+
+def predict_labels(bundle, X):
+    # Hard labels only: the model's own predict(), which for SVC skips the
+    # Platt-scaled probabilities predict_proba needs
+    X_scaled = bundle["scaler"].transform(X) if bundle.get("scaler") is not None else X
+    return np.asarray(bundle["model"].predict(X_scaled), dtype=np.uint8)
+
+
+def predict_image(bundle, img):
+    # Labels (64,) and probabilities (64, 4) for one 800x600 RGB image. A
+    # bundle with a cascade stage featurizes only the cells it passes and
+    # returns certain background for the rest (cascade.py).
+    if bundle.get("cascade") is not None:
+        import cascade
+        cells, X = cascade.extract_cascade(img, bundle.get("feature_config"), bundle["cascade"])
+        proba = cascade.fill_proba(cells, predict_proba(bundle, X) if X is not None else None, len(CLASSES))
+    else:
+        X = cell_features.extract_image_features(img, bundle.get("feature_config"))
+        proba = predict_proba(bundle, X)
+    labels = np.asarray(CLASSES)[proba.argmax(axis=1)]
+    return labels, proba
@@ -0,0 +1,107 @@
+import numpy as np
+
+# Rendering layer for the feature visualizers. A panel creates its axes and
+# artists once and only swaps their data on each click (set_data / set_ydata
+# / step heights). Changing artists are "animated": after a full draw the
+# static background (axes, ticks, labels) is cached, and later updates are
+# blitted on top of it. A full draw_idle happens only when the layout changes
+# (e.g. new y-limits), which also refreshes the cached background.
+
+
+class PanelFigure:
+    def __init__(self, fig):
+        self.fig = fig
+        self.canvas = None
+        self.background = None
+        self.artists = []
+        self.titles = []
+        self.needs_full_draw = True
+
+    def attach(self, canvas):
+        self.canvas = canvas
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def animate(self, artist, visible=False):
+        artist.set_animated(True)
+        artist.set_visible(visible)
+        self.artists.append(artist)
+        return artist
+
+    def animate_title(self, ax, text):
+        # Titles that change per click are blitted too; clear() restores text
+        ax.set_title(text)
+        self.titles.append((ax, text))
+        return self.animate(ax.title, visible=True)
+
+    def image_artist(self, ax, shape, cmap=None):
+        # Placeholder image sized like a cell; real data arrives in set_image()
+        return self.animate(ax.imshow(np.zeros(shape, dtype=np.uint8), cmap=cmap))
+
+    def set_image(self, artist, img):
+        if artist.get_array().shape[:2] != img.shape[:2]:
+            h, w = img.shape[:2]
+            artist.set_extent((-0.5, w - 0.5, h - 0.5, -0.5))
+            artist.axes.set_xlim(-0.5, w - 0.5)
+            artist.axes.set_ylim(h - 0.5, -0.5)
+            self.needs_full_draw = True
+        artist.set_data(img)
+        if img.ndim == 2:
+            # Grayscale images autoscale like a fresh imshow would
+            artist.set_clim(float(img.min()), float(img.max()))
+        artist.set_visible(True)
+
+    def fit_ylim(self, ax, ymax):
+        # Keep the current limits while the data still fits reasonably,
+        # otherwise rescale (which needs a full draw for the new ticks)
+        ymax = float(ymax) if ymax > 0 else 1.0
+        top = ax.get_ylim()[1]
+        if ymax > top or ymax < 0.5 * top:
+            ax.set_ylim(0, ymax * 1.05)
+            self.needs_full_draw = True
+
+    def set_title(self, ax, text):
+        if ax.title.get_text() != text:
+            ax.title.set_text(text)
+            if not ax.title.get_animated():
+                self.needs_full_draw = True
+
+    def clear(self):
+        for artist in self.artists:
+            artist.set_visible(False)
+        for ax, text in self.titles:
+            ax.title.set_text(text)
+            ax.title.set_visible(True)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.artists:
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+
+    def refresh(self, full=False):
+        if self.canvas is None:
+            return
+        if full or self.needs_full_draw or self.background is None or not self.canvas.supports_blit:
+            self.needs_full_draw = False
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+
+class PanelPlugin:
+    # What a visualizer contributes to the workbench: a per-cell feature
+    # function (run in the background by the shared cache) and a panel class
+    # that renders those features on its own Figure. heavy_modules are the
+    # libraries compute_cell imports on first use; hosts preload them in the
+    # background after the window is up.
+    def __init__(self, name, compute_cell, panel_class, figsize, heavy_modules=()):
+        self.name = name
+        self.compute_cell = compute_cell
+        self.panel_class = panel_class
+        self.figsize = figsize
+        self.heavy_modules = list(heavy_modules)
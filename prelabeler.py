@@ -0,0 +1,189 @@
+import os
+import queue
+import threading
+import subprocess
+from image_manifest import content_hash
+
+# Background worker that predicts grid labels for upcoming images so the
+# labeler can pre-fill them. Heavy imports (joblib, sklearn, skimage, cv2)
+# happen on the worker thread so the UI never waits on them.
+# Prefetch requests (schedule) always run before the low-priority backlog
+# (enqueue), which is used to score a whole folder for active learning.
+# With an uncertainty method, every finished prediction also puts a
+# (path, uncertainty) pair on a queue the UI drains (drain_scores), so the
+# UI never walks the whole folder to find new scores. With a retrain
+# command, every RETRAIN_EVERY saved labels the model is refitted in a
+# subprocess; when the new bundle lands, the backlog is rescored.
+
+PREFETCH_AHEAD = 5
+RETRAIN_EVERY = 10  # Saved labels between background refits
+RESCORED = None  # Put on the score queue when all scores are stale
+
+
+class PreLabeler:
+    def __init__(self, model_path, uncertainty_method=None, retrain_command=None, retrain_every=RETRAIN_EVERY):
+        self.model_path = model_path
+        self.uncertainty_method = uncertainty_method
+        self.retrain_command = retrain_command
+        self.retrain_every = retrain_every
+        self.saved_since_retrain = 0
+        self.retraining = False
+        self.scores = queue.Queue()
+        self.bundle = None
+        self.model_mtime = None
+        self.failed = False
+
+        # image hash -> (labels, proba); path -> image hash
+        self.predictions = {}
+        self.path_hashes = {}
+
+        self.wanted = []
+        self.backlog = []
+        self.backlog_all = []
+        self.check_model = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def schedule(self, paths):
+        # Replace the work list so the worker always follows the current position
+        with self.cond:
+            self.wanted = [p for p in paths if self.path_hashes.get(p) not in self.predictions]
+            self.cond.notify()
+
+    def enqueue(self, paths):
+        # Low-priority work: predict every path once the prefetch list is empty
+        with self.cond:
+            self.backlog_all = list(paths)
+            self.backlog = [p for p in paths if self.path_hashes.get(p) not in self.predictions]
+            self.cond.notify()
+
+    def notify_labels_saved(self, path=None):
+        # A labeled image leaves the backlog; every retrain_every saves the
+        # model is refitted in the background, and the worker is woken to
+        # pick up a retrained bundle, if any
+        with self.cond:
+            if path is not None:
+                self.backlog_all = [p for p in self.backlog_all if p != path]
+                self.backlog = [p for p in self.backlog if p != path]
+            self.saved_since_retrain += 1
+            start = (self.retrain_command is not None and not self.retraining
+                     and self.saved_since_retrain >= self.retrain_every)
+            if start:
+                self.retraining = True
+                self.saved_since_retrain = 0
+            self.check_model = True
+            self.cond.notify()
+        if start:
+            threading.Thread(target=self._retrain, daemon=True).start()
+
+    def drain_scores(self):
+        # Never blocks: (path, uncertainty) pairs finished since the last
+        # call; a RESCORED entry means earlier scores are stale
+        items = []
+        while True:
+            try:
+                items.append(self.scores.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _retrain(self):
+        # Refit in a subprocess so fitting never holds this process's GIL;
+        # labels saved meanwhile count towards the next refit
+        print(f"Retraining {self.model_path} in the background...")
+        try:
+            result = subprocess.run(self.retrain_command, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"Background retraining failed: {result.stdout[-500:]}{result.stderr[-500:]}")
+        except Exception as e:
+            print(f"Background retraining failed: {e}")
+        with self.cond:
+            self.retraining = False
+            self.check_model = True
+            self.cond.notify()
+
+    def _push_score(self, path, proba):
+        if self.uncertainty_method is not None:
+            from active_learning import image_uncertainty
+            self.scores.put((path, image_uncertainty(proba, self.uncertainty_method)))
+
+    def get(self, path):
+        # Never blocks: returns (labels, proba) or None if not ready yet
+        with self.cond:
+            h = self.path_hashes.get(path)
+            return self.predictions.get(h) if h is not None else None
+
+    def _worker(self):
+        try:
+            self._load_model()
+        except Exception as e:
+            print(f"Pre-labeling disabled, failed to load model: {e}")
+            self.bundle = None
+        if self.bundle is None:
+            self.failed = True
+            return
+        print(f"Pre-labeling enabled with {self.model_path}")
+
+        import model_bundle
+        import cell_features
+
+        while True:
+            with self.cond:
+                while not self.wanted and not self.backlog and not self.check_model:
+                    self.cond.wait()
+                reload = self.check_model
+                self.check_model = False
+                path = None
+                if self.wanted:
+                    path = self.wanted.pop(0)
+                elif self.backlog:
+                    path = self.backlog.pop(0)
+
+            if reload:
+                self._reload_if_changed()
+            if path is None:
+                continue
+
+            try:
+                h = content_hash(path)
+                with self.cond:
+                    self.path_hashes[path] = h
+                    cached = self.predictions.get(h)
+                if cached is not None:
+                    self._push_score(path, cached[1])
+                    continue
+
+                img = cell_features.load_image(path)
+                if img is None:
+                    continue
+                labels, proba = model_bundle.predict_image(self.bundle, img)
+
+                with self.cond:
+                    self.predictions[h] = ([int(v) for v in labels], proba)
+                self._push_score(path, proba)
+            except Exception as e:
+                print(f"Pre-labeling failed for {os.path.basename(path)}: {e}")
+
+    def _load_model(self):
+        import model_bundle
+        # The mtime is recorded only once the load succeeds, so a bundle
+        # caught half-written by a background refit is retried
+        mtime = os.path.getmtime(self.model_path) if os.path.exists(self.model_path) else None
+        self.bundle = model_bundle.load_bundle(self.model_path)
+        self.model_mtime = mtime
+
+    def _reload_if_changed(self):
+        if not os.path.exists(self.model_path) or os.path.getmtime(self.model_path) == self.model_mtime:
+            return
+        try:
+            self._load_model()
+        except Exception as e:
+            print(f"Keeping previous model, failed to reload: {e}")
+            return
+
+        # New model: cached predictions are stale, rescore everything in the background
+        with self.cond:
+            self.predictions.clear()
+            self.backlog = list(self.backlog_all)
+        self.scores.put(RESCORED)
+        print(f"Reloaded {self.model_path}, rescoring {len(self.backlog_all)} images")
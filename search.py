@@ -0,0 +1,214 @@
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from feature_cache import load_dataset, update_cache, load_matrix, LABELS_FILE, IMAGE_DIR, CACHE_DIR, WORKERS
+from train import RANDOM_STATE, build_model
+
+# Unattended model selection: every combination of model hyperparameters
+# (SEARCH_SPACE), feature-family subset and PCA setting is cross-validated
+# with folds grouped by image, candidates running in parallel (--jobs
+# processes). Features come from the feature cache; family subsets are column
+# slices of the cached vectors, so nothing is re-extracted. The fitted
+# scaler/PCA of each (fold, families, PCA) combination is cached on disk via
+# pipeline memory and reused by every model and hyperparameter that shares
+# it. One row per candidate is appended to the results CSV as soon as it
+# finishes; rerunning skips candidates already in the table.
+# Usage: python search.py [--models svm rf mlp] [--folds 5] [--jobs N] [--no-smote]
+
+# Configuration
+RESULTS_CSV = "search_results.csv"
+FOLDS = 5
+JOBS = os.cpu_count() or 1
+TOP = 10  # Best candidates printed at the end
+SCORING = ["accuracy", "balanced_accuracy", "f1_macro"]
+RANK_BY = "f1_macro"
+
+# Hyperparameter grids, applied on top of the train.py presets
+SEARCH_SPACE = {
+    "svm": {"C": [1, 10, 100], "gamma": ["scale"]},
+    "rf": {"n_estimators": [100, 300], "max_depth": [None, 20], "class_weight": [None, "balanced"]},
+    "mlp": {"hidden_layer_sizes": [[100, 50], [200]], "alpha": [1e-4, 1e-3]},
+}
+FAMILY_SUBSETS = [
+    ["hog", "color", "shape", "lbp"],
+    ["hog", "color"],
+    ["color", "shape", "lbp"],
+]
+PCA_COMPONENTS = [None, 100]  # None skips PCA
+
+COLUMNS = ["key", "model", "families", "pca", "params"] + \
+    [f"{stat}_{name}" for name in SCORING for stat in ("mean", "std")] + ["fit_time", "error"]
+
+# Per-process state, filled by init_worker
+worker = {}
+
+
+def candidates(models):
+    # (model, params, families, pca) for every grid point
+    for model in models:
+        space = SEARCH_SPACE[model]
+        for values in itertools.product(*space.values()):
+            params = dict(zip(space, values))
+            for families in FAMILY_SUBSETS:
+                for pca in PCA_COMPONENTS:
+                    yield model, params, families, pca
+
+
+def candidate_key(digest, settings, model, params, families, pca):
+    blob = json.dumps([digest, settings, model, params, families, pca], sort_keys=True).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()
+
+
+def completed_keys(path):
+    # Keys already in the results table; rows cut short by an interrupted
+    # write are ignored (and rerun)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", newline="") as f:
+        return {row["key"] for row in csv.DictReader(f) if row.get("error") is not None}
+
+
+def family_columns(layout, families):
+    return np.concatenate([np.arange(*layout[f]) for f in families])
+
+
+def init_worker(matrix_path, labels_path, groups_path, layout, settings, memory_dir):
+    # The matrix is memory-mapped, so all workers share one copy in the page cache
+    worker["X"] = np.load(matrix_path, mmap_mode="r")
+    worker["y"] = np.load(labels_path)
+    worker["groups"] = np.load(groups_path)
+    worker["layout"] = layout
+    worker["settings"] = settings
+    worker["memory_dir"] = memory_dir
+
+
+def build_pipeline(model, params, families, pca, smote, memory_dir):
+    # select -> scale -> PCA -> SMOTE -> model. Every step before the model
+    # is cached in memory_dir (keyed on its parameters and input), so the
+    # same fold/families/PCA transform is fitted once for all models.
+    from imblearn.pipeline import Pipeline
+    from sklearn.compose import ColumnTransformer
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+    columns = family_columns(worker["layout"], families)
+    steps = [
+        ("select", ColumnTransformer([("families", "passthrough", columns)])),
+        ("scale", StandardScaler()),
+        ("pca", PCA(n_components=pca, random_state=RANDOM_STATE) if pca else "passthrough"),
+    ]
+    if smote:
+        from imblearn.over_sampling import SMOTE
+        steps.append(("smote", SMOTE(random_state=RANDOM_STATE)))
+    steps.append(("model", build_model(model, params)[0]))
+    return Pipeline(steps, memory=memory_dir)
+
+
+def evaluate(job):
+    # Returns a results row; failures are recorded rather than raised
+    from sklearn.model_selection import GroupKFold, cross_validate
+    key, model, params, families, pca = job
+    settings = worker["settings"]
+    row = {"key": key, "model": model, "families": "+".join(families), "pca": pca or "",
+           "params": json.dumps(params, sort_keys=True), "error": ""}
+    try:
+        pipeline = build_pipeline(model, params, families, pca, settings["smote"], worker["memory_dir"])
+        scores = cross_validate(pipeline, worker["X"], worker["y"], groups=worker["groups"],
+                                cv=GroupKFold(n_splits=settings["folds"]), scoring=SCORING, n_jobs=1)
+        for name in SCORING:
+            row[f"mean_{name}"] = round(float(scores[f"test_{name}"].mean()), 4)
+            row[f"std_{name}"] = round(float(scores[f"test_{name}"].std()), 4)
+        row["fit_time"] = round(float(scores["fit_time"].mean()), 2)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}".replace("\n", " ")
+    return row
+
+
+def print_top(path, n):
+    with open(path, "r", newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("error") == "" and r.get(f"mean_{RANK_BY}")]
+    rows.sort(key=lambda r: float(r[f"mean_{RANK_BY}"]), reverse=True)
+    print(f"\nTop {min(n, len(rows))} of {len(rows)} candidates by {RANK_BY}:")
+    print(f"{'model':<6}{'families':<24}{'pca':>5}{'accuracy':>10}{'bal acc':>9}{'F1':>7}{'fit s':>8}  params")
+    for r in rows[:n]:
+        print(f"{r['model']:<6}{r['families']:<24}{r['pca'] or '-':>5}{float(r['mean_accuracy']):>10.4f}"
+              f"{float(r['mean_balanced_accuracy']):>9.4f}{float(r['mean_f1_macro']):>7.4f}"
+              f"{float(r['fit_time']):>8.2f}  {r['params']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter and feature-family search.")
+    parser.add_argument("--models", nargs="+", choices=sorted(SEARCH_SPACE), default=sorted(SEARCH_SPACE))
+    parser.add_argument("--folds", type=int, default=FOLDS, help="GroupKFold splits (grouped by image)")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="Candidates evaluated in parallel")
+    parser.add_argument("--no-smote", action="store_true", help="Fit without SMOTE inside each fold")
+    parser.add_argument("--output", default=RESULTS_CSV)
+    parser.add_argument("--top", type=int, default=TOP)
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Feature extraction processes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.labels):
+        print(f"Error: {args.labels} not found.")
+        sys.exit(1)
+
+    import cell_features
+    data = load_dataset(args.labels, args.images, cache_dir=args.cache)
+    ok = update_cache(data, workers=args.workers)
+    if ok.sum() < args.folds:
+        print(f"Error: {int(ok.sum())} images with features, fewer than --folds {args.folds}.")
+        sys.exit(1)
+
+    settings = {"folds": args.folds, "smote": not args.no_smote, "random_state": RANDOM_STATE}
+    jobs = []
+    for model, params, families, pca in candidates(args.models):
+        key = candidate_key(data["digest"], settings, model, params, families, pca)
+        jobs.append((key, model, params, families, pca))
+    done = completed_keys(args.output)
+    todo = [job for job in jobs if job[0] not in done]
+    print(f"{len(jobs)} candidates x {args.folds} folds: {len(jobs) - len(todo)} already in {args.output}, "
+          f"{len(todo)} to go ({args.jobs} jobs)")
+
+    if todo:
+        # Training matrix written once for the workers to memory-map
+        search_dir = os.path.join(data["folder"], "search")
+        os.makedirs(search_dir, exist_ok=True)
+        cells = np.zeros(data["labels"].shape, dtype=bool)
+        cells[ok] = True
+        paths = [os.path.join(search_dir, name) for name in ("X.npy", "y.npy", "groups.npy")]
+        np.save(paths[0], load_matrix(data, cells))
+        np.save(paths[1], data["labels"][cells])
+        np.save(paths[2], np.nonzero(cells)[0])
+        layout = cell_features.feature_layout(data["feature_config"])
+
+        new_file = not os.path.exists(args.output)
+        start = time.time()
+        with open(args.output, "a", newline="") as f, \
+                ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                                    initargs=(*paths, layout, settings, os.path.join(search_dir, "memory"))) as executor:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            if new_file:
+                writer.writeheader()
+            futures = [executor.submit(evaluate, job) for job in todo]
+            for finished, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                writer.writerow(row)
+                f.flush()
+                result = row["error"] or f"{RANK_BY} {row[f'mean_{RANK_BY}']:.4f}"
+                print(f"  [{finished}/{len(todo)}] {row['model']} {row['families']} pca={row['pca'] or '-'} "
+                      f"{row['params']}: {result}")
+        print(f"Evaluated {len(todo)} candidates in {time.time() - start:.1f}s")
+
+    print_top(args.output, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import cell_features
+from feature_cache import load_dataset, update_cache, load_matrix, LABELS_FILE, IMAGE_DIR, CACHE_DIR, WORKERS
+from train import MODELS, RANDOM_STATE, TEST_SIZE, build_model, split_images, score
+
+# Feature selection that compiles a slimmer extractor. The training images
+# (the same image split train.py uses) are split again into fit and
+# validation images. Features of the full cell vector are ranked on the fit
+# images (Random Forest importance, L1-regularized linear weights or mutual
+# information). For growing k the top-k features are widened to what the
+# extractor can compute separately: a whole HOG block (36 values) or a whole
+# colour/shape/LBP family. The evaluation model is fitted on those columns
+# and scored on the validation images. The smallest k within --budget of
+# the full vector's score wins; only then are the full and chosen columns
+# scored once on the test images, which play no part in the choice.
+# Its extractor config (HOG as a list of block indices) is written as JSON
+# for train.py --feature-config, and every bundle trained on it extracts and
+# predicts on the reduced vector only.
+# Usage: python select_features.py [--method rf|l1|mi] [--budget 0.01] [--output models/feature_config.json]
+
+# Configuration
+K_GRID = [16, 32, 64, 128, 256, 512, 1024, 2048]
+BUDGET = 0.01  # Largest allowed drop of the metric below the full vector
+OUTPUT = os.path.join("models", "feature_config.json")
+TIMING_IMAGES = 5
+METRICS = ["accuracy", "macro_f1"]
+
+
+def rank_features(X, y, method):
+    # Feature indices, most useful first
+    if method == "rf":
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier(n_estimators=200, random_state=RANDOM_STATE, n_jobs=-1).fit(X, y)
+        importance = model.feature_importances_
+    elif method == "l1":
+        from sklearn.svm import LinearSVC
+        model = LinearSVC(penalty="l1", dual=False, C=0.05, class_weight="balanced", max_iter=5000).fit(X, y)
+        importance = np.abs(model.coef_).max(axis=0)
+    elif method == "mi":
+        from sklearn.feature_selection import mutual_info_classif
+        importance = mutual_info_classif(X, y, random_state=RANDOM_STATE)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    return np.argsort(-importance, kind="stable")
+
+
+def feature_units(layout):
+    # Per column of the full vector, the unit the extractor computes it in:
+    # ("hog", block) or (family, None)
+    units = []
+    for family, (start, stop) in layout.items():
+        if family == "hog":
+            units += [("hog", (col - start) // cell_features.HOG_BLOCK_SIZE) for col in range(start, stop)]
+        else:
+            units += [(family, None)] * (stop - start)
+    return units
+
+
+def compile_config(units, chosen):
+    # Extractor config computing only the chosen units
+    blocks = sorted({block for family, block in chosen if family == "hog"})
+    n_blocks = cell_features.HOG_BLOCKS_ROW * cell_features.HOG_BLOCKS_COL
+    config = {"hog": True if len(blocks) == n_blocks else (blocks or False)}
+    for family in cell_features.FEATURE_FAMILIES[1:]:
+        config[family] = any(f == family for f, _ in chosen)
+    return config
+
+
+def config_columns(units, chosen):
+    # Columns of the full vector the compiled config produces, in its order
+    return np.array([i for i, unit in enumerate(units) if unit in chosen], dtype=np.intp)
+
+
+def evaluate(X_train, y_train, X_test, y_test, columns, model_name):
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler().fit(X_train[:, columns])
+    model, _ = build_model(model_name, {})
+    start = time.time()
+    model.fit(scaler.transform(X_train[:, columns]), y_train)
+    fit_time = time.time() - start
+    metrics = score(y_test, model.predict(scaler.transform(X_test[:, columns])))
+    return {"accuracy": metrics["accuracy"], "macro_f1": float(np.mean(list(metrics["f1"].values()))),
+            "fit_time": round(fit_time, 2)}
+
+
+def extraction_time(paths, config):
+    start = time.perf_counter()
+    for path in paths:
+        cell_features.extract_image_features(cell_features.load_image(path), config)
+    return (time.perf_counter() - start) / len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank features and emit a reduced extractor config.")
+    parser.add_argument("--method", choices=["rf", "l1", "mi"], default="rf")
+    parser.add_argument("--metric", choices=METRICS, default="accuracy")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="Allowed drop of --metric vs all features")
+    parser.add_argument("--model", choices=sorted(MODELS), default="rf", help="Model used to score each subset")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.labels):
+        print(f"Error: {args.labels} not found.")
+        sys.exit(1)
+    if not 0.0 < args.test_size < 1.0:
+        print("Error: --test-size must be in (0, 1).")
+        sys.exit(1)
+
+    # Always ranked on the full default vector
+    data = load_dataset(args.labels, args.images, cache_dir=args.cache)
+    ok = update_cache(data, workers=args.workers)
+    train_images, test_images = split_images(np.arange(len(data["names"])), args.test_size)
+    fit_idx, val_idx = split_images(train_images, args.test_size)
+    fit_images, val_images = train_images[fit_idx], train_images[val_idx]
+    matrices = {}
+    for part, images in (("fit", fit_images), ("val", val_images), ("test", test_images)):
+        cells = np.zeros(data["labels"].shape, dtype=bool)
+        cells[images[ok[images]]] = True
+        matrices[part] = (load_matrix(data, cells), data["labels"][cells])
+    X_fit, y_fit = matrices["fit"]
+    X_val, y_val = matrices["val"]
+    if not len(y_fit) or not len(y_val):
+        print("Error: not enough images to fit and validate the subsets.")
+        sys.exit(1)
+
+    from sklearn.preprocessing import StandardScaler
+    start = time.time()
+    order = rank_features(StandardScaler().fit_transform(X_fit), y_fit, args.method)
+    print(f"Ranked {X_fit.shape[1]} features by {args.method} in {time.time() - start:.1f}s")
+
+    units = feature_units(cell_features.feature_layout(data["feature_config"]))
+    all_units = set(units)
+    results = [dict(k=len(units), units=len(all_units), columns=len(units),
+                    **evaluate(X_fit, y_fit, X_val, y_val, np.arange(len(units)), args.model))]
+    full_score = results[0][args.metric]
+    print(f"{'k':>6}{'units':>7}{'columns':>9}{'accuracy':>10}{'macro F1':>10}")
+    print(f"{'all':>6}{len(all_units):>7}{len(units):>9}{results[0]['accuracy']:>10.4f}{results[0]['macro_f1']:>10.4f}")
+
+    chosen_k, chosen = len(units), all_units
+    for k in K_GRID:
+        if k >= len(units):
+            break
+        selected = {units[i] for i in order[:k]}
+        columns = config_columns(units, selected)
+        row = dict(k=k, units=len(selected), columns=len(columns),
+                   **evaluate(X_fit, y_fit, X_val, y_val, columns, args.model))
+        results.append(row)
+        print(f"{k:>6}{row['units']:>7}{row['columns']:>9}{row['accuracy']:>10.4f}{row['macro_f1']:>10.4f}")
+        if row[args.metric] >= full_score - args.budget and len(columns) < len(config_columns(units, chosen)):
+            chosen_k, chosen = k, selected
+            break
+
+    # Held-out check of the choice: fitted on all training images, scored on test
+    X_train = np.concatenate([X_fit, X_val])
+    y_train = np.concatenate([y_fit, y_val])
+    X_test, y_test = matrices["test"]
+    test = None
+    if len(y_test):
+        test = {"all": evaluate(X_train, y_train, X_test, y_test, np.arange(len(units)), args.model),
+                "selected": evaluate(X_train, y_train, X_test, y_test, config_columns(units, chosen), args.model)}
+
+    config = compile_config(units, chosen)
+    timing_paths = [data["paths"][i] for i in val_images[:TIMING_IMAGES]]
+    t_full = extraction_time(timing_paths, data["feature_config"])
+    t_slim = extraction_time(timing_paths, config)
+
+    folder = os.path.dirname(args.output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(config, f, indent=2)
+    report = {
+        "method": args.method,
+        "metric": args.metric,
+        "budget": args.budget,
+        "chosen_k": chosen_k,
+        "feature_config": config,
+        "features": int(len(config_columns(units, chosen))),
+        "images": {"fit": len(fit_images), "validate": len(val_images), "test": len(test_images)},
+        "results": results,
+        "test": test,
+        "extraction_seconds_per_image": {"full": round(t_full, 4), "selected": round(t_slim, 4)},
+    }
+    report_path = os.path.splitext(args.output)[0] + ".report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    hog = config["hog"]
+    print(f"Chose k={chosen_k}: {report['features']} of {len(units)} features "
+          f"({len(hog) if isinstance(hog, list) else ('all' if hog else 0)} HOG blocks, "
+          f"families: {', '.join(f for f in cell_features.FEATURE_FAMILIES if config[f])})")
+    if test is not None:
+        print(f"Test {args.metric}: {test['all'][args.metric]:.4f} (all) -> "
+              f"{test['selected'][args.metric]:.4f} (selected) on {len(test_images)} images")
+    print(f"Extraction: {t_full * 1000:.0f} ms -> {t_slim * 1000:.0f} ms per image")
+    print(f"Config saved to {args.output} (train with: python train.py --feature-config {args.output})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import model_bundle
+import cascade
+from label_matrix import COLUMNS
+
+# Local HTTP inference server. The model bundle is loaded once and cell
+# features are extracted by a pool of processes that keep cv2/skimage
+# imported, so a request pays only for its own image. Extracted images are
+# queued for a batcher thread that coalesces concurrent requests into one
+# predict call (up to --max-batch images, waiting at most --max-wait ms for
+# more to arrive). A bundle with a cascade stage (train_cascade.py)
+# featurizes only the cells the stage passes.
+# Endpoints:
+#   POST /predict[?name=x.jpg]   body: encoded image bytes
+#   POST /predict                body: {"path": "processed_images/x.jpg"} (application/json)
+#   GET  /predict?path=...
+#   GET  /health                 model fingerprint and batching stats
+# Responses hold the 64 labels and class probabilities keyed c01..c64.
+# Usage: python serve.py [--model models/cell_classifier.joblib] [--port 8765] [--workers N]
+
+# Configuration
+HOST = "127.0.0.1"
+PORT = 8765
+WORKERS = os.cpu_count() or 1
+MAX_BATCH = 16  # Images per predict call
+MAX_WAIT_MS = 5  # How long a batch waits for more requests
+MAX_BODY = 32 * 1024 * 1024
+CELL_COLUMNS = COLUMNS[2:]
+
+# Per-process state, filled by init_worker
+worker = {}
+
+
+def init_worker(feature_config, cascade_stage=None, ready=None):
+    try:
+        import cell_features
+        worker["cell_features"] = cell_features
+        worker["config"] = feature_config
+        worker["stage"] = cascade_stage
+        # Extract one blank image so the first request does not pay for lazy setup
+        cell_features.extract_image_features(np.zeros((cell_features.IMG_HEIGHT, cell_features.IMG_WIDTH, 3),
+                                                      dtype=np.uint8), feature_config, cells=[0])
+    except BaseException:
+        if ready is not None:
+            ready.abort()
+        raise
+    # Hold every worker until all have warmed up (see main)
+    if ready is not None:
+        ready.wait()
+
+
+def ping():
+    return os.getpid()
+
+
+def extract(source, payload):
+    # (featurized cells, their features or None) from image bytes or a path;
+    # ValueError if unreadable
+    cell_features = worker["cell_features"]
+    img = cell_features.decode_image(payload) if source == "bytes" else cell_features.load_image(payload)
+    if img is None:
+        raise ValueError("could not decode image" if source == "bytes" else f"could not read {payload}")
+    return cascade.extract_cascade(img, worker["config"], worker["stage"])
+
+
+class MicroBatcher:
+    # Collects (cells, features) from request threads and predicts them
+    # together; submit() returns a Future of the (64, 4) probabilities
+    def __init__(self, bundle, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000.0):
+        self.bundle = bundle
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.images = 0
+        self.predict_time = 0.0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, extracted):
+        future = Future()
+        self.queue.put((extracted, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            blocks = [features for (_, features), _ in batch if features is not None]
+            try:
+                proba = model_bundle.predict_proba(self.bundle, np.concatenate(blocks)) if blocks else None
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.predict_time += time.perf_counter() - start
+            self.batches += 1
+            self.images += len(batch)
+            offset = 0
+            for (cells, features), future in batch:
+                n = len(cells) if features is not None else 0
+                future.set_result(cascade.fill_proba(cells, proba[offset:offset + n] if n else None,
+                                                     len(model_bundle.CLASSES)))
+                offset += n
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "mean_batch": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "predict_seconds": round(self.predict_time, 3),
+        }
+
+
+def grid_response(name, proba):
+    labels = np.asarray(model_bundle.CLASSES)[proba.argmax(axis=1)]
+    return {
+        "ImageFileName": name,
+        "classes": model_bundle.CLASSES,
+        "labels": dict(zip(CELL_COLUMNS, labels.tolist())),
+        "probabilities": dict(zip(CELL_COLUMNS, proba.round(4).tolist())),
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    # self.server carries bundle, executor and batcher (see main)
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            self.send_json(200, {"status": "ok", "fingerprint": self.server.bundle.get("fingerprint"),
+                                 **self.server.batcher.stats()})
+        elif url.path == "/predict" and "path" in query:
+            self.predict("path", query["path"][0], os.path.basename(query["path"][0]))
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            self.send_json(404, {"error": f"unknown endpoint {url.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY:
+            self.send_json(400, {"error": "missing or oversized body"})
+            return
+        body = self.rfile.read(length)
+
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                path = json.loads(body)["path"]
+            except (ValueError, KeyError, TypeError):
+                self.send_json(400, {"error": 'expected {"path": ...}'})
+                return
+            self.predict("path", path, os.path.basename(path))
+        else:
+            name = parse_qs(url.query).get("name", [""])[0]
+            self.predict("bytes", body, name)
+
+    def predict(self, source, payload, name):
+        if source == "path" and not os.path.isfile(payload):
+            self.send_json(404, {"error": f"image not found: {payload}"})
+            return
+        try:
+            extracted = self.server.executor.submit(extract, source, payload).result()
+            proba = self.server.batcher.submit(extracted).result()
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self.send_json(200, grid_response(name, proba))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve grid predictions over HTTP with a warm model.")
+    parser.add_argument("--model", default=model_bundle.MODEL_FILE)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Feature extraction processes")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Images per predict call")
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT_MS, help="Milliseconds a batch waits to fill")
+    args = parser.parse_args()
+
+    bundle = model_bundle.load_bundle(args.model)
+    if bundle is None:
+        sys.exit(1)
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.bundle = bundle
+    server.batcher = MicroBatcher(bundle, args.max_batch, args.max_wait / 1000.0)
+    ready = multiprocessing.Barrier(args.workers)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(bundle.get("feature_config"), bundle.get("cascade"), ready)) as executor:
+        server.executor = executor
+        # Wait until every worker has started and finished its warm-up before
+        # accepting requests. The pool starts all workers once there are as
+        # many pending tasks as workers, and no worker runs a task before all
+        # of them have passed the barrier at the end of init_worker, so the
+        # pings complete only once every worker is warm.
+        for future in [executor.submit(ping) for _ in range(args.workers)]:
+            future.result()
+        print(f"Serving {args.model} on http://{args.host}:{args.port} "
+              f"({args.workers} workers, batches of up to {args.max_batch})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
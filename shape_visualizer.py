@@ -1,11 +1,12 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import cv2
+from panel_render import PanelFigure, PanelPlugin
+from image_manifest import list_images_async
+from deferred_import import PLOT_MODULES, import_async
+from visualizer_cache import CellFeatureCache, load_resized, neighbour_paths
 
 # Configuration
 IMG_WIDTH = 800
@@ -13,6 +14,70 @@ IMG_HEIGHT = 600
 GRID_ROWS = 8
 GRID_COLS = 8
 
+def compute_cell(cell_array):
+    # Heavy imports are deferred until the first cell is computed
+    import cv2
+    # Convert to Gray for detection
+    gray = cv2.cvtColor(cell_array, cv2.COLOR_RGB2GRAY)
+    
+    # 1. Canny Edges
+    # Thresholds can be tuned. 50, 150 is standard.
+    edges = cv2.Canny(gray, 50, 150)
+    
+    # 2. Hough Lines P
+    # minLineLength: Minimum length of line. Line segments shorter than this are rejected.
+    # maxLineGap: Maximum allowed gap between line segments to treat them as single line.
+    lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=30, minLineLength=20, maxLineGap=10)
+    
+    img_lines = cell_array.copy()
+    if lines is not None:
+        # OpenCV 4 returns (N, 1, 4), OpenCV 5 returns (N, 4)
+        for x1_l, y1_l, x2_l, y2_l in lines.reshape(-1, 4):
+            cv2.line(img_lines, (x1_l, y1_l), (x2_l, y2_l), (0, 255, 0), 2) # Green lines
+    
+    # 3. Hough Circles
+    # param1: Higher threshold of the two passed to the Canny edge detector (the lower one is twice smaller).
+    # param2: Accumulator threshold for the circle centers at the detection stage. The smaller it is, the more false circles may be detected.
+    # minDist: Minimum distance between the centers of the detected circles.
+    circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, dp=1.2, minDist=20,
+                               param1=50, param2=30, minRadius=5, maxRadius=50)
+    
+    img_circles = cell_array.copy()
+    if circles is not None:
+        circles = np.uint16(np.around(circles))
+        for i in circles[0, :]:
+            # draw the outer circle
+            cv2.circle(img_circles, (i[0], i[1]), i[2], (0, 255, 0), 2)
+            # draw the center of the circle
+            cv2.circle(img_circles, (i[0], i[1]), 2, (255, 0, 0), 3)
+    
+    return {"cell": cell_array, "edges": edges, "lines": img_lines, "circles": img_circles}
+
+class ShapePanel(PanelFigure):
+    # (feature key, title, cmap) for the 2x2 grid
+    VIEWS = [("cell", "Original Cell", None), ("edges", "Canny Edges", "gray"),
+             ("lines", "Hough Lines (Probabilistic)", None), ("circles", "Hough Circles", None)]
+
+    def __init__(self, fig):
+        super().__init__(fig)
+        self.axs = fig.subplots(2, 2)
+        fig.tight_layout(pad=3.0)
+        cell_shape = (IMG_HEIGHT // GRID_ROWS, IMG_WIDTH // GRID_COLS)
+        
+        self.images = []
+        for ax, (key, title, cmap) in zip(self.axs.flat, self.VIEWS):
+            ax.set_title(title)
+            ax.axis('off')
+            shape = cell_shape if cmap == "gray" else cell_shape + (3,)
+            self.images.append(self.image_artist(ax, shape, cmap=cmap))
+
+    def render(self, features, row, col):
+        for artist, (key, _, _) in zip(self.images, self.VIEWS):
+            self.set_image(artist, features[key])
+
+# Entry for workbench.py
+PLUGIN = PanelPlugin("Shape", compute_cell, ShapePanel, (8, 8), heavy_modules=["cv2"])
+
 class ShapeVisualizer:
     def __init__(self, root):
         self.root = root
@@ -23,6 +88,11 @@ class ShapeVisualizer:
         self.current_image_name = ""
         self.image_list = []
         self.current_img_index = 0
+        self.current_path = None
+        self.selected = None  # (row, col)
+        
+        # Features for every cell are precomputed in the background on image load
+        self.cache = CellFeatureCache(compute_cell, GRID_ROWS, GRID_COLS)
         
         # Layout
         self.main_frame = tk.Frame(self.root)
@@ -56,24 +126,29 @@ class ShapeVisualizer:
         self.right_panel = tk.Frame(self.main_frame)
         self.right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Matplotlib Figure (2x2 grid)
-        self.fig, self.axs = plt.subplots(2, 2, figsize=(8, 8))
-        self.fig.tight_layout(pad=3.0)
-        
-        self.axs[0, 0].set_title("Original Cell")
-        self.axs[0, 0].axis('off')
-        
-        self.axs[0, 1].set_title("Canny Edges")
-        self.axs[0, 1].axis('off')
-        
-        self.axs[1, 0].set_title("Hough Lines (Probabilistic)")
-        self.axs[1, 0].axis('off')
+        # Plots are built once matplotlib has been imported in the background,
+        # so the window appears without waiting for it
+        self.panel = None
+        self.lbl_loading = tk.Label(self.right_panel, text="Loading plots...")
+        self.lbl_loading.pack(expand=True)
+        import_async(self.root, PLOT_MODULES + PLUGIN.heavy_modules, self.build_plots)
+
+    def build_plots(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.lbl_loading.destroy()
         
-        self.axs[1, 1].set_title("Hough Circles")
-        self.axs[1, 1].axis('off')
+        # Matplotlib Figure (artists are created once and updated per click)
+        self.fig = Figure(figsize=PLUGIN.figsize)
+        self.panel = PLUGIN.panel_class(self.fig)
         
         self.chart = FigureCanvasTkAgg(self.fig, self.right_panel)
         self.chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.panel.attach(self.chart)
+        
+        # A cell clicked while loading is shown now
+        if self.selected is not None:
+            self.visualize_cell(*self.selected)
 
     def load_folder(self):
         initial_dir = os.path.join(os.getcwd(), "raw_images")
@@ -84,15 +159,15 @@ class ShapeVisualizer:
         if not folder_path:
             return
             
-        # Get all images
-        valid_exts = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
-        self.image_list = [
-            os.path.join(folder_path, f) 
-            for f in os.listdir(folder_path) 
-            if os.path.splitext(f)[1].lower() in valid_exts
-        ]
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
         
         if not self.image_list:
+            self.lbl_status.config(text="Load a folder to start")
             messagebox.showerror("Error", "No images found in folder!")
             return
             
@@ -106,15 +181,13 @@ class ShapeVisualizer:
         filepath = self.image_list[self.current_img_index]
         
         try:
-            pil_img = Image.open(filepath)
-            
-            # Check dimensions
-            w, h = pil_img.size
-            if w < IMG_WIDTH or h < IMG_HEIGHT:
-                print(f"Warning: {os.path.basename(filepath)} is small ({w}x{h})")
-
-            pil_img = pil_img.resize((IMG_WIDTH, IMG_HEIGHT), Image.Resampling.LANCZOS)
-            self.current_pil_img = pil_img.convert("RGB")
+            # Decoded copy from the cache if the image was prefetched
+            pil_img = self.cache.get_image(filepath)
+            if pil_img is None:
+                pil_img = load_resized(filepath)
+            self.current_pil_img = pil_img
+            self.current_path = filepath
+            self.cache.prefetch(neighbour_paths(self.image_list, self.current_img_index), image=pil_img)
             self.current_image_name = os.path.basename(filepath)
             
             self.tk_img = ImageTk.PhotoImage(self.current_pil_img)
@@ -124,15 +197,10 @@ class ShapeVisualizer:
             self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
             
             # Clear plots
-            for ax in self.axs.flat:
-                ax.clear()
-            self.axs[0, 0].set_title("Original Cell")
-            self.axs[0, 1].set_title("Canny Edges")
-            self.axs[1, 0].set_title("Hough Lines (Probabilistic)")
-            self.axs[1, 1].set_title("Hough Circles")
-            for ax in self.axs.flat:
-                ax.axis('off')
-            self.chart.draw()
+            self.selected = None
+            if self.panel is not None:
+                self.panel.clear()
+                self.panel.refresh()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {e}")
@@ -182,66 +250,14 @@ class ShapeVisualizer:
         x2 = x1 + cell_w
         y2 = y1 + cell_h
         
-        # Extract cell image
-        cell_img = self.current_pil_img.crop((x1, y1, x2, y2))
-        cell_array = np.array(cell_img)
-        
-        # Convert to Gray for detection
-        gray = cv2.cvtColor(cell_array, cv2.COLOR_RGB2GRAY)
-        
-        # 1. Canny Edges
-        # Thresholds can be tuned. 50, 150 is standard.
-        edges = cv2.Canny(gray, 50, 150)
-        
-        # 2. Hough Lines P
-        # minLineLength: Minimum length of line. Line segments shorter than this are rejected.
-        # maxLineGap: Maximum allowed gap between line segments to treat them as single line.
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=30, minLineLength=20, maxLineGap=10)
-        
-        img_lines = cell_array.copy()
-        if lines is not None:
-            for line in lines:
-                x1_l, y1_l, x2_l, y2_l = line[0]
-                cv2.line(img_lines, (x1_l, y1_l), (x2_l, y2_l), (0, 255, 0), 2) # Green lines
-        
-        # 3. Hough Circles
-        # param1: Higher threshold of the two passed to the Canny edge detector (the lower one is twice smaller).
-        # param2: Accumulator threshold for the circle centers at the detection stage. The smaller it is, the more false circles may be detected.
-        # minDist: Minimum distance between the centers of the detected circles.
-        circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, dp=1.2, minDist=20,
-                                   param1=50, param2=30, minRadius=5, maxRadius=50)
-        
-        img_circles = cell_array.copy()
-        if circles is not None:
-            circles = np.uint16(np.around(circles))
-            for i in circles[0, :]:
-                # draw the outer circle
-                cv2.circle(img_circles, (i[0], i[1]), i[2], (0, 255, 0), 2)
-                # draw the center of the circle
-                cv2.circle(img_circles, (i[0], i[1]), 2, (255, 0, 0), 3)
+        # Precomputed cell features (computed now if the worker has not reached this cell)
+        features = self.cache.get_cell(self.current_path, row, col)
         
         # Update Plots
-        self.axs[0, 0].clear()
-        self.axs[0, 0].imshow(cell_array)
-        self.axs[0, 0].set_title("Original Cell")
-        self.axs[0, 0].axis('off')
-        
-        self.axs[0, 1].clear()
-        self.axs[0, 1].imshow(edges, cmap='gray')
-        self.axs[0, 1].set_title("Canny Edges")
-        self.axs[0, 1].axis('off')
-        
-        self.axs[1, 0].clear()
-        self.axs[1, 0].imshow(img_lines)
-        self.axs[1, 0].set_title("Hough Lines (P)")
-        self.axs[1, 0].axis('off')
-        
-        self.axs[1, 1].clear()
-        self.axs[1, 1].imshow(img_circles)
-        self.axs[1, 1].set_title("Hough Circles")
-        self.axs[1, 1].axis('off')
-        
-        self.chart.draw()
+        self.selected = (row, col)
+        if self.panel is not None:
+            self.panel.render(features, row, col)
+            self.panel.refresh()
         
         # Highlight cell on canvas
         self.canvas.delete("highlight")
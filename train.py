@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import numpy as np
+import model_bundle
+from feature_cache import load_dataset, update_cache, load_matrix, LABELS_FILE, IMAGE_DIR, CACHE_DIR, WORKERS
+from label_matrix import class_metrics, CLASS_NAMES
+from cell_sampling import sample_cells, draw_pool, BACKGROUND
+
+# Scripted version of the notebook's training cells. Cell features come from
+# the feature cache (feature_cache.py), the configured model is fitted on a
+# scaled (and by default SMOTE-resampled) training split, and the scaler,
+# model and feature-config fingerprint are saved as one model bundle next to
+# a JSON file with metrics and timings. The JSON also holds a training key
+# (hash of the cached data digest and every setting below); when it matches,
+# the run stops before extracting or loading any features.
+# With --background-fraction the training images keep all object cells but
+# only a random share of background cells, and --mining-rounds then adds the
+# background cells the model misclassifies from fresh random pools
+# (cell_sampling.py); cells never drawn are never featurized.
+# Usage: python train.py [--model rf] [--param n_estimators=300] [--no-smote] [--force]
+#        python train.py --no-smote --background-fraction 0.1 --mining-rounds 3
+
+# Configuration
+TEST_SIZE = 0.2  # Fraction of images held out for metrics
+RANDOM_STATE = 42
+
+# Model presets: (module, class, default hyperparameters), as in the notebook
+MODELS = {
+    "svm": ("sklearn.svm", "SVC",
+            {"probability": True, "kernel": "rbf", "C": 10, "gamma": "scale", "class_weight": "balanced"}),
+    "rf": ("sklearn.ensemble", "RandomForestClassifier",
+           {"n_estimators": 100, "random_state": RANDOM_STATE}),
+    "mlp": ("sklearn.neural_network", "MLPClassifier",
+            {"hidden_layer_sizes": [100, 50], "max_iter": 500, "random_state": RANDOM_STATE}),
+    # RBF kernel approximation + minibatch SGD (kernel_approx.py); scales
+    # linearly where the SVC does not
+    "kernel-sgd": ("kernel_approx", "KernelSGDClassifier",
+                   {"approximation": "nystroem", "n_components": 1000, "random_state": RANDOM_STATE}),
+}
+DEFAULT_MODEL = "rf"
+
+
+def parse_params(items):
+    # ["C=3", "kernel=linear", "hidden_layer_sizes=[64,32]"] -> dict; values
+    # are read as JSON where possible, otherwise kept as strings
+    params = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value, got {item!r}")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+def build_model(name, params):
+    module, cls, defaults = MODELS[name]
+    params = dict(defaults, **params)
+    return getattr(importlib.import_module(module), cls)(**params), params
+
+
+def training_key(settings):
+    blob = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()
+
+
+def metrics_path(model_path):
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def load_previous(model_path):
+    path = metrics_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable {path}: {e}")
+        return None
+
+
+def split_images(groups, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    # Whole images go to one side, so cells of a test image never train
+    from sklearn.model_selection import GroupShuffleSplit
+    if test_size <= 0:
+        return np.arange(len(groups)), np.arange(0)
+    splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    return next(splitter.split(np.zeros(len(groups)), groups=groups))
+
+
+def score(y_true, y_pred):
+    confusion = np.bincount(np.asarray(y_true, dtype=np.intp) * len(CLASS_NAMES) + np.asarray(y_pred, dtype=np.intp),
+                            minlength=len(CLASS_NAMES) ** 2).reshape(len(CLASS_NAMES), len(CLASS_NAMES))
+    precision, recall, f1 = class_metrics(confusion)
+    return {
+        "accuracy": float(np.trace(confusion) / max(confusion.sum(), 1)),
+        "precision": dict(zip(CLASS_NAMES, np.nan_to_num(precision).round(4).tolist())),
+        "recall": dict(zip(CLASS_NAMES, np.nan_to_num(recall).round(4).tolist())),
+        "f1": dict(zip(CLASS_NAMES, np.nan_to_num(f1).round(4).tolist())),
+        "confusion": confusion.tolist(),
+    }
+
+
+def fit(X, y, model_name, params, smote, timings):
+    # Scaler, optional SMOTE and model fitted on the selected training cells
+    from sklearn.preprocessing import StandardScaler
+    start = time.time()
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X)
+    timings["scale"] = timings.get("scale", 0.0) + time.time() - start
+
+    X_fit, y_fit = X_train, y
+    if smote:
+        from imblearn.over_sampling import SMOTE
+        start = time.time()
+        X_fit, y_fit = SMOTE(random_state=RANDOM_STATE).fit_resample(X_train, y)
+        timings["smote"] = timings.get("smote", 0.0) + time.time() - start
+
+    model, params = build_model(model_name, params)
+    print(f"Fitting {type(model).__name__} on {len(y_fit)} cells ({X.shape[1]} features)...")
+    start = time.time()
+    model.fit(X_fit, y_fit)
+    timings["fit"] = timings.get("fit", 0.0) + time.time() - start
+    return model, scaler, X_train, len(y_fit)
+
+
+def train(data, model_name, params, smote=True, test_size=TEST_SIZE, background_fraction=1.0,
+          mining_rounds=0, mining_pool=None, workers=WORKERS):
+    # Returns (model, scaler, metrics, timings). Training images contribute
+    # every object cell plus a background_fraction sample of their background
+    # cells, grown by mining_rounds of hard negatives; test images are scored
+    # on all 64 cells. Only the cells used are featurized.
+    timings = {}
+    rng = np.random.default_rng(RANDOM_STATE)
+    labels = data["labels"]
+    train_images, test_images = split_images(np.arange(len(labels)), test_size)
+
+    selected = np.zeros(labels.shape, dtype=bool)
+    selected[train_images] = sample_cells(labels[train_images], background_fraction, rng)
+    test_cells = np.zeros(labels.shape, dtype=bool)
+    test_cells[test_images] = True
+
+    start = time.time()
+    ok = update_cache(data, selected | test_cells, workers=workers)
+    timings["features"] = time.time() - start
+    selected[~ok] = False
+    test_cells[~ok] = False
+
+    start = time.time()
+    X = load_matrix(data, selected)
+    y = labels[selected]
+    timings["load"] = time.time() - start
+    print(f"Training on {len(y)} of {int(labels[train_images].size)} cells from {len(train_images)} images "
+          f"({int((y == BACKGROUND).sum())} background)")
+
+    model, scaler, X_train, fit_cells = fit(X, y, model_name, params, smote, timings)
+
+    # Hard-negative mining: score a fresh pool of unseen background cells
+    # from the training images and refit with the ones the model gets wrong
+    seen = selected.copy()
+    eligible = np.zeros(labels.shape, dtype=bool)
+    eligible[train_images[ok[train_images]]] = True
+    rounds = []
+    for r in range(mining_rounds):
+        size = mining_pool or max(int((y == BACKGROUND).sum()), 1)
+        pool = draw_pool(labels, eligible & ~seen, size, rng)
+        if not pool.any():
+            print("No unseen background cells left to mine.")
+            break
+        start = time.time()
+        pool &= update_cache(data, pool, workers=workers)[:, None]
+        X_pool = load_matrix(data, pool)
+        hard = model.predict(scaler.transform(X_pool)) != BACKGROUND
+        timings["mining"] = timings.get("mining", 0.0) + time.time() - start
+        seen |= pool
+        rows, cols = np.nonzero(pool)
+        selected[rows[hard], cols[hard]] = True
+        rounds.append({"pool": int(pool.sum()), "hard_negatives": int(hard.sum())})
+        print(f"Mining round {r + 1}: {int(hard.sum())} of {int(pool.sum())} background cells misclassified")
+        if not hard.any():
+            break
+        X = np.concatenate([X, X_pool[hard]])
+        y = np.concatenate([y, np.full(int(hard.sum()), BACKGROUND, dtype=y.dtype)])
+        model, scaler, X_train, fit_cells = fit(X, y, model_name, params, smote, timings)
+
+    start = time.time()
+    metrics = {
+        "train_cells": int(len(y)),
+        "fit_cells": int(fit_cells),
+        "test_cells": int(test_cells.sum()),
+        "featurized_cells": int((seen | test_cells).sum()),
+        "total_cells": int(labels[ok].size),
+        "mining_rounds": rounds,
+        "train": score(y, model.predict(X_train)),
+    }
+    if test_cells.any():
+        X_test = scaler.transform(load_matrix(data, test_cells))
+        metrics["test"] = score(labels[test_cells], model.predict(X_test))
+    timings["predict"] = time.time() - start
+    return model, scaler, metrics, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a cell classifier on cached features and save a model bundle.")
+    parser.add_argument("--model", choices=sorted(MODELS), default=DEFAULT_MODEL)
+    parser.add_argument("--param", action="append", metavar="KEY=VALUE",
+                        help="Override a hyperparameter (repeatable), e.g. --param n_estimators=300")
+    parser.add_argument("--no-smote", action="store_true", help="Fit on the training split without SMOTE")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--background-fraction", type=float, default=1.0,
+                        help="Fraction of training background cells sampled up front (1.0 = all)")
+    parser.add_argument("--mining-rounds", type=int, default=0,
+                        help="Hard-negative mining rounds over unseen background cells")
+    parser.add_argument("--mining-pool", type=int, default=None,
+                        help="Background cells scored per mining round (default: current background count)")
+    parser.add_argument("--feature-config", default=None,
+                        help="Extractor config JSON (e.g. from select_features.py); default: all features")
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Feature extraction processes")
+    parser.add_argument("--output", default=model_bundle.MODEL_FILE)
+    parser.add_argument("--force", action="store_true", help="Retrain even if nothing changed")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.labels):
+        print(f"Error: {args.labels} not found.")
+        sys.exit(1)
+    if not 0.0 <= args.background_fraction <= 1.0:
+        print("Error: --background-fraction must be between 0 and 1.")
+        sys.exit(1)
+    try:
+        _, params = build_model(args.model, parse_params(args.param))
+    except (ValueError, TypeError) as e:
+        print(f"Error: invalid hyperparameters: {e}")
+        sys.exit(1)
+
+    feature_config = None
+    if args.feature_config:
+        try:
+            with open(args.feature_config, "r") as f:
+                feature_config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read {args.feature_config}: {e}")
+            sys.exit(1)
+
+    data = load_dataset(args.labels, args.images, config=feature_config, cache_dir=args.cache)
+    if not data["names"]:
+        print("No labeled images found.")
+        sys.exit(1)
+
+    settings = {
+        "data": data["digest"],
+        "model": args.model,
+        "params": params,
+        "smote": not args.no_smote,
+        "test_size": args.test_size,
+        "background_fraction": args.background_fraction,
+        "mining_rounds": args.mining_rounds,
+        "mining_pool": args.mining_pool,
+        "random_state": RANDOM_STATE,
+    }
+    key = training_key(settings)
+    previous = load_previous(args.output)
+    if previous is not None and previous.get("training_key") == key and not args.force:
+        print(f"{args.output} is up to date (training key {key[:12]}); use --force to retrain.")
+        return
+
+    model, scaler, metrics, timings = train(data, args.model, params, smote=not args.no_smote,
+                                            test_size=args.test_size,
+                                            background_fraction=args.background_fraction,
+                                            mining_rounds=args.mining_rounds, mining_pool=args.mining_pool,
+                                            workers=args.workers)
+
+    model_bundle.save_bundle(model, scaler, data["feature_config"], args.output, training_key=key)
+    report = {
+        "training_key": key,
+        "settings": settings,
+        "images": len(data["names"]),
+        "features": int(scaler.n_features_in_),
+        "metrics": metrics,
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+    }
+    with open(metrics_path(args.output), "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Featurized {metrics['featurized_cells']} of {metrics['total_cells']} cells")
+    print(f"Train accuracy: {metrics['train']['accuracy']:.4f}")
+    if "test" in metrics:
+        print(f"Test accuracy:  {metrics['test']['accuracy']:.4f}   "
+              f"F1: " + ", ".join(f"{k} {v:.3f}" for k, v in metrics["test"]["f1"].items()))
+    print("Timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+    print(f"Metrics saved to {metrics_path(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import model_bundle
+import cascade
+from cell_features import load_image
+from feature_cache import load_dataset, update_cache, load_matrix, LABELS_FILE, IMAGE_DIR, CACHE_DIR, WORKERS
+from train import split_images, score, TEST_SIZE
+
+# Adds a cascade stage (cascade.py) to a trained model bundle. Cheap cell
+# statistics are computed for every labeled image; the stage model is fitted
+# on part of the training images and its threshold calibrated on the rest so
+# that --recall of the object cells pass. The held-out images (the same
+# image split train.py tests on) then give the honest numbers: share of
+# cells skipped, object recall of the stage, per-class recall of the main
+# classifier with and without the cascade, and the measured per-image
+# speed-up of predict_image. The report is saved next to the bundle as
+# <model>.cascade.json.
+# Usage: python train_cascade.py [--model models/cell_classifier.joblib] [--recall 0.98]
+
+# Configuration
+RECALL = 0.98  # Share of object cells stage one must pass
+CALIBRATION_SIZE = 0.25  # Fraction of training images used to set the threshold
+TIMING_IMAGES = 10
+
+
+def cheap_for_path(path):
+    img = load_image(path)
+    return None if img is None else cascade.cheap_features(img)
+
+
+def time_images(bundle, paths):
+    # Seconds per image for predict_image with and without the cascade stage
+    plain = {k: v for k, v in bundle.items() if k != "cascade"}
+    full = staged = 0.0
+    for path in paths:
+        img = load_image(path)
+        start = time.perf_counter()
+        model_bundle.predict_image(plain, img)
+        full += time.perf_counter() - start
+        start = time.perf_counter()
+        model_bundle.predict_image(bundle, img)
+        staged += time.perf_counter() - start
+    return full / len(paths), staged / len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit and calibrate a cheap first stage for a model bundle.")
+    parser.add_argument("--model", default=model_bundle.MODEL_FILE)
+    parser.add_argument("--output", default=None, help="Bundle to write (default: overwrite --model)")
+    parser.add_argument("--recall", type=float, default=RECALL, help="Object-cell recall the threshold keeps")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--timing-images", type=int, default=TIMING_IMAGES)
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    output = args.output or args.model
+
+    if not 0.0 < args.recall <= 1.0 or not 0.0 < args.test_size < 1.0:
+        print("Error: --recall must be in (0, 1] and --test-size in (0, 1).")
+        sys.exit(1)
+    bundle = model_bundle.load_bundle(args.model)
+    if bundle is None:
+        sys.exit(1)
+    data = load_dataset(args.labels, args.images, config=bundle.get("feature_config"), cache_dir=args.cache)
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        cheap = list(executor.map(cheap_for_path, data["paths"], chunksize=8))
+    ok = np.array([c is not None for c in cheap])
+    n_cheap = len(cascade.CHEAP_FEATURES)
+    cheap = np.stack([c if c is not None else np.zeros((64, n_cheap)) for c in cheap])
+    print(f"Cheap features for {int(ok.sum())} images in {time.time() - start:.1f}s")
+
+    labels = data["labels"]
+    is_object = labels != cascade.BACKGROUND
+    train_images, val_images = split_images(np.arange(len(labels)), args.test_size)
+    fit_idx, calib_idx = split_images(train_images, CALIBRATION_SIZE)
+    fit_images = train_images[fit_idx]
+    calib_images = train_images[calib_idx]
+    fit_images, calib_images, val_images = (i[ok[i]] for i in (fit_images, calib_images, val_images))
+    if not len(fit_images) or not len(calib_images) or not len(val_images):
+        print("Error: not enough images to fit, calibrate and validate the stage.")
+        sys.exit(1)
+
+    stage = cascade.build_stage_model()
+    stage.fit(cheap[fit_images].reshape(-1, n_cheap), is_object[fit_images].ravel())
+    calib_scores = cascade.stage_scores(stage, cheap[calib_images].reshape(-1, n_cheap))
+    threshold = cascade.calibrate_threshold(calib_scores, is_object[calib_images].ravel(), args.recall)
+    bundle["cascade"] = {"model": stage, "threshold": threshold, "recall": args.recall}
+
+    # Validation: stage pass rate and recall, main-model recall with and without it
+    val_scores = cascade.stage_scores(stage, cheap[val_images].reshape(-1, n_cheap)).reshape(len(val_images), -1)
+    passed = val_scores >= threshold
+    val_cells = np.zeros(labels.shape, dtype=bool)
+    val_cells[val_images] = True
+    val_cells[~update_cache(data, val_cells, workers=args.workers)] = False
+    full_pred = np.zeros(labels.shape, dtype=np.uint8)
+    full_pred[val_cells] = model_bundle.predict_labels(bundle, load_matrix(data, val_cells))
+    full_pred = full_pred[val_images]
+    staged_pred = np.where(passed, full_pred, cascade.BACKGROUND)
+    y_val = labels[val_images]
+    full_metrics = score(y_val.ravel(), full_pred.ravel())
+    staged_metrics = score(y_val.ravel(), staged_pred.ravel())
+
+    timing_paths = [data["paths"][i] for i in val_images[:args.timing_images]]
+    t_full, t_staged = time_images(bundle, timing_paths)
+    report = {
+        "threshold": threshold,
+        "target_recall": args.recall,
+        "images": {"fit": len(fit_images), "calibrate": len(calib_images), "validate": len(val_images)},
+        "validation": {
+            "cells_passed": round(float(passed.mean()), 4),
+            "object_recall": round(float(passed[is_object[val_images]].mean()), 4)
+            if is_object[val_images].any() else None,
+            "recall_full": full_metrics["recall"],
+            "recall_cascade": staged_metrics["recall"],
+            "recall_loss": {k: round(full_metrics["recall"][k] - staged_metrics["recall"][k], 4)
+                            for k in full_metrics["recall"]},
+            "accuracy_full": round(full_metrics["accuracy"], 4),
+            "accuracy_cascade": round(staged_metrics["accuracy"], 4),
+        },
+        "seconds_per_image": {"full": round(t_full, 4), "cascade": round(t_staged, 4)},
+        "speedup": round(t_full / t_staged, 2) if t_staged else None,
+    }
+
+    extra = {k: v for k, v in bundle.items() if k not in ("model", "scaler", "feature_config", "fingerprint")}
+    model_bundle.save_bundle(bundle["model"], bundle["scaler"], bundle.get("feature_config"), output, **extra)
+    report_path = os.path.splitext(output)[0] + ".cascade.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    v = report["validation"]
+    print(f"Threshold {threshold:.4f} for {args.recall:.0%} object recall on {len(calib_images)} calibration images")
+    print(f"Validation ({len(val_images)} images): {v['cells_passed']:.1%} of cells passed, "
+          f"object recall {v['object_recall']}")
+    print("Recall full -> cascade: " + ", ".join(
+        f"{k} {v['recall_full'][k]:.3f} -> {v['recall_cascade'][k]:.3f}" for k in v["recall_full"]))
+    print(f"predict_image: {t_full * 1000:.0f} ms -> {t_staged * 1000:.0f} ms per image "
+          f"({report['speedup']}x) over {len(timing_paths)} images")
+    print(f"Report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
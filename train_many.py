@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import model_bundle
+from feature_cache import load_dataset, update_cache, load_matrix, LABELS_FILE, IMAGE_DIR, CACHE_DIR, WORKERS
+from train import MODELS, RANDOM_STATE, TEST_SIZE, build_model, parse_params, split_images, score, metrics_path
+
+# The notebook's three models (or any MODELS presets from train.py) fitted
+# side by side in a process pool instead of one after the other. The split,
+# scaler and SMOTE resampling are done once; the resampled training matrix
+# and the scaled test matrix are written once as .npy files (in a temporary
+# directory under the feature cache, removed when the run ends) that every
+# worker memory-maps, so a multi-GB matrix is shared through the page cache
+# instead of being pickled into each process. Each worker is pinned to its
+# own slice of the CPUs and its BLAS/OpenMP pools are capped to that slice
+# with threadpoolctl (and RF gets n_jobs of the same size), so the pool and
+# the libraries' own threads do not oversubscribe the machine. Each model is
+# saved as its own bundle plus metrics JSON in --output-dir, with a summary
+# in train_many.json.
+# Usage: python train_many.py [--models svm rf mlp] [--param rf:n_estimators=300] [--jobs 3]
+
+# Configuration
+DEFAULT_MODELS = ["svm", "rf", "mlp"]
+OUTPUT_DIR = model_bundle.MODEL_DIR
+SUMMARY_FILE = "train_many.json"
+
+# Per-process state, filled by init_worker
+worker = {}
+
+
+def cpu_slices(jobs):
+    # Disjoint CPU sets, one per worker
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    jobs = min(jobs, len(cpus))
+    return [cpus[i::jobs] for i in range(jobs)]
+
+
+def init_worker(paths, slots):
+    # Claim a CPU slice, cap native thread pools to it, map the matrices.
+    # The pools already exist (numpy is loaded), so they are resized with
+    # threadpoolctl; setting OMP_NUM_THREADS etc. here would have no effect.
+    cpus = slots.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    from threadpoolctl import threadpool_limits
+    worker["limits"] = threadpool_limits(limits=len(cpus))
+    worker["threads"] = len(cpus)
+    worker["cpus"] = cpus
+    for key, path in paths.items():
+        worker[key] = np.load(path, mmap_mode="r")
+
+
+def fit_one(job):
+    # Returns a summary dict; failures are recorded rather than raised
+    name, model_name, params, scaler, feature_config, output = job
+    result = {"name": name, "model": model_name, "cpus": worker["cpus"]}
+    try:
+        model, params = build_model(model_name, params)
+        if "n_jobs" in model.get_params() and model.get_params()["n_jobs"] is None:
+            model.set_params(n_jobs=worker["threads"])
+        start = time.time()
+        model.fit(worker["X_fit"], worker["y_fit"])
+        fit_time = time.time() - start
+        start = time.time()
+        metrics = {"train": score(worker["y_fit"], model.predict(worker["X_fit"]))}
+        if len(worker["y_test"]):
+            metrics["test"] = score(worker["y_test"], model.predict(worker["X_test"]))
+        predict_time = time.time() - start
+
+        model_bundle.save_bundle(model, scaler, feature_config, output)
+        report = {"name": name, "model": model_name, "params": params, "metrics": metrics,
+                  "timings": {"fit": round(fit_time, 3), "predict": round(predict_time, 3)}}
+        with open(metrics_path(output), "w") as f:
+            json.dump(report, f, indent=2)
+        result.update(params=params, bundle=output, timings=report["timings"],
+                      test_accuracy=metrics.get("test", metrics["train"])["accuracy"],
+                      test_f1=metrics.get("test", metrics["train"])["f1"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def parse_model_params(items):
+    # ["rf:n_estimators=300", "svm:C=3"] -> {"rf": {...}, "svm": {...}}
+    by_model = {}
+    for item in items or []:
+        model, sep, rest = item.partition(":")
+        if not sep or model not in MODELS:
+            raise ValueError(f"Expected model:key=value with a model from {sorted(MODELS)}, got {item!r}")
+        by_model.setdefault(model, {}).update(parse_params([rest]))
+    return by_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train several model configs concurrently on shared features.")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=DEFAULT_MODELS)
+    parser.add_argument("--param", action="append", metavar="MODEL:KEY=VALUE",
+                        help="Override a hyperparameter of one model (repeatable), e.g. --param rf:n_estimators=300")
+    parser.add_argument("--jobs", type=int, default=None, help="Models fitted at once (default: one per model)")
+    parser.add_argument("--no-smote", action="store_true")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--labels", default=LABELS_FILE)
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Feature extraction processes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.labels):
+        print(f"Error: {args.labels} not found.")
+        sys.exit(1)
+    try:
+        overrides = parse_model_params(args.param)
+        for name in args.models:
+            build_model(name, overrides.get(name, {}))
+    except (ValueError, TypeError) as e:
+        print(f"Error: invalid hyperparameters: {e}")
+        sys.exit(1)
+
+    data = load_dataset(args.labels, args.images, cache_dir=args.cache)
+    ok = update_cache(data, workers=args.workers)
+    train_images, test_images = split_images(np.arange(len(data["names"])), args.test_size)
+    train_cells = np.zeros(data["labels"].shape, dtype=bool)
+    train_cells[train_images[ok[train_images]]] = True
+    test_cells = np.zeros(data["labels"].shape, dtype=bool)
+    test_cells[test_images[ok[test_images]]] = True
+    if not train_cells.any():
+        print("No training images with features.")
+        sys.exit(1)
+
+    # Split, scaler and SMOTE once, as in the notebook
+    from sklearn.preprocessing import StandardScaler
+    start = time.time()
+    scaler = StandardScaler()
+    X_fit = scaler.fit_transform(load_matrix(data, train_cells))
+    y_fit = data["labels"][train_cells]
+    if not args.no_smote:
+        from imblearn.over_sampling import SMOTE
+        X_fit, y_fit = SMOTE(random_state=RANDOM_STATE).fit_resample(X_fit, y_fit)
+    X_test = scaler.transform(load_matrix(data, test_cells)) if test_cells.any() else np.empty((0, X_fit.shape[1]))
+    y_test = data["labels"][test_cells]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(name, name, overrides.get(name, {}), scaler, data["feature_config"],
+             os.path.join(args.output_dir, f"{name}.joblib")) for name in args.models]
+    slices = cpu_slices(args.jobs or len(jobs))
+    results = []
+    with tempfile.TemporaryDirectory(prefix="train_many-", dir=data["folder"]) as shared_dir, \
+            multiprocessing.Manager() as manager:
+        paths = {}
+        for key, array in (("X_fit", X_fit), ("y_fit", y_fit), ("X_test", X_test), ("y_test", y_test)):
+            paths[key] = os.path.join(shared_dir, key + ".npy")
+            np.save(paths[key], array)
+        print(f"Prepared {len(y_fit)} training and {len(y_test)} test cells ({X_fit.shape[1]} features, "
+              f"{X_fit.nbytes / 1e6:.0f} MB shared) in {time.time() - start:.1f}s")
+        del X_fit, X_test
+
+        slots = manager.Queue()
+        for cpus in slices:
+            slots.put(cpus)
+        print(f"Fitting {len(jobs)} models in {len(slices)} processes "
+              f"({', '.join(str(len(c)) for c in slices)} CPUs each)...")
+
+        start = time.time()
+        with ProcessPoolExecutor(max_workers=len(slices), initializer=init_worker,
+                                 initargs=(paths, slots)) as executor:
+            futures = [executor.submit(fit_one, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if "error" in result:
+                    print(f"  {result['name']}: failed: {result['error']}")
+                else:
+                    print(f"  {result['name']}: fit {result['timings']['fit']:.1f}s, "
+                          f"accuracy {result['test_accuracy']:.4f} -> {result['bundle']}")
+    elapsed = time.time() - start
+    serial = sum(r["timings"]["fit"] + r["timings"]["predict"] for r in results if "timings" in r)
+
+    summary = {"models": sorted(results, key=lambda r: args.models.index(r["name"])),
+               "wall_seconds": round(elapsed, 2), "sum_of_model_seconds": round(serial, 2),
+               "training_cells": int(len(y_fit)), "test_cells": int(len(y_test)), "smote": not args.no_smote}
+    summary_path = os.path.join(args.output_dir, SUMMARY_FILE)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Done in {elapsed:.1f}s wall ({serial:.1f}s of model time). Summary saved to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,69 @@
 import os
-import cv2
-import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import Image
+from label_matrix import LabelMatrix
+from grid_overlay import IMG_WIDTH, IMG_HEIGHT, COLORS, build_color_table, build_grid_template, render_overlay
 
 # Configuration
 PREDICTIONS_FILE = "predicted_labels.csv"
 PROCESSED_DIR = "processed_images"
 OUTPUT_DIR = "predicted_images"
-GRID_ROWS = 8
-GRID_COLS = 8
-IMG_WIDTH = 800
-IMG_HEIGHT = 600
+WORKERS = os.cpu_count() or 1
+CHUNK_SIZE = 16  # Images handed to a worker at a time
 
-# Color mapping (Same as labeler.py)
-COLORS = {
-    1: (255, 0, 0),   # Red (Ball)
-    2: (0, 0, 255),   # Blue (Bat)
-    3: (0, 255, 0)    # Green (Stump)
-}
-ALPHA = 70
+# Per-process state, filled by init_worker
+worker = {}
 
-def create_overlay_image(width, height, color, alpha):
-    return Image.new("RGBA", (width, height), color + (alpha,))
+def init_worker(colors=COLORS, output_dir=OUTPUT_DIR):
+    worker["table"] = build_color_table(colors)
+    worker["template"] = build_grid_template()
+    worker["output_dir"] = output_dir
+
+def render_prediction(job):
+    # Returns a warning/error message, or None on success
+    img_name, cell_labels = job
+    img_path = os.path.join(PROCESSED_DIR, img_name)
+
+    if not os.path.exists(img_path):
+        return f"Warning: Image {img_name} not found in {PROCESSED_DIR}"
+
+    try:
+        base_img = Image.open(img_path).convert("RGB")
+        # Ensure it's the right size (it should be if from processed_images)
+        if base_img.size != (IMG_WIDTH, IMG_HEIGHT):
+            base_img = base_img.resize((IMG_WIDTH, IMG_HEIGHT))
+
+        out = render_overlay(np.asarray(base_img), cell_labels, worker["table"], worker["template"])
+        Image.fromarray(out).save(os.path.join(worker["output_dir"], img_name))
+    except Exception as e:
+        return f"Error processing {img_name}: {e}"
+    return None
+
+def render_images(names, labels, colors=COLORS, output_dir=OUTPUT_DIR, workers=WORKERS):
+    # One overlay image per name; labels is (N, 64) and indexes colors
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(colors, output_dir)) as executor:
+        for message in executor.map(render_prediction, zip(names, labels), chunksize=CHUNK_SIZE):
+            if message:
+                print(message)
 
 def visualize_predictions():
     if not os.path.exists(PREDICTIONS_FILE):
         print(f"Error: {PREDICTIONS_FILE} not found. Please run the notebook to generate predictions first.")
         return
 
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+    predictions = LabelMatrix.read_csv(PREDICTIONS_FILE)
+    print(f"Found predictions for {len(predictions)} images.")
 
-    df = pd.read_csv(PREDICTIONS_FILE)
-    print(f"Found predictions for {len(df)} images.")
-    
-    cell_w = int(IMG_WIDTH / GRID_COLS)
-    cell_h = int(IMG_HEIGHT / GRID_ROWS)
-    
-    # Pre-create overlays
-    overlays = {k: create_overlay_image(cell_w, cell_h, v, ALPHA) for k, v in COLORS.items()}
-
-    for _, row in df.iterrows():
-        img_name = row['ImageFileName']
-        img_path = os.path.join(PROCESSED_DIR, img_name)
-        
-        if not os.path.exists(img_path):
-            print(f"Warning: Image {img_name} not found in {PROCESSED_DIR}")
-            continue
-            
-        # Load image using PIL to handle transparency easily
-        try:
-            base_img = Image.open(img_path).convert("RGBA")
-            # Ensure it's the right size (it should be if from processed_images)
-            base_img = base_img.resize((IMG_WIDTH, IMG_HEIGHT))
-            
-            # Create a drawing context for lines/text
-            draw = ImageDraw.Draw(base_img)
-            
-            # Draw overlays based on predictions
-            for i in range(64):
-                col_name = f"c{i+1:02d}"
-                label = row.get(col_name, 0)
-                
-                if label in overlays:
-                    r = i // GRID_COLS
-                    c = i % GRID_COLS
-                    x = c * cell_w
-                    y = r * cell_h
-                    
-                    # Paste overlay
-                    base_img.paste(overlays[label], (x, y), overlays[label])
-            
-            # Draw Grid Lines (Yellow)
-            for i in range(1, GRID_COLS):
-                x = i * cell_w
-                draw.line([(x, 0), (x, IMG_HEIGHT)], fill="yellow", width=1)
-            for i in range(1, GRID_ROWS):
-                y = i * cell_h
-                draw.line([(0, y), (IMG_WIDTH, y)], fill="yellow", width=1)
-                
-            # Draw Cell Numbers (White)
-            for i in range(64):
-                r = i // GRID_COLS
-                c = i % GRID_COLS
-                x = c * cell_w + 2
-                y = r * cell_h + 2
-                draw.text((x, y), str(i+1), fill="white")
-                
-            # Save
-            out_path = os.path.join(OUTPUT_DIR, img_name)
-            base_img.convert("RGB").save(out_path)
-            # print(f"Saved {out_path}")
-            
-        except Exception as e:
-            print(f"Error processing {img_name}: {e}")
+    start = time.time()
+    render_images(predictions.names, predictions.labels)
 
-    print(f"Done! Visualizations saved to {OUTPUT_DIR}")
+    elapsed = time.time() - start
+    print(f"Done! Visualizations saved to {OUTPUT_DIR} "
+          f"({len(predictions) / elapsed:.1f} images/s with {WORKERS} workers)")
 
 if __name__ == "__main__":
     visualize_predictions()
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+# Per-image cache for the feature visualizers. As soon as an image is shown,
+# a worker thread computes every cell's features and display rasters with the
+# visualizer's compute_cell() function, so a click is just a dictionary lookup.
+# Neighbouring images are prefetched and the cache is bounded (LRU).
+
+IMG_WIDTH = 800
+IMG_HEIGHT = 600
+CACHE_SIZE = 5  # Images kept in memory
+PREFETCH_NEIGHBOURS = 1  # Images prefetched on each side of the current one
+
+
+def load_resized(path):
+    pil_img = Image.open(path)
+    w, h = pil_img.size
+    if w < IMG_WIDTH or h < IMG_HEIGHT:
+        print(f"Warning: {path} is small ({w}x{h})")
+    pil_img = pil_img.resize((IMG_WIDTH, IMG_HEIGHT), Image.Resampling.LANCZOS)
+    return pil_img.convert("RGB")
+
+
+def neighbour_paths(image_list, index, radius=PREFETCH_NEIGHBOURS):
+    # Current image first, then alternating next/previous neighbours
+    paths = [image_list[index]]
+    for step in range(1, radius + 1):
+        for j in (index + step, index - step):
+            if 0 <= j < len(image_list):
+                paths.append(image_list[j])
+    return paths
+
+
+class CellFeatureCache:
+    def __init__(self, compute_cell, grid_rows, grid_cols, max_images=CACHE_SIZE):
+        self.compute_cell = compute_cell
+        self.grid_rows = grid_rows
+        self.grid_cols = grid_cols
+        self.cell_w = IMG_WIDTH // grid_cols
+        self.cell_h = IMG_HEIGHT // grid_rows
+        self.max_images = max_images
+
+        # path -> {"image": PIL image, "cells": {(row, col): features}}
+        self.entries = OrderedDict()
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def cell_array(self, image, row, col):
+        x1 = col * self.cell_w
+        y1 = row * self.cell_h
+        return np.array(image.crop((x1, y1, x1 + self.cell_w, y1 + self.cell_h)))
+
+    def prefetch(self, paths, image=None):
+        # paths[0] is the image on screen; image is its already decoded copy
+        with self.lock:
+            if image is not None and paths[0] not in self.entries:
+                self.entries[paths[0]] = {"image": image, "cells": {}}
+
+            # Drop queued work for images we no longer need
+            for path, future in list(self.futures.items()):
+                if path not in paths and future.cancel():
+                    del self.futures[path]
+
+            for path in paths:
+                if path in self.entries:
+                    self.entries.move_to_end(path)
+                if path not in self.futures and not self._complete(path):
+                    self.futures[path] = self.executor.submit(self._compute_image, path)
+
+            self._evict(keep=paths)
+
+    def get_image(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            return entry["image"] if entry is not None else None
+
+    def get_cell(self, path, row, col):
+        # Cached features, or computed now on the caller's thread if not ready
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return None
+            features = entry["cells"].get((row, col))
+        if features is None:
+            features = self.compute_cell(self.cell_array(entry["image"], row, col))
+            with self.lock:
+                entry["cells"][(row, col)] = features
+        return features
+
+    def _complete(self, path):
+        entry = self.entries.get(path)
+        return entry is not None and len(entry["cells"]) == self.grid_rows * self.grid_cols
+
+    def _evict(self, keep):
+        while len(self.entries) > self.max_images:
+            for path in self.entries:
+                if path not in keep:
+                    del self.entries[path]
+                    break
+            else:
+                break
+
+    def _compute_image(self, path):
+        try:
+            with self.lock:
+                entry = self.entries.get(path)
+            if entry is None:
+                entry = {"image": load_resized(path), "cells": {}}
+                with self.lock:
+                    entry = self.entries.setdefault(path, entry)
+
+            for row in range(self.grid_rows):
+                for col in range(self.grid_cols):
+                    if (row, col) in entry["cells"]:
+                        continue
+                    features = self.compute_cell(self.cell_array(entry["image"], row, col))
+                    with self.lock:
+                        entry["cells"].setdefault((row, col), features)
+        except Exception as e:
+            print(f"Error precomputing features for {path}: {e}")
+        finally:
+            with self.lock:
+                self.futures.pop(path, None)
@@ -0,0 +1,273 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from PIL import ImageTk
+import os
+import sys
+import importlib
+from image_manifest import list_images_async
+from deferred_import import PLOT_MODULES, import_async
+from visualizer_cache import CellFeatureCache, load_resized, neighbour_paths
+
+# One window for all feature visualizers. Each visualizer module exposes a
+# PLUGIN (panel_render.PanelPlugin); the workbench shows one notebook tab per
+# plugin and shares the image loader, the folder manifest and one background
+# cell-feature cache between them, so an image is decoded once and every
+# panel's features for a cell are computed in the same pass.
+# Usage: python workbench.py [plugin_module ...]
+
+# Configuration
+IMG_WIDTH = 800
+IMG_HEIGHT = 600
+GRID_ROWS = 8
+GRID_COLS = 8
+
+# Panel plugins, in tab order
+PLUGIN_MODULES = [
+    "hog_visualizer",
+    "color_visualizer",
+    "convolution_visualizer",
+    "shape_visualizer",
+    "feature_comparison_visualizer",
+]
+
+def load_plugins(module_names):
+    plugins = []
+    for name in module_names:
+        try:
+            plugins.append(importlib.import_module(name).PLUGIN)
+        except Exception as e:
+            print(f"Skipping panel plugin {name}: {e}")
+    return plugins
+
+class FigureManager:
+    # Owns one Figure/canvas per plugin inside a notebook tab. Only the
+    # visible panel is rendered on a click; the others catch up when their
+    # tab is selected. Created once matplotlib has been imported.
+    def __init__(self, notebook, plugins):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.notebook = notebook
+        self.plugins = plugins
+        self.panels = []
+        self.rendered = []  # (path, row, col) each panel currently shows
+
+        for plugin in plugins:
+            frame = tk.Frame(notebook)
+            notebook.add(frame, text=plugin.name)
+
+            fig = Figure(figsize=plugin.figsize)
+            panel = plugin.panel_class(fig)
+            chart = FigureCanvasTkAgg(fig, frame)
+            chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            panel.attach(chart)
+
+            self.panels.append(panel)
+            self.rendered.append(None)
+
+    def active_index(self):
+        return self.notebook.index(self.notebook.select())
+
+    def clear(self):
+        for i, panel in enumerate(self.panels):
+            panel.clear()
+            panel.refresh()
+            self.rendered[i] = None
+
+    def show(self, key, features):
+        # key is (path, row, col); features maps plugin name -> features
+        i = self.active_index()
+        if self.rendered[i] == key:
+            return
+        self.panels[i].render(features[self.plugins[i].name], key[1], key[2])
+        self.panels[i].refresh()
+        self.rendered[i] = key
+
+class FeatureWorkbench:
+    def __init__(self, root, plugins):
+        self.root = root
+        self.root.title("Feature Workbench")
+        self.plugins = plugins
+
+        # State
+        self.current_pil_img = None
+        self.current_image_name = ""
+        self.image_list = []
+        self.current_img_index = 0
+        self.current_path = None
+        self.selected = None  # (row, col)
+
+        # One background pass per image fills the features of every panel
+        self.cache = CellFeatureCache(self.compute_cell, GRID_ROWS, GRID_COLS)
+
+        # Layout
+        self.main_frame = tk.Frame(self.root)
+        self.main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # Left Panel: Image
+        self.left_panel = tk.Frame(self.main_frame)
+        self.left_panel.pack(side=tk.LEFT, padx=10, pady=10)
+
+        self.canvas = tk.Canvas(self.left_panel, width=IMG_WIDTH, height=IMG_HEIGHT, bg="grey")
+        self.canvas.pack()
+        self.canvas.bind("<Button-1>", self.on_canvas_click)
+
+        # Controls
+        ctrl_frame = tk.Frame(self.left_panel)
+        ctrl_frame.pack(pady=10)
+
+        btn_load = tk.Button(ctrl_frame, text="Load Folder", command=self.load_folder)
+        btn_load.pack(side=tk.TOP, pady=5)
+
+        nav_frame = tk.Frame(ctrl_frame)
+        nav_frame.pack(side=tk.TOP)
+
+        tk.Button(nav_frame, text="<< Prev", command=self.prev_image).pack(side=tk.LEFT, padx=5)
+        tk.Button(nav_frame, text="Next >>", command=self.next_image).pack(side=tk.LEFT, padx=5)
+
+        self.lbl_status = tk.Label(self.left_panel, text="Load a folder to start")
+        self.lbl_status.pack()
+
+        # Right Panel: one tab per plugin
+        self.notebook = ttk.Notebook(self.main_frame)
+        self.notebook.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.show_selected())
+
+        # Panels are built after matplotlib and the plugins' libraries have
+        # been imported in the background, so the window appears immediately
+        self.figures = None
+        heavy = PLOT_MODULES + [m for plugin in plugins for m in plugin.heavy_modules]
+        import_async(self.root, heavy, self.build_plots)
+
+    def build_plots(self):
+        self.figures = FigureManager(self.notebook, self.plugins)
+        # A cell clicked while loading is shown now
+        self.show_selected()
+
+    def compute_cell(self, cell_array):
+        return {plugin.name: plugin.compute_cell(cell_array) for plugin in self.plugins}
+
+    def load_folder(self):
+        initial_dir = os.path.join(os.getcwd(), "raw_images")
+        if not os.path.exists(initial_dir):
+            initial_dir = os.getcwd()
+
+        folder_path = filedialog.askdirectory(initialdir=initial_dir)
+        if not folder_path:
+            return
+
+        # Get all images from the cached manifest (built off the Tk thread)
+        self.lbl_status.config(text=f"Scanning {folder_path}...")
+        list_images_async(self.root, folder_path, self.on_folder_listed)
+
+    def on_folder_listed(self, paths):
+        self.image_list = paths
+
+        if not self.image_list:
+            self.lbl_status.config(text="Load a folder to start")
+            messagebox.showerror("Error", "No images found in folder!")
+            return
+
+        self.current_img_index = 0
+        self.load_current_image()
+
+    def load_current_image(self):
+        if not self.image_list:
+            return
+
+        filepath = self.image_list[self.current_img_index]
+
+        try:
+            # Decoded copy from the cache if the image was prefetched
+            pil_img = self.cache.get_image(filepath)
+            if pil_img is None:
+                pil_img = load_resized(filepath)
+            self.current_pil_img = pil_img
+            self.current_path = filepath
+            self.cache.prefetch(neighbour_paths(self.image_list, self.current_img_index), image=pil_img)
+            self.current_image_name = os.path.basename(filepath)
+
+            self.tk_img = ImageTk.PhotoImage(self.current_pil_img)
+            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_img)
+
+            self.draw_grid()
+            self.lbl_status.config(text=f"Image {self.current_img_index + 1}/{len(self.image_list)}: {self.current_image_name}")
+
+            # Clear plots
+            self.selected = None
+            if self.figures is not None:
+                self.figures.clear()
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load image: {e}")
+
+    def next_image(self):
+        if self.current_img_index < len(self.image_list) - 1:
+            self.current_img_index += 1
+            self.load_current_image()
+
+    def prev_image(self):
+        if self.current_img_index > 0:
+            self.current_img_index -= 1
+            self.load_current_image()
+
+    def draw_grid(self):
+        self.canvas.delete("grid_line")
+        cell_w = IMG_WIDTH / GRID_COLS
+        cell_h = IMG_HEIGHT / GRID_ROWS
+
+        for i in range(1, GRID_COLS):
+            x = i * cell_w
+            self.canvas.create_line(x, 0, x, IMG_HEIGHT, fill="yellow", tags="grid_line")
+
+        for i in range(1, GRID_ROWS):
+            y = i * cell_h
+            self.canvas.create_line(0, y, IMG_WIDTH, y, fill="yellow", tags="grid_line")
+
+    def on_canvas_click(self, event):
+        if not self.current_pil_img:
+            return
+
+        cell_w = IMG_WIDTH / GRID_COLS
+        cell_h = IMG_HEIGHT / GRID_ROWS
+
+        col = int(event.x // cell_w)
+        row = int(event.y // cell_h)
+
+        if 0 <= col < GRID_COLS and 0 <= row < GRID_ROWS:
+            self.visualize_cell(row, col)
+
+    def visualize_cell(self, row, col):
+        cell_w = int(IMG_WIDTH / GRID_COLS)
+        cell_h = int(IMG_HEIGHT / GRID_ROWS)
+
+        x1 = col * cell_w
+        y1 = row * cell_h
+        x2 = x1 + cell_w
+        y2 = y1 + cell_h
+
+        self.selected = (row, col)
+        self.show_selected()
+
+        # Highlight cell on canvas
+        self.canvas.delete("highlight")
+        self.canvas.create_rectangle(x1, y1, x2, y2, outline="red", width=3, tags="highlight")
+
+    def show_selected(self):
+        if self.selected is None or self.current_path is None or self.figures is None:
+            return
+        row, col = self.selected
+        # Precomputed cell features (computed now if the worker has not reached this cell)
+        features = self.cache.get_cell(self.current_path, row, col)
+        self.figures.show((self.current_path, row, col), features)
+
+if __name__ == "__main__":
+    plugins = load_plugins(sys.argv[1:] or PLUGIN_MODULES)
+    if not plugins:
+        print("Error: no panel plugins could be loaded.")
+        sys.exit(1)
+
+    root = tk.Tk()
+    # Set geometry to fit the image and the largest panel
+    root.geometry("1700x900")
+    app = FeatureWorkbench(root, plugins)
+    root.mainloop()